@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2015 Donne Martin. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+
+
+"""Measures how long it takes to load a large resource cache.
+
+Usage: python benchmarks/bench_data_util.py [num_resources]
+"""
+
+from __future__ import unicode_literals
+from __future__ import print_function
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from saws.data_util import DataUtil  # NOQA
+from saws.resources import AwsResources  # NOQA
+
+
+def write_resources(file_path, headers, num_resources):
+    """Writes a resource cache with num_resources lines per header.
+
+    Args:
+        * file_path: A string representing the file path to write.
+        * headers: A list of resource headers.
+        * num_resources: An int representing the number of resources
+            written under each header.
+
+    Returns:
+        None.
+    """
+    with open(file_path, 'w') as fp:
+        for index, header in enumerate(headers):
+            fp.write('{0}: {1} 1450000000.0\n'.format(header, num_resources))
+            for resource in range(num_resources):
+                fp.write('resource-{0}-{1:08d}\n'.format(index, resource))
+
+
+def main(num_resources):
+    headers = ['[--instance-ids]', '[--ec2-tag-key]', '[--ec2-tag-value]',
+               '[--bucket]', '[s3:]']
+    data_util = DataUtil()
+    header_to_type_map = data_util.create_header_to_type_map(
+        headers=headers,
+        data_type=AwsResources.ResourceType)
+    temp_dir = tempfile.mkdtemp()
+    try:
+        file_path = os.path.join(temp_dir, 'RESOURCES.txt')
+        write_resources(file_path, headers, num_resources)
+        timings = timeit.repeat(
+            lambda: data_util.read_data(file_path,
+                                        header_to_type_map,
+                                        AwsResources.ResourceType),
+            number=1,
+            repeat=5)
+    finally:
+        shutil.rmtree(temp_dir)
+    print('read_data: {0} lines, best of 5: {1:.1f} ms'.format(
+        num_resources * len(headers), min(timings) * 1000))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2015 Donne Martin. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+
+
+"""Compares the regex and numpy fuzzy matchers on large collections.
+
+Each size is matched with a query typed one character at a time, as the
+completer does, and with a query pasted at once.
+
+Usage: python benchmarks/bench_fuzzy.py [num_items ...]
+"""
+
+from __future__ import unicode_literals
+from __future__ import print_function
+import os
+import random
+import sys
+import timeit
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from saws.fuzzy import FuzzyMatcher, NumpyFuzzyMatcher, import_numpy  # NOQA
+
+
+QUERY = 's3:prodlogs'
+LIMIT = 100
+
+
+def create_items(num_items):
+    """Creates a mix of bucket URIs and instance ids.
+
+    Args:
+        * num_items: An int representing the number of items.
+
+    Returns:
+        A list of strings.
+    """
+    rand = random.Random(0)
+    words = ['prod', 'staging', 'dev', 'logs', 'assets', 'backup', 'web',
+             'data', 'images', 'archive']
+    items = []
+    for index in range(num_items):
+        if index % 2:
+            items.append('i-{0:017x}'.format(rand.getrandbits(68)))
+        else:
+            items.append('s3://{0}-{1}-{2:06d}'.format(
+                rand.choice(words), rand.choice(words), index))
+    return items
+
+
+def time_queries(factory, items):
+    """Times typing and pasting the query.
+
+    Args:
+        * factory: A callable creating a fuzzy matcher for the items.
+        * items: A list of strings to match.
+
+    Returns:
+        A tuple of floats representing the time to build the matcher,
+            the best time to type the query and the best time to paste it,
+            in seconds.
+    """
+    start = timeit.default_timer()
+    matcher = factory(items)
+    build = timeit.default_timer() - start
+
+    def type_query():
+        for end in range(1, len(QUERY) + 1):
+            matcher.find(QUERY[:end], LIMIT)
+
+    def paste_query():
+        matcher.find('', LIMIT)
+        matcher.find(QUERY, LIMIT)
+    typed = min(timeit.repeat(type_query, number=1, repeat=3))
+    pasted = min(timeit.repeat(paste_query, number=1, repeat=3))
+    return build, typed, pasted
+
+
+def main(sizes):
+    if import_numpy() is None:
+        print('numpy is not installed')
+        return
+    print('{0:>9} {1:>7} {2:>10} {3:>10} {4:>10}'.format(
+        'items', 'matcher', 'build ms', 'typed ms', 'pasted ms'))
+    for num_items in sizes:
+        items = create_items(num_items)
+        assert FuzzyMatcher(items).find(QUERY, LIMIT) == \
+            NumpyFuzzyMatcher(items).find(QUERY, LIMIT)
+        for name, factory in (('regex', FuzzyMatcher),
+                              ('numpy', NumpyFuzzyMatcher)):
+            timings = time_queries(factory, items)
+            print('{0:>9} {1:>7} {2:>10.1f} {3:>10.1f} {4:>10.1f}'.format(
+                num_items, name, *[timing * 1000 for timing in timings]))
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [10000, 100000, 1000000])
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2015 Donne Martin. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+
+
+"""Measures how long it takes to import saws.main in a new interpreter.
+
+Prints the slowest modules imported along the way.  Requires Python 3.7
+or later for -X importtime.
+
+Usage: python benchmarks/bench_startup.py [num_modules]
+"""
+
+from __future__ import unicode_literals
+from __future__ import print_function
+import os
+import subprocess
+import sys
+
+
+def get_import_times():
+    """Imports saws.main in a new interpreter with -X importtime.
+
+    Args:
+        * None.
+
+    Returns:
+        A dict mapping module names to their cumulative import time in
+            seconds.
+    """
+    root_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+    env = dict(os.environ)
+    env['PYTHONPATH'] = root_dir
+    output = subprocess.check_output(
+        [sys.executable, '-X', 'importtime', '-c', 'import saws.main'],
+        stderr=subprocess.STDOUT,
+        universal_newlines=True,
+        cwd=root_dir,
+        env=env)
+    import_times = {}
+    for line in output.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, module = line.split('|')
+        if cumulative.strip().isdigit():
+            import_times[module.strip()] = int(cumulative) / 1e6
+    return import_times
+
+
+def main(num_modules):
+    timings = [get_import_times() for _ in range(5)]
+    best = min(timings, key=lambda times: times['saws.main'])
+    print('import saws.main, best of 5: {0:.1f} ms'.format(
+        best['saws.main'] * 1000))
+    slowest = sorted(best.items(), key=lambda item: -item[1])
+    for module, seconds in slowest[1:num_modules + 1]:
+        print('{0:>9.1f} ms  {1}'.format(seconds * 1000, module))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
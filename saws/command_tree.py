@@ -0,0 +1,385 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2015 Donne Martin. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+
+from __future__ import unicode_literals
+from __future__ import print_function
+import io
+import json
+import os
+import sys
+import threading
+
+
+class CommandTree(object):
+    """Encapsulates the tree of AWS commands, subcommands and options.
+
+    The tree maps each command to its subcommands and each subcommand to
+    its options, so finding what can follow `aws ec2 describe-instances`
+    takes a few dict lookups.  The completer completes commands,
+    subcommands and options from the tree, see complete().
+
+    The commands and subcommands are serialized to data/COMMANDS.json, which
+    is generated from the awscli with `python -m saws.command_tree`.
+    Options make up most of the awscli's data, so they are not serialized.
+    They are read from the awscli the first time a subcommand's options are
+    needed and kept in the tree.
+
+    The json file records the awscli version it was generated from.  If
+    another version is installed, its commands can differ, so the tree
+    leaves completion to the awscli completer, see is_current().
+
+    Attributes:
+        * DATA_DIR: A string representing the directory containing
+            data/COMMANDS.json.
+        * DATA_PATH: A string representing the full file path of
+            data/COMMANDS.json.
+        * commands: A dict mapping commands to a dict mapping their
+            subcommands to a list of options, or to None if the options
+            have not been read yet.
+        * global_options: A list of options valid after any command.
+        * flat: A boolean that specifies whether every subcommand is placed
+            under every command, see from_commands().
+        * awscli_version: A string representing the awscli version the
+            tree was generated from, or None if it was not recorded.
+    """
+
+    DATA_DIR = os.path.dirname(os.path.realpath(__file__))
+    DATA_PATH = os.path.join(DATA_DIR, 'data/COMMANDS.json')
+
+    def __init__(self, commands=None, global_options=None, flat=False,
+                 awscli_version=None):
+        """Initializes CommandTree.
+
+        Args:
+            * commands: A dict mapping commands to a dict mapping their
+                subcommands to a list of options or None.
+            * global_options: A list of options valid after any command.
+            * flat: A boolean that specifies whether every subcommand is
+                placed under every command.
+            * awscli_version: A string representing the awscli version the
+                tree was generated from, or None to not check it.
+
+        Returns:
+            None.
+        """
+        self.commands = commands or {}
+        self.global_options = global_options or []
+        self.flat = flat
+        self.awscli_version = awscli_version
+        self._is_current = None
+        self._sub_command_names = None
+        self._help_commands = {}
+        self._main_help = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, file_path=None):
+        """Loads the tree from a json file.
+
+        Args:
+            * file_path: A string representing the full file path of the
+                json file.  Defaults to DATA_PATH.
+
+        Returns:
+            An instance of CommandTree.
+
+        Raises:
+            An IOError if the file can not be read, a ValueError if it is
+                not valid json or a KeyError if it misses data, such as the
+                awscli version of older files.
+        """
+        with io.open(file_path or cls.DATA_PATH, encoding='utf-8') as fp:
+            data = json.load(fp)
+        commands = dict(
+            (command, dict((sub_command, None) for sub_command in subs))
+            for command, subs in data['commands'].items())
+        return cls(commands, data['global_options'],
+                   awscli_version=data['awscli_version'])
+
+    @classmethod
+    def from_commands(cls, commands, sub_commands, global_options):
+        """Builds a flat tree from the lists in data/SOURCES.txt.
+
+        SOURCES.txt does not say which command a subcommand belongs to, so
+        every subcommand is placed under every command.
+
+        Args:
+            * commands: A list of commands.
+            * sub_commands: A list of subcommands.
+            * global_options: A list of global options.
+
+        Returns:
+            An instance of CommandTree.
+        """
+        return cls(dict((command,
+                         dict((sub_command, None)
+                              for sub_command in sub_commands))
+                        for command in commands),
+                   list(global_options),
+                   flat=True)
+
+    @classmethod
+    def from_clidriver(cls, driver=None):
+        """Builds the tree from the awscli's command table.
+
+        Loading every service model takes a few seconds, this is meant to
+        generate data/COMMANDS.json rather than to run on startup.
+
+        Args:
+            * driver: An instance of the awscli's CLIDriver.
+
+        Returns:
+            An instance of CommandTree.
+        """
+        from awscli import __version__ as awscli_version
+        tree = cls(awscli_version=awscli_version)
+        main_help = tree._get_main_help(driver)
+        for command in tree._documented(main_help.command_table):
+            help_command = main_help.command_table[command] \
+                .create_help_command()
+            sub_commands = {}
+            if help_command is not None and help_command.command_table:
+                for sub_command in tree._documented(
+                        help_command.command_table):
+                    sub_commands[sub_command] = None
+            tree.commands[command] = sub_commands
+        tree.global_options = [
+            '--' + option for option in tree._documented(
+                main_help.arg_table)]
+        return tree
+
+    def to_file(self, file_path=None):
+        """Saves the commands, subcommands, global options and the awscli
+        version to json.
+
+        Args:
+            * file_path: A string representing the full file path of the
+                json file.  Defaults to DATA_PATH.
+
+        Returns:
+            None.
+        """
+        data = {
+            'awscli_version': self.awscli_version,
+            'commands': dict((command, sorted(subs))
+                             for command, subs in self.commands.items()),
+            'global_options': sorted(self.global_options),
+        }
+        with io.open(file_path or self.DATA_PATH, 'w',
+                     encoding='utf-8') as fp:
+            fp.write(json.dumps(data, sort_keys=True, indent=0,
+                                separators=(',', ':')))
+
+    def is_command(self, word):
+        """Determines whether the word is a command.
+
+        Args:
+            * word: A string representing the word, such as 'ec2'.
+
+        Returns:
+            A boolean that specifies whether the word is a command.
+        """
+        return word in self.commands
+
+    def is_sub_command(self, word, command=None):
+        """Determines whether the word is a subcommand.
+
+        Args:
+            * word: A string representing the word, such as
+                'describe-instances'.
+            * command: A string representing the command the subcommand
+                should belong to, or None to check all commands.
+
+        Returns:
+            A boolean that specifies whether the word is a subcommand.
+        """
+        if command is not None:
+            return word in self.commands.get(command, {})
+        if self._sub_command_names is None:
+            self._sub_command_names = set(
+                sub_command
+                for subs in self.commands.values()
+                for sub_command in subs)
+        return word in self._sub_command_names
+
+    def is_current(self):
+        """Determines whether the tree matches the installed awscli.
+
+        The installed version is checked the first time, importing the
+        awscli package does not load its command table.
+
+        Args:
+            * None.
+
+        Returns:
+            A boolean that specifies whether the tree was generated from
+                the installed awscli version, True if the version was not
+                recorded.
+        """
+        if self._is_current is None:
+            if self.awscli_version is None:
+                self._is_current = True
+            else:
+                try:
+                    from awscli import __version__ as awscli_version
+                except ImportError:
+                    awscli_version = None
+                self._is_current = awscli_version == self.awscli_version
+        return self._is_current
+
+    def complete(self, text):
+        """Completes the last word of the command text from the tree.
+
+        Commands, subcommands and options are completed the way the awscli
+        completer does, without loading the awscli's command table.  Texts
+        the tree can not complete return None, for the awscli completer to
+        complete instead:
+
+        * Option values and positional arguments.
+        * Global options before the subcommand.
+        * Complete names, the awscli then completes what follows them.
+        * Unknown commands and subcommands.
+        * Any text if the tree is flat, or was generated from another
+          awscli version than the installed one.
+
+        Example:
+            'aws ec' -> commands starting with 'ec'
+            'aws ec2 ' -> ec2 subcommands
+            'aws ec2 describe-instances --f' -> its options and the global
+                options starting with '--f', except those already used
+
+        Args:
+            * text: A string representing the command text, with shortcuts
+                replaced.
+
+        Returns:
+            A sorted list of string completions, or None if the tree can
+                not complete the text.
+        """
+        words = text.split()
+        if self.flat or not words or words[0] != 'aws' or \
+                not self.is_current():
+            return None
+        word = '' if text[-1].isspace() else words.pop()
+        words = words[1:]
+        if len(words) < 2:
+            if word.startswith('-'):
+                return None
+            if not words:
+                tokens = self.commands
+            elif words[0] in self.commands:
+                tokens = self.commands[words[0]]
+            else:
+                return None
+        else:
+            command, sub_command = words[0], words[1]
+            if not word.startswith('-') or \
+                    not self.is_sub_command(sub_command, command):
+                return None
+            options = self.get_options(command, sub_command)
+            if not options:
+                return None
+            tokens = set(options) | set(self.global_options)
+            tokens.difference_update(words)
+        if word in tokens:
+            return None
+        return sorted(token for token in tokens if token.startswith(word))
+
+    def get_options(self, command, sub_command):
+        """Gets the options of the subcommand.
+
+        Options are read from the awscli on first use.
+
+        Args:
+            * command: A string representing the command, such as 'ec2'.
+            * sub_command: A string representing the subcommand, such as
+                'describe-instances'.
+
+        Returns:
+            A list of option strings, empty if the awscli can not be
+                loaded.
+        """
+        sub_commands = self.commands.get(command, {})
+        if sub_command not in sub_commands:
+            return []
+        options = sub_commands[sub_command]
+        if options is None:
+            with self._lock:
+                try:
+                    options = self._read_options(command, sub_command)
+                except Exception:
+                    return []
+                sub_commands[sub_command] = options
+        return options
+
+    def _read_options(self, command, sub_command):
+        """Reads the options of the subcommand from the awscli.
+
+        Called with the lock held.
+
+        Args:
+            * command: A string representing the command, such as 'ec2'.
+            * sub_command: A string representing the subcommand, such as
+                'describe-instances'.
+
+        Returns:
+            A list of option strings.
+        """
+        help_command = self._help_commands.get(command)
+        if help_command is None:
+            help_command = self._get_main_help().command_table[command] \
+                .create_help_command()
+            self._help_commands[command] = help_command
+        sub_help = help_command.command_table[sub_command] \
+            .create_help_command()
+        return ['--' + option for option in self._documented(
+            sub_help.arg_table)]
+
+    def _get_main_help(self, driver=None):
+        """Gets the awscli's main help command, creating it on first use.
+
+        Args:
+            * driver: An instance of the awscli's CLIDriver.
+
+        Returns:
+            An instance of the awscli's ProviderHelpCommand.
+        """
+        if self._main_help is None:
+            if driver is None:
+                from awscli.clidriver import create_clidriver
+                driver = create_clidriver()
+            self._main_help = driver.create_help_command()
+        return self._main_help
+
+    def _documented(self, table):
+        """Gets the sorted names of the documented entries in the table.
+
+        Mirrors how the awscli completer filters its completions.
+
+        Args:
+            * table: A dict mapping names to awscli commands or arguments.
+
+        Returns:
+            A sorted list of names.
+        """
+        return sorted(name for name, value in table.items()
+                      if not getattr(value, '_UNDOCUMENTED', False) and
+                      not getattr(value, 'positional_arg', False))
+
+
+if __name__ == '__main__':
+    # Regenerate data/COMMANDS.json from the installed awscli
+    file_path = sys.argv[1] if len(sys.argv) > 1 else None
+    CommandTree.from_clidriver().to_file(file_path)
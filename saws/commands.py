@@ -17,6 +17,7 @@ from __future__ import unicode_literals
 from __future__ import print_function
 import os
 from enum import Enum
+from .command_tree import CommandTree
 from .data_util import DataUtil
 
 
@@ -40,6 +41,8 @@ class AwsCommands(object):
             CommandType.
         * all_commands: A list of all commands, sub_commands, options, etc
             from data/SOURCES.txt.
+        * command_tree: An instance of CommandTree mapping commands to their
+            subcommands and options.
     """
 
     class CommandType(Enum):
@@ -77,3 +80,24 @@ class AwsCommands(object):
             data_file_path=self.DATA_PATH,
             header_to_type_map=self.header_to_type_map,
             data_type=self.CommandType)
+        self.command_tree = self._load_command_tree()
+
+    def _load_command_tree(self):
+        """Loads the command tree from data/COMMANDS.json.
+
+        Falls back to a flat tree built from data/SOURCES.txt if the json
+        file can not be loaded.
+
+        Args:
+            * None.
+
+        Returns:
+            An instance of CommandTree.
+        """
+        try:
+            return CommandTree.from_file()
+        except (IOError, OSError, ValueError, KeyError):
+            return CommandTree.from_commands(
+                self.all_commands[self.CommandType.COMMANDS.value],
+                self.all_commands[self.CommandType.SUB_COMMANDS.value],
+                self.all_commands[self.CommandType.GLOBAL_OPTIONS.value])
@@ -17,20 +17,75 @@ from __future__ import unicode_literals
 from __future__ import print_function
 import re
 import sys
+import threading
+import time
 import traceback
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
 from six.moves import cStringIO
 from prompt_toolkit.completion import Completer
 from .utils import TextUtils
 from .commands import AwsCommands
+from .command_tree import CommandTree
+from .shortcut_trie import ShortcutTrie
 from .options import AwsOptions
 from .resources import AwsResources
+from .resource.backend import create_query_backend
+
+
+class CompletionState(object):
+    """Encapsulates the completion work done for a document text.
+
+    States are cached by AwsCompleter so that typing forward can narrow the
+    previous state and backspacing can restore an earlier one, instead of
+    tokenizing the text and calling the awscli completer again.
+
+    Attributes:
+        * text: A string representing the document text.
+        * aws_cli_text: A string representing the text sent to the awscli
+            completer, with shortcuts replaced.
+        * words: A list of strings for each word in the text.
+        * aws_cli_completions: A list of completions from the awscli
+            completer.
+        * aws_completions: A set of completions to show the user.
+        * shortcut_match: A boolean that specifies whether shortcuts were
+            matched when the state was created.
+    """
+
+    def __init__(self, text, aws_cli_text, words, aws_cli_completions,
+                 aws_completions, shortcut_match):
+        """Initializes CompletionState.
+
+        Args:
+            * text: A string representing the document text.
+            * aws_cli_text: A string representing the text sent to the
+                awscli completer, with shortcuts replaced.
+            * words: A list of strings for each word in the text.
+            * aws_cli_completions: A list of completions from the awscli
+                completer.
+            * aws_completions: A set of completions to show the user.
+            * shortcut_match: A boolean that specifies whether shortcuts
+                were matched.
+
+        Returns:
+            None.
+        """
+        self.text = text
+        self.aws_cli_text = aws_cli_text
+        self.words = words
+        self.aws_cli_completions = aws_cli_completions
+        self.aws_completions = aws_completions
+        self.shortcut_match = shortcut_match
 
 
 class AwsCompleter(Completer):
     """Completer for AWS commands, subcommands, options, and parameters.
 
     Attributes:
-        * aws_completer: An instance of the official awscli Completer.
+        * aws_completer: The official awscli completer module, imported on
+            first use if not provided.
         * aws_completions: A set of completions to show the user.
         * all_commands: A list of all commands, sub_commands, options, etc
             from data/SOURCES.txt.
@@ -45,8 +100,19 @@ class AwsCompleter(Completer):
             and their corresponding full commands as values.
         * resources: An instance of AwsResources.
         * options: An instance of AwsOptions
+        * command_tree: An instance of CommandTree.
+        * MAX_COMPLETION_STATES: An int representing the number of
+            CompletionStates to cache.
+        * MAX_AWS_CLI_COMPLETIONS: An int representing the number of awscli
+            completion results to cache.
+        * latency_budget: A float representing the seconds completions may
+            take before fuzzy matching falls back to prefix matching, or
+            None to always fuzzy match.
     """
 
+    MAX_COMPLETION_STATES = 64
+    MAX_AWS_CLI_COMPLETIONS = 256
+
     def __init__(self,
                  aws_completer,
                  all_commands,
@@ -54,11 +120,17 @@ class AwsCompleter(Completer):
                  config_obj,
                  log_exception,
                  fuzzy_match=False,
-                 shortcut_match=False):
+                 shortcut_match=False,
+                 shortcuts=None,
+                 command_tree=None,
+                 options=None,
+                 on_refresh_progress=None):
         """Initializes AwsCompleter.
 
         Args:
-            * aws_completer: The official aws cli completer module.
+            * aws_completer: The official aws cli completer module, or None
+                to import it on first use.  Importing it loads botocore, which
+                takes a large part of the startup time.
             * all_commands: A list of all commands, sub_commands, options, etc
                 from data/SOURCES.txt.
             * config: An instance of Config.
@@ -68,6 +140,16 @@ class AwsCompleter(Completer):
                 fuzzy matching.
             * shortcut_match: A boolean that determines whether to
                 match shortcuts.
+            * shortcuts: An OrderedDict containing shortcuts commands as keys
+                and their corresponding full commands as values.  Defaults
+                to reading them from the config.
+            * command_tree: An instance of CommandTree.  Defaults to a
+                flat tree built from all_commands.
+            * options: An instance of AwsOptions.  Defaults to reading the
+                options from data/OPTIONS.txt.
+            * on_refresh_progress: A callable called without arguments
+                whenever a lazy refresh of expired resources progresses or
+                finishes.
 
         Returns:
             None.
@@ -81,14 +163,61 @@ class AwsCompleter(Completer):
         self.text_utils = TextUtils()
         self.fuzzy_match = fuzzy_match
         self.shortcut_match = shortcut_match
+        self.on_refresh_progress = on_refresh_progress
         self.BASE_COMMAND = AwsCommands.AWS_COMMAND
-        self.shortcuts = self.config.get_shortcuts(config_obj)
-        self.resources = AwsResources(self.log_exception)
-        self.options = AwsOptions(self.all_commands)
+        if shortcuts is None:
+            shortcuts = self.config.get_shortcuts(config_obj)
+        self.shortcuts = shortcuts
+        self._shortcut_trie = None
+        self._shortcut_trie_source = None
+        self.resources = AwsResources(
+            self.log_exception,
+            query_backend=create_query_backend(
+                self.config_obj[self.config.MAIN].get(
+                    self.config.RESOURCE_BACKEND),
+                self.config.get_list(self.config_obj,
+                                     self.config.RESOURCE_REGIONS)),
+            inventory_profiles=self.config.get_list(
+                self.config_obj, self.config.INVENTORY_PROFILES))
+        self.options = options or AwsOptions(self.all_commands)
+        self.command_tree = command_tree or CommandTree.from_commands(
+            self.all_commands[AwsCommands.CommandType.COMMANDS.value],
+            self.all_commands[AwsCommands.CommandType.SUB_COMMANDS.value],
+            self.all_commands[AwsCommands.CommandType.GLOBAL_OPTIONS.value])
+        self._completion_states = OrderedDict()
+        self._last_completion_state = None
+        self._aws_cli_completer = None
+        self._aws_cli_completions = OrderedDict()
+        self._aws_cli_lock = threading.Lock()
+        self._current_text = None
+        budget = self.config_obj[self.config.MAIN].as_int(
+            self.config.COMPLETION_LATENCY_BUDGET)
+        self.latency_budget = budget / 1000.0 if budget > 0 else None
+
+    def cancel_stale_completions(self, text):
+        """Cancels computing the completions of texts other than the text.
+
+        Called by the ui whenever the input text changes.  prompt_toolkit
+        computes completions on a thread, one document at a time, and only
+        starts on the latest text once the previous completions are done.
+        Completions for outdated text stop early instead.
+
+        Args:
+            * text: A string representing the current input text.
+
+        Returns:
+            None.
+        """
+        self._current_text = text
 
     def get_completions(self, document, _):
         """Get completions for the current scope.
 
+        Completions are yielded as they are found.  They stop if the input
+        text changes in the meantime, see cancel_stale_completions().  Once
+        the latency budget is spent, fuzzy matching falls back to prefix
+        matching.
+
         Args:
             * document: An instance of prompt_toolkit's Document.
             * _: An instance of prompt_toolkit's CompleteEvent (not used).
@@ -97,38 +226,81 @@ class AwsCompleter(Completer):
             A generator of prompt_toolkit's Completion objects, containing
             matched completions.
         """
-        # Get completions from the official AWS CLI
-        aws_completer_results_list = self._get_aws_cli_completions(document)
-        self.aws_completions = set()
-        if len(document.text) < len(self.BASE_COMMAND):
-            # Autocomplete 'aws' at the beginning of the command
-            self.aws_completions.update([self.BASE_COMMAND])
-        else:
-            self.aws_completions.update(aws_completer_results_list)
+        text = document.text
+        for completion in self._find_completions(document):
+            if self._is_stale(text):
+                return
+            yield completion
+
+    def _is_stale(self, text):
+        """Determines whether the input text changed since the given text.
+
+        Args:
+            * text: A string representing the text completions are computed
+                for.
+
+        Returns:
+            A boolean that specifies whether the text is outdated.
+        """
+        current_text = self._current_text
+        return current_text is not None and current_text != text
+
+    def _create_should_stop(self, text):
+        """Creates the check that gives up fuzzy matching.
+
+        The latency budget starts when matching does.  Fuzzy matching is
+        what falling back to prefix matching speeds up, the time spent in
+        the awscli completer is not counted.
+
+        Args:
+            * text: A string representing the text completions are computed
+                for.
+
+        Returns:
+            A callable returning True once the text is outdated or the
+                latency budget is spent.
+        """
+        deadline = None
+        if self.latency_budget is not None:
+            deadline = time.time() + self.latency_budget
+
+        def should_stop():
+            return self._is_stale(text) or \
+                (deadline is not None and time.time() > deadline)
+        return should_stop
+
+    def _find_completions(self, document):
+        """Finds the completions for the document.
+
+        Args:
+            * document: An instance of prompt_toolkit's Document.
+
+        Returns:
+            A generator of prompt_toolkit's Completion objects, containing
+            matched completions.
+        """
         word_before_cursor = document.get_word_before_cursor(WORD=True)
-        words = self.text_utils.get_tokens(document.text)
-        if len(words) == 0:
+        state = self._get_completion_state(document)
+        self.aws_completions = state.aws_completions
+        words = state.words
+        if len(words) == 0 or self._is_stale(document.text):
             return []
-        # Determine if we should insert shortcuts
-        elif len(words) == 2 and \
-            words[0] == self.BASE_COMMAND and \
-                word_before_cursor != '':
-            # Insert shortcuts if the user typed 'aws' as the first
-            # command and is inputting the subcommand
-            if self.shortcut_match:
-                self.aws_completions.update(self.shortcuts.keys())
+        should_stop = self._create_should_stop(document.text)
         # Try to get completions for enabled AWS resources
         completions = self._get_custom_completions(
-            words, word_before_cursor, self.resources.resources_options_map)
+            words, word_before_cursor, self.resources.resources_options_map,
+            on_match=self._refresh_expired_resource,
+            should_stop=should_stop)
         # Try to get completions for global options, filter options, etc
         if completions is None:
             completions = self._get_custom_completions(
-                words, word_before_cursor, self.options.options_map)
+                words, word_before_cursor, self.options.options_map,
+                should_stop=should_stop)
         # Try to get completions from the official AWS CLI
         if completions is None:
             fuzzy_aws_completions = self.fuzzy_match
-            if self.fuzzy_match and word_before_cursor in \
-                    self.all_commands[AwsCommands.CommandType.COMMANDS.value]:
+            if self.fuzzy_match and \
+                    self.command_tree.is_command(word_before_cursor):
                 # Fuzzy completion currently only works with resources, options
                 # and shortcuts.  If we have just completed a top-level
                 # command (ie. ec2, elb, s3) then disable fuzzy completions,
@@ -136,43 +308,85 @@ class AwsCompleter(Completer):
                 # completed and incorrectly shown.
                 # See: https://github.com/donnemartin/saws/issues/14
                 fuzzy_aws_completions = False
+            # Commands and subcommands are completed in full, the top
+            # matches of `aws ` would leave most services unreachable
             completions = self.text_utils.find_matches(word_before_cursor,
                                                        self.aws_completions,
-                                                       fuzzy_aws_completions)
+                                                       fuzzy_aws_completions,
+                                                       should_stop,
+                                                       limit_matches=False)
         return completions
 
-    def refresh_resources_and_options(self, force_refresh=False):
+    def refresh_resources_and_options(self, force_refresh=False,
+                                      background=False, on_progress=None):
         """Convenience function to refresh resources for completion.
 
         Args:
             * force_refresh: A boolean determines whether to force a cache
                 refresh.  This value is set to True when the user presses `F5`.
+            * background: A boolean that determines whether to query AWS on a
+                background thread.
+            * on_progress: A callable called without arguments whenever the
+                background refresh progresses or finishes.
+
+        Returns:
+            None.
+        """
+        self.resources.refresh(force_refresh,
+                               background=background,
+                               on_progress=on_progress)
+
+    def warm_up(self):
+        """Loads the awscli completer ahead of the first completion.
+
+        Meant to run on a background thread once the prompt is shown, so
+        the first keystroke does not wait for the awscli to load.
+
+        Args:
+            * None.
+
+        Returns:
+            None.
+        """
+        try:
+            with self._aws_cli_lock:
+                self._get_aws_cli_completer()
+            # Reads the cluster states from the awscli
+            self.options.cluster_states
+        except Exception as e:
+            self.log_exception(e, traceback)
+
+    def clear_completion_states(self):
+        """Clears the cached completion states.
+
+        Args:
+            * None.
 
         Returns:
             None.
         """
-        self.resources.refresh(force_refresh)
+        self._completion_states = OrderedDict()
+        self._last_completion_state = None
 
     def replace_shortcut(self, text):
         """Replaces matched shortcut commands with their full command.
 
-        Currently, only one shortcut is replaced before shortcut replacement
-        terminates, although this function could potentially be extended
-        to replace mutliple shortcuts.
+        Every shortcut in the text is replaced in a single pass over its
+        tokens, along with the `%s` substitutions of the full commands.  See
+        ShortcutTrie.
 
         Args:
             * text: A string representing the input command text to replace.
 
         Returns:
-            A string representing input command text with a shortcut
-                replaced, if one has been found.
+            A string representing input command text with its shortcuts
+                replaced.
         """
-        for key, value in self.shortcuts.items():
-            if key in text:
-                text = re.sub(key, value, text)
-                text = self.replace_substitution(text)
-                break
-        return text
+        if self._shortcut_trie is None or \
+                self._shortcut_trie_source is not self.shortcuts:
+            self._shortcut_trie = ShortcutTrie(self.shortcuts)
+            self._shortcut_trie_source = self.shortcuts
+        return self._shortcut_trie.expand(text)
 
     def replace_substitution(self, text):
         """Replaces a `%s` with the word immediately following it.
@@ -203,7 +417,7 @@ class AwsCompleter(Completer):
         return text
 
     def _get_resource_completions(self, words, word_before_cursor,
-                                  option_text, resource):
+                                  option_text, resource, should_stop=None):
         """Get completions for the specified AWS resource.
 
         Args:
@@ -218,6 +432,8 @@ class AwsCompleter(Completer):
             * resource: A list that represents the resource completions to
                 display if option_text is matched.  For example, instance ids,
                 instance tags, etc.
+            * should_stop: A callable returning True to give up fuzzy
+                matching for prefix matching, or None.
 
         Returns:
             A generator of prompt_toolkit's Completion objects, containing
@@ -236,11 +452,145 @@ class AwsCompleter(Completer):
         if option_text_match or completing_with_space or completing_no_space:
             return self.text_utils.find_matches(word_before_cursor,
                                                 resource,
-                                                self.fuzzy_match)
+                                                self.fuzzy_match,
+                                                should_stop)
+
+    def _get_completion_state(self, document):
+        """Gets the completion state for the document text.
+
+        A cached state is reused for text seen before, such as after a
+        backspace.  Otherwise the previous state is narrowed if the user
+        only typed forward in the same word, or a new state is created.
+
+        Args:
+            * document: An instance of prompt_toolkit's Document.
+
+        Returns:
+            An instance of CompletionState.
+        """
+        text = document.text
+        state = self._completion_states.pop(text, None)
+        if state is None or state.shortcut_match != self.shortcut_match:
+            state = self._narrow_completion_state(text)
+            if state is None:
+                state = self._create_completion_state(document)
+        self._completion_states[text] = state
+        while len(self._completion_states) > self.MAX_COMPLETION_STATES:
+            self._completion_states.popitem(last=False)
+        self._last_completion_state = state
+        return state
+
+    def _create_completion_state(self, document):
+        """Creates the completion state for the document text.
+
+        Args:
+            * document: An instance of prompt_toolkit's Document.
+
+        Returns:
+            An instance of CompletionState.
+        """
+        text = document.text
+        # Get completions from the official AWS CLI
+        aws_cli_completions = self._get_aws_cli_completions(document)
+        words = self.text_utils.get_tokens(text)
+        return CompletionState(text,
+                               self.replace_shortcut(text),
+                               words,
+                               aws_cli_completions,
+                               self._create_aws_completions(
+                                   text, words, aws_cli_completions),
+                               self.shortcut_match)
+
+    def _narrow_completion_state(self, text):
+        """Narrows the previous completion state to the document text.
+
+        Only applies when the text extends the last word of the previous
+        text.  The awscli completer filters its completions by the prefix
+        of the last word, so the new completions are the previous ones
+        that start with the longer word.  The exceptions, where the awscli
+        completer switches to completing something else, are left to
+        _create_completion_state:
+
+        * The word becomes a command or subcommand name.
+        * The word is the only option matched, the awscli then completes
+            the option's values.
+        * The text has quotes or escapes, which change how it is split.
+
+        Args:
+            * text: A string representing the document text.
+
+        Returns:
+            An instance of CompletionState, or None if the previous state
+                can not be narrowed.
+        """
+        previous = self._last_completion_state
+        if previous is None or \
+                previous.shortcut_match != self.shortcut_match or \
+                len(previous.text) < len(self.BASE_COMMAND) or \
+                not previous.words or \
+                previous.text[-1].isspace() or \
+                not text.startswith(previous.text) or \
+                re.search(r'[\s\'"\\]', text[len(previous.text):]) or \
+                re.search(r'[\'"\\]', previous.text):
+            return None
+        suffix = text[len(previous.text):]
+        aws_cli_text = self.replace_shortcut(text)
+        if not suffix or aws_cli_text != previous.aws_cli_text + suffix:
+            return None
+        aws_cli_word = aws_cli_text.split()[-1]
+        if self.command_tree.is_command(aws_cli_word) or \
+                self.command_tree.is_sub_command(aws_cli_word):
+            return None
+        aws_cli_completions = [completion
+                               for completion in previous.aws_cli_completions
+                               if completion.startswith(aws_cli_word)]
+        if aws_cli_completions == [aws_cli_word]:
+            return None
+        words = previous.words[:-1] + [previous.words[-1] + suffix]
+        return CompletionState(text,
+                               aws_cli_text,
+                               words,
+                               aws_cli_completions,
+                               self._create_aws_completions(
+                                   text, words, aws_cli_completions),
+                               self.shortcut_match)
+
+    def _create_aws_completions(self, text, words, aws_cli_completions):
+        """Creates the set of completions to show the user.
+
+        Args:
+            * text: A string representing the document text.
+            * words: A list of strings for each word in the text.
+            * aws_cli_completions: A list of completions from the awscli
+                completer.
+
+        Returns:
+            A set of completions.
+        """
+        aws_completions = set()
+        if len(text) < len(self.BASE_COMMAND):
+            # Autocomplete 'aws' at the beginning of the command
+            aws_completions.update([self.BASE_COMMAND])
+        else:
+            aws_completions.update(aws_cli_completions)
+        # Determine if we should insert shortcuts
+        if len(words) == 2 and \
+            words[0] == self.BASE_COMMAND and \
+                not text[-1].isspace():
+            # Insert shortcuts if the user typed 'aws' as the first
+            # command and is inputting the subcommand
+            if self.shortcut_match:
+                aws_completions.update(self.shortcuts.keys())
+        return aws_completions
 
     def _get_aws_cli_completions(self, document):
         """Get completions from the official AWS CLI for the current scope.
 
+        Commands, subcommands and options are completed from the command
+        tree, other words by the awscli completer.  The awscli completer
+        splits the text on whitespace and completes the last word, so its
+        results are cached by the words in the text.
+
         Args:
             * document: An instance of prompt_toolkit's Document.
 
@@ -248,6 +598,44 @@ class AwsCompleter(Completer):
             A list of string completions.
         """
         text = self.replace_shortcut(document.text)
+        key = tuple(text.split())
+        if not key:
+            return []
+        completions = self.command_tree.complete(text)
+        if completions is not None:
+            return completions
+        with self._aws_cli_lock:
+            completions = self._aws_cli_completions.pop(key, None)
+            if completions is None:
+                try:
+                    completions = self._complete_aws_cli(text)
+                except Exception as e:
+                    self.log_exception(e, traceback)
+                    return []
+            self._aws_cli_completions[key] = completions
+            while len(self._aws_cli_completions) > \
+                    self.MAX_AWS_CLI_COMPLETIONS:
+                self._aws_cli_completions.popitem(last=False)
+        return list(completions)
+
+    def _complete_aws_cli(self, text):
+        """Calls the awscli completer for the text.
+
+        The awscli's Completer class returns its completions.  A single
+        instance is created and reused, creating one loads the awscli's
+        command table.  Older awscli versions only provide a complete
+        function that prints the completions, which are then captured.
+
+        Args:
+            * text: A string representing the command text, with shortcuts
+                replaced.
+
+        Returns:
+            A list of string completions.
+        """
+        aws_cli_completer = self._get_aws_cli_completer()
+        if aws_cli_completer is not None:
+            return list(aws_cli_completer.complete(text, len(text)))
         # Redirect stdout to a string so we can capture the AWS CLI
         # autocompleter results
         # See: http://stackoverflow.com/a/1218951
@@ -255,16 +643,51 @@ class AwsCompleter(Completer):
         sys.stdout = mystdout = cStringIO()
         try:
             self.aws_completer.complete(text, len(text))
-        except Exception as e:
-            self.log_exception(e, traceback)
-        sys.stdout = old_stdout
+        finally:
+            sys.stdout = old_stdout
         aws_completer_results = mystdout.getvalue()
         # Tidy up the completions and store it in a list
         aws_completer_results = re.sub('\n', '', aws_completer_results)
-        aws_completer_results_list = aws_completer_results.split()
-        return aws_completer_results_list
+        return aws_completer_results.split()
+
+    def _refresh_expired_resource(self, option):
+        """Refreshes the resource for the option if its TTL has passed.
+
+        The refresh runs in the background, the current completions are
+        shown until the new ones are swapped in.
+
+        Args:
+            * option: A string representing the resource option, such as
+                '--instance-ids'.
+
+        Returns:
+            None.
+        """
+        self.resources.refresh_expired(option,
+                                       on_progress=self.on_refresh_progress)
+
+    def _get_aws_cli_completer(self):
+        """Gets the shared awscli Completer, creating it on first use.
+
+        Called with _aws_cli_lock held.
 
-    def _get_custom_completions(self, words, word_before_cursor, mapping):
+        Args:
+            * None.
+
+        Returns:
+            An instance of the awscli's Completer, or None if the awscli
+                only provides the complete function.
+        """
+        if self.aws_completer is None:
+            from awscli import completer as awscli_completer
+            self.aws_completer = awscli_completer
+        if self._aws_cli_completer is None and \
+                hasattr(self.aws_completer, 'Completer'):
+            self._aws_cli_completer = self.aws_completer.Completer()
+        return self._aws_cli_completer
+
+    def _get_custom_completions(self, words, word_before_cursor, mapping,
+                                on_match=None, should_stop=None):
         """Get custom completions resources, options, etc.
 
         Completions for all enabled AWS resources, global options,
@@ -278,6 +701,9 @@ class AwsCompleter(Completer):
                 Example:
                     key: --bucket,    value: list of bucket names
                     key: --ec2-state, value: list of ec2 states
+            * on_match: A callable called with the matched key.
+            * should_stop: A callable returning True to give up fuzzy
+                matching for prefix matching, or None.
 
         Returns:
             A generator of prompt_toolkit's Completion objects, containing
@@ -290,7 +716,10 @@ class AwsCompleter(Completer):
                     ._get_resource_completions(words,
                                                word_before_cursor,
                                                key,
-                                               value)
+                                               value,
+                                               should_stop)
+                if completions is not None and on_match is not None:
+                    on_match(key)
             else:
                 break
         return completions
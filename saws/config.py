@@ -40,6 +40,22 @@ class Config(object):
         * FUZZY: A string that represents the config fuzzy matching mode.
         * SHORTCUT: A string that represents the config shortcut matching
              mode.
+        * RESOURCE_BACKEND: A string that represents the config backend
+            used to query AWS resources.
+        * RESOURCE_REGIONS: A string that represents the config regions
+            instance completions are queried from.
+        * INVENTORY_PROFILES: A string that represents the config profiles
+            merged in inventory mode.
+        * AWS_WORKER: A string that represents the config mode running aws
+            commands in a long-lived awscli process.
+        * RESULT_CACHE_TTL: A string that represents the config number of
+            seconds the output of read-only aws commands is cached for.
+        * COMPLETION_LATENCY_BUDGET: A string that represents the config
+            number of milliseconds completions may take before fuzzy
+            matching falls back to prefix matching.
+        * SHORTCUTS_TEMPLATE: A string that represents the shortcuts
+            template file name.
+        * SHORTCUTS_PATH: A string that represents the shortcuts file path.
     """
 
     SHORTCUTS = 'shortcuts'
@@ -50,6 +66,14 @@ class Config(object):
     COLOR = 'color_output'
     FUZZY = 'fuzzy_match'
     SHORTCUT = 'shortcut_match'
+    RESOURCE_BACKEND = 'resource_backend'
+    RESOURCE_REGIONS = 'resource_regions'
+    INVENTORY_PROFILES = 'inventory_profiles'
+    AWS_WORKER = 'aws_worker'
+    RESULT_CACHE_TTL = 'result_cache_ttl'
+    COMPLETION_LATENCY_BUDGET = 'completion_latency_budget'
+    SHORTCUTS_TEMPLATE = 'saws.shortcuts'
+    SHORTCUTS_PATH = '~/.saws.shortcuts'
 
     def get_shortcuts(self, config_obj):
         """Gets the shortcuts from the specified config.
@@ -61,11 +85,26 @@ class Config(object):
             An OrderedDict containing the shortcut commands as the keys and
             their corresponding full commands as the values.
         """
-        shortcut_config_obj = self.read_configuration('saws.shortcuts',
-                                                      '~/.saws.shortcuts')
+        shortcut_config_obj = self.read_configuration(self.SHORTCUTS_TEMPLATE,
+                                                      self.SHORTCUTS_PATH)
         return OrderedDict(zip(shortcut_config_obj[self.SHORTCUTS].keys(),
                                shortcut_config_obj[self.SHORTCUTS].values()))
 
+    def get_list(self, config_obj, key):
+        """Gets a comma separated list from the main section of the config.
+
+        Args:
+            * config_obj: An instance of ConfigObj.
+            * key: A string representing the config key.
+
+        Returns:
+            A list of strings, empty if the key is not set.
+        """
+        value = config_obj[self.MAIN].get(key) or []
+        if not isinstance(value, (list, tuple)):
+            value = value.split(',')
+        return [item.strip() for item in value if item.strip()]
+
     def read_configuration(self, config_template=None, config_path=None):
         """Reads the config file if it exists, else reads the default config.
 
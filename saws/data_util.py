@@ -15,7 +15,8 @@
 
 from __future__ import unicode_literals
 from __future__ import print_function
-import re
+import os
+from itertools import islice, repeat
 try:
     from collections import OrderedDict
 except:
@@ -62,22 +63,115 @@ class DataUtil(object):
             A list, where each element is a list of completions for each
                 data_type
         """
+        data_lists, _ = self.read_data(data_file_path,
+                                       header_to_type_map,
+                                       data_type)
+        return data_lists
+
+    def read_data(self, data_file_path, header_to_type_map, data_type):
+        """Reads the data and the header values from the data file.
+
+        The file is read in a single pass.  Headers are looked up in a dict
+        instead of testing every header against every line, and the count
+        written in each header is used to read its data lines in one slice,
+        without checking them for headers, into a list grown once to hold
+        them.  Lines past the count, if the count is missing or too small,
+        are read one at a time.
+
+        Args:
+            * data_file_path: A string representing the full file path of
+                the data file.
+            * header_to_type_map: A dictionary mapping the data header labels
+                 to the data types.
+            * data_type: An Enum specifying the data type.
+
+        Returns:
+            A tuple of two lists, each with an element for each data_type:
+                * A sorted list of completions.
+                * A list of strings following the count in the header.
+        """
+        header_dispatch = self._create_header_dispatch(header_to_type_map)
         data_lists = [[] for x in range(data_type.NUM_TYPES.value)]
+        header_values = [[] for x in range(data_type.NUM_TYPES.value)]
+        # Lines before the first header do not belong to any data type
+        data_list = []
         with open(data_file_path) as f:
+            # A file can not have more lines than bytes, which bounds the
+            # storage reserved for a corrupt count
+            max_lines = os.fstat(f.fileno()).st_size
             for line in f:
-                line = re.sub('\n', '', line)
-                parsing_header = False
-                # Check if we are reading in a data header to determine
-                # which set of data we are parsing
-                for key, value in header_to_type_map.items():
-                    if key in line:
-                        data_type = value
-                        parsing_header = True
-                        break
-                if not parsing_header:
+                line = line.rstrip('\n')
+                header, separator, values = line.partition(': ')
+                if not separator:
+                    header = line.rstrip(':')
+                current_type = header_dispatch.get(header)
+                if current_type is None:
                     # Store the data in its associated list
-                    if line.strip() != '':
-                        data_lists[data_type.value].append(line)
-            for data_list in data_lists:
-                data_list.sort()
-        return data_lists
+                    if line.strip():
+                        data_list.append(line)
+                    continue
+                data_list = data_lists[current_type.value]
+                words = values.split()
+                header_values[current_type.value] = words[1:]
+                if words and words[0].isdigit():
+                    self._read_lines(f, min(int(words[0]), max_lines),
+                                     data_list)
+        for data_list in data_lists:
+            # Data files are written sorted, sorting a sorted list only
+            # takes a single pass over it
+            data_list.sort()
+        return data_lists, header_values
+
+    def _read_lines(self, lines, count, data_list):
+        """Reads count lines into the data list, skipping blank lines.
+
+        The list is grown by count slots at once, the lines are stored in
+        place and the unused slots removed.
+
+        Args:
+            * lines: An iterator of lines, such as a file.
+            * count: An int representing the number of lines to read.
+            * data_list: A list to append the lines to.
+
+        Returns:
+            None.
+        """
+        end = len(data_list)
+        data_list.extend(repeat(None, count))
+        for line in islice(lines, count):
+            line = line.rstrip('\n')
+            if line.strip():
+                data_list[end] = line
+                end += 1
+        del data_list[end:]
+
+    def _create_header_dispatch(self, header_to_type_map):
+        """Creates a dict mapping header names to data types.
+
+        Headers are given with or without their trailing colon, such as
+        '[commands]: ' or '[--instance-ids]', the names are the headers
+        without it.
+
+        Args:
+            * header_to_type_map: A dictionary mapping the data header labels
+                 to the data types.
+
+        Returns:
+            A dict mapping header names to data types.
+        """
+        return dict((self._get_header_name(header), header_type)
+                    for header, header_type in header_to_type_map.items())
+
+    def _get_header_name(self, header):
+        """Gets the header name, without its trailing colon.
+
+        Args:
+            * header: A string representing the header.
+
+        Returns:
+            A string representing the header name.
+        """
+        header = header.strip()
+        if header.endswith(':'):
+            header = header[:-1]
+        return header
@@ -0,0 +1,364 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2015 Donne Martin. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+
+from __future__ import unicode_literals
+from __future__ import print_function
+import heapq
+import re
+
+numpy = None
+
+
+def import_numpy():
+    """Imports numpy the first time it is needed.
+
+    numpy is optional, and importing it would slow down starting saws.
+
+    Args:
+        * None.
+
+    Returns:
+        The numpy module, or None if it is not installed.
+    """
+    global numpy
+    if numpy is None:
+        try:
+            import numpy as numpy_module
+        except ImportError:
+            return None
+        numpy = numpy_module
+    return numpy
+
+
+class FuzzyMatcher(object):
+    """Case-insensitive fuzzy matcher over a collection of completions.
+
+    Adapted from: https://github.com/amjith/fuzzyfinder.
+
+    A string matches if it contains the characters of the query in order.
+    Matches are ranked by the length of the shortest match, then by where
+    the match starts, then alphabetically.
+
+    The collection is lowercased once.  While the user keeps typing, each
+    query extends the previous one, so only the previous query's matches
+    are searched again.
+
+    Attributes:
+        * MAX_PATTERNS: An int representing the number of compiled query
+            patterns to keep.
+        * STOP_CHECK_INTERVAL: An int representing the number of strings
+            matched between calls to find()'s should_stop.
+        * NUMPY_MIN_SIZE: An int representing the smallest collection
+            create() matches with numpy, if it is installed.
+        * collection: A list of the collection's strings.
+        * lowered: A list of the collection's strings, lowercased.
+    """
+
+    MAX_PATTERNS = 64
+    STOP_CHECK_INTERVAL = 512
+    NUMPY_MIN_SIZE = 10000
+
+    @classmethod
+    def create(cls, collection):
+        """Creates the fuzzy matcher best suited to the collection.
+
+        Args:
+            * collection: A collection of strings to match.
+
+        Returns:
+            An instance of NumpyFuzzyMatcher if numpy is installed and the
+                collection has at least NUMPY_MIN_SIZE strings, otherwise
+                an instance of FuzzyMatcher.
+        """
+        if len(collection) >= cls.NUMPY_MIN_SIZE and \
+                import_numpy() is not None:
+            return NumpyFuzzyMatcher(collection)
+        return FuzzyMatcher(collection)
+
+    def __init__(self, collection):
+        """Initializes FuzzyMatcher.
+
+        Args:
+            * collection: A collection of strings to match.
+
+        Returns:
+            None.
+        """
+        self.collection = list(collection)
+        self.lowered = [item.lower() for item in self.collection]
+        self._patterns = {}
+        self._last_match = ('', range(len(self.collection)))
+
+    def __len__(self):
+        """Gets the number of strings to match.
+
+        Args:
+            * None.
+
+        Returns:
+            An int representing the number of strings to match.
+        """
+        return len(self.collection)
+
+    def find(self, text, limit=None, should_stop=None):
+        """Finds the strings fuzzy matching the text, best matches first.
+
+        Args:
+            * text: A string which is typically entered by a user.
+            * limit: An int representing the maximum number of matches to
+                return, or None to return all of them.
+            * should_stop: A callable returning True to give up matching,
+                called after every STOP_CHECK_INTERVAL strings, or None.
+                Collections smaller than STOP_CHECK_INTERVAL are always
+                matched.
+
+        Returns:
+            A list of matching strings, or None if matching was given up.
+        """
+        text = text.lower()
+        last_text, candidates = self._last_match
+        if not text.startswith(last_text):
+            candidates = range(len(self.collection))
+        regex = self._get_pattern(text)
+        ranked = []
+        matched = []
+        for count, index in enumerate(candidates):
+            if should_stop is not None and count and \
+                    count % self.STOP_CHECK_INTERVAL == 0 and should_stop():
+                return None
+            r = regex.search(self.lowered[index])
+            if r:
+                matched.append(index)
+                ranked.append((len(r.group()), r.start(),
+                               self.collection[index]))
+        self._last_match = (text, matched)
+        if limit is None:
+            ranked.sort()
+        else:
+            ranked = heapq.nsmallest(limit, ranked)
+        return [item for _, _, item in ranked]
+
+    def _get_pattern(self, text):
+        """Gets the compiled pattern for the text.
+
+        Args:
+            * text: A lowercase string to match.
+
+        Returns:
+            A compiled regex matching the characters of text in order.
+        """
+        regex = self._patterns.get(text)
+        if regex is None:
+            if len(self._patterns) >= self.MAX_PATTERNS:
+                self._patterns.clear()
+            regex = re.compile('.*?'.join(map(re.escape, text)))
+            self._patterns[text] = regex
+        return regex
+
+
+class NumpyFuzzyMatcher(FuzzyMatcher):
+    """Fuzzy matcher scoring all of the collection at once with numpy.
+
+    Requires numpy, which is optional.  Matching hundreds of thousands of
+    bucket URIs or instance ids one regex search at a time takes longer
+    than a keystroke, this matcher matches them in a few array operations
+    per character of the query.
+
+    The lowercased strings are packed once into one buffer of code points,
+    with the offset of each string.  The positions of each character in the
+    buffer are found the first time the character is queried, and kept for
+    up to MAX_PATTERNS characters.  Matching a
+    query character then bisects those positions for the next occurrence
+    after each candidate's last matched character, and drops the
+    candidates with none left in their string.
+
+    Matching the first occurrence of each character, starting from the
+    first occurrence of the query's first character, finds the same match
+    as FuzzyMatcher's lazy regex, so matches are ranked the same way.
+    Strings with a newline, which the regex does not match across, are
+    checked with the regex.
+
+    Attributes:
+        * buffer: A numpy array of the code points of the lowercased
+            strings, one after the other.
+        * offsets: A numpy array of the offset of each string in buffer,
+            followed by the length of buffer.
+        * ranks: A numpy array of the position of each string in the
+            sorted collection.
+        * multiline: A numpy array of booleans that specify whether each
+            string contains a newline.
+        * max_length: An int representing the length of the longest string.
+    """
+
+    def __init__(self, collection):
+        """Initializes NumpyFuzzyMatcher.
+
+        Args:
+            * collection: A collection of strings to match.
+
+        Returns:
+            None.
+        """
+        import_numpy()
+        super(NumpyFuzzyMatcher, self).__init__(collection)
+        lengths = numpy.array([len(item) for item in self.lowered],
+                              dtype=numpy.int64)
+        self.max_length = int(lengths.max()) if len(lengths) else 0
+        self.offsets = numpy.zeros(len(lengths) + 1, dtype=numpy.int64)
+        numpy.cumsum(lengths, out=self.offsets[1:])
+        self.buffer = numpy.frombuffer(
+            ''.join(self.lowered).encode('utf-32-le'), dtype='<u4')
+        order = sorted(range(len(self.collection)),
+                       key=self.collection.__getitem__)
+        self.ranks = numpy.empty(len(order), dtype=numpy.int64)
+        self.ranks[order] = numpy.arange(len(order))
+        self.multiline = numpy.array(['\n' in item for item in self.lowered],
+                                     dtype=bool)
+        self._positions = {}
+        self._last_match = ('', numpy.arange(len(self.collection)))
+
+    def find(self, text, limit=None, should_stop=None):
+        """Finds the strings fuzzy matching the text, best matches first.
+
+        Args:
+            * text: A string which is typically entered by a user.
+            * limit: An int representing the maximum number of matches to
+                return, or None to return all of them.
+            * should_stop: A callable returning True to give up matching,
+                called before matching each character of the text, or
+                None.  Fewer than STOP_CHECK_INTERVAL candidates are always
+                matched.
+
+        Returns:
+            A list of matching strings, or None if matching was given up.
+        """
+        text = text.lower()
+        last_text, candidates = self._last_match
+        if not text.startswith(last_text):
+            candidates = numpy.arange(len(self.collection))
+        starts = self.offsets[candidates]
+        ends = self.offsets[candidates + 1]
+        first = starts
+        position = starts
+        for count, char in enumerate(text):
+            if should_stop is not None and count and \
+                    len(candidates) >= self.STOP_CHECK_INTERVAL and \
+                    should_stop():
+                return None
+            found, matched = self._find_next(char, position, ends)
+            candidates = candidates[found]
+            starts = starts[found]
+            ends = ends[found]
+            first = matched if count == 0 else first[found]
+            position = matched + 1
+        lengths = position - first
+        first -= starts
+        if text and self.multiline[candidates].any():
+            candidates, lengths, first = self._match_multiline(
+                text, candidates, lengths, first)
+        self._last_match = (text, candidates)
+        order = self._rank(candidates, lengths, first, limit)
+        return [self.collection[index] for index in candidates[order]]
+
+    def _get_positions(self, char):
+        """Gets the positions of the character in the buffer.
+
+        Args:
+            * char: A string representing a lowercase character.
+
+        Returns:
+            A sorted numpy array of the character's positions in buffer.
+        """
+        positions = self._positions.get(char)
+        if positions is None:
+            if len(self._positions) >= self.MAX_PATTERNS:
+                self._positions.clear()
+            positions = numpy.flatnonzero(self.buffer == ord(char))
+            self._positions[char] = positions
+        return positions
+
+    def _find_next(self, char, position, ends):
+        """Finds the next occurrence of the character in each string.
+
+        Args:
+            * char: A string representing a lowercase character.
+            * position: A numpy array of the position in buffer to search
+                each string from.
+            * ends: A numpy array of the position in buffer following each
+                string.
+
+        Returns:
+            A tuple of a numpy array of booleans that specify whether the
+                character occurs in each string, and a numpy array of its
+                position in buffer for the strings it occurs in.
+        """
+        positions = self._get_positions(char)
+        if not len(positions):
+            return numpy.zeros(len(position), dtype=bool), position[:0]
+        index = numpy.searchsorted(positions, position)
+        matched = positions[numpy.minimum(index, len(positions) - 1)]
+        found = (index < len(positions)) & (matched < ends)
+        return found, matched[found]
+
+    def _match_multiline(self, text, candidates, lengths, offsets):
+        """Matches the strings with a newline with the regex.
+
+        Args:
+            * text: A lowercase string to match.
+            * candidates: A numpy array of the indexes of the matches.
+            * lengths: A numpy array of the length of each match.
+            * offsets: A numpy array of where each match starts.
+
+        Returns:
+            A tuple of candidates, lengths and offsets, with the strings the
+                regex does not match removed and the others matched by it.
+        """
+        regex = self._get_pattern(text)
+        found = numpy.ones(len(candidates), dtype=bool)
+        for i in numpy.flatnonzero(self.multiline[candidates]):
+            r = regex.search(self.lowered[candidates[i]])
+            if r:
+                lengths[i] = len(r.group())
+                offsets[i] = r.start()
+            else:
+                found[i] = False
+        return candidates[found], lengths[found], offsets[found]
+
+    def _rank(self, candidates, lengths, offsets, limit):
+        """Orders the matches like FuzzyMatcher's sort.
+
+        Matches are ordered by length, then by where they start, then by
+        the string's rank in the sorted collection.
+
+        Args:
+            * candidates: A numpy array of the indexes of the matches.
+            * lengths: A numpy array of the length of each match.
+            * offsets: A numpy array of where each match starts.
+            * limit: An int representing the maximum number of matches to
+                return, or None to return all of them.
+
+        Returns:
+            A numpy array of positions in candidates, best matches first.
+        """
+        ranks = self.ranks[candidates]
+        size = self.max_length + 1
+        if limit is None or limit >= len(candidates) or \
+                size * size * len(self.collection) >= 2 ** 62:
+            order = numpy.lexsort((ranks, offsets, lengths))
+            return order[:limit]
+        # Select the top matches on a single key rather than sorting all
+        keys = (lengths * size + offsets) * len(self.collection) + ranks
+        top = numpy.argpartition(keys, limit - 1)[:limit]
+        return top[numpy.argsort(keys[top])]
@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2015 Donne Martin. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+
+from __future__ import unicode_literals
+from __future__ import print_function
+import codecs
+import re
+import pygments
+from pygments.formatters import Terminal256Formatter
+from pygments.lexer import RegexLexer
+from pygments.lexers import JsonLexer
+from pygments.token import Keyword, Number, Punctuation, String, Text
+
+
+class AwsTableLexer(RegexLexer):
+    """Provides highlighting for the awscli's `--output table` format.
+
+    Attributes:
+        * tokens: A dictionary of pygments tokens.
+    """
+
+    name = 'AWS CLI Table'
+    flags = re.MULTILINE
+
+    tokens = {
+        'root': [
+            (r'^[-+|]+$', Punctuation),
+            (r'[|+]', Punctuation),
+            (r'\s+', Text),
+            (r'-?\d+(\.\d+)?(?=\s*\|)', Number),
+            (r'(True|False|None)(?=\s*\|)', Keyword.Constant),
+            (r'[^|\s]+', String),
+        ]
+    }
+
+
+class OutputHighlighter(object):
+    """Highlights the output of aws commands in-process.
+
+    The lexers and formatter are built once and shared by every command.
+    The lexer is picked from the first characters of the output, output
+    that is neither json nor a table, such as `--output text`, is not
+    highlighted.
+
+    Attributes:
+        * formatter: An instance of pygments' Terminal256Formatter.
+        * lexers: A dict mapping JSON and TABLE to their pygments lexers.
+    """
+
+    JSON = 'json'
+    TABLE = 'table'
+
+    def __init__(self, style='default'):
+        """Initializes OutputHighlighter.
+
+        Args:
+            * style: A string representing the name of the pygments style.
+
+        Returns:
+            None.
+        """
+        self.formatter = Terminal256Formatter(style=style)
+        # Lines are highlighted one chunk at a time, keep their newlines as
+        # they are
+        self.lexers = {
+            self.JSON: JsonLexer(stripnl=False, ensurenl=False),
+            self.TABLE: AwsTableLexer(stripnl=False, ensurenl=False),
+        }
+
+    def get_lexer(self, text):
+        """Gets the lexer for the output starting with the text.
+
+        Args:
+            * text: A string representing the start of the output.
+
+        Returns:
+            A pygments lexer, or None if the output is not highlighted.
+        """
+        first = text.lstrip()[:1]
+        if first in ('{', '['):
+            return self.lexers[self.JSON]
+        if first in ('-', '+', '|'):
+            return self.lexers[self.TABLE]
+        return None
+
+    def highlight(self, lexer, text):
+        """Highlights the text.
+
+        Args:
+            * lexer: A pygments lexer.
+            * text: A string representing complete lines of output.
+
+        Returns:
+            A string representing the text with terminal escape codes.
+        """
+        return pygments.format(lexer.get_tokens(text), self.formatter)
+
+    def create_stream(self, out, encoding=None):
+        """Creates a binary stream highlighting what is written to it.
+
+        Args:
+            * out: A binary file object the highlighted output is written to.
+            * encoding: A string representing the encoding of the output,
+                defaults to utf-8.
+
+        Returns:
+            An instance of HighlightedStream.
+        """
+        return HighlightedStream(self, out, encoding)
+
+
+class HighlightedStream(object):
+    """A binary file object highlighting the output written to it.
+
+    Complete lines are highlighted and written out as soon as they arrive,
+    so large outputs start showing without waiting for the command to
+    finish.  Partial lines are held until their newline, or until close().
+
+    Attributes:
+        * highlighter: An instance of OutputHighlighter.
+        * out: A binary file object the highlighted output is written to.
+        * encoding: A string representing the encoding of the output.
+        * lexer: The pygments lexer picked for the output, or None before
+            the output starts or if it is not highlighted.
+    """
+
+    def __init__(self, highlighter, out, encoding=None):
+        """Initializes HighlightedStream.
+
+        Args:
+            * highlighter: An instance of OutputHighlighter.
+            * out: A binary file object the highlighted output is written
+                to.
+            * encoding: A string representing the encoding of the output,
+                defaults to utf-8.
+
+        Returns:
+            None.
+        """
+        self.highlighter = highlighter
+        self.out = out
+        self.encoding = encoding or 'utf-8'
+        self.lexer = None
+        self._decoder = codecs.getincrementaldecoder('utf-8')('replace')
+        self._started = False
+        self._pending = ''
+
+    def write(self, data):
+        """Highlights and writes out the complete lines of the data.
+
+        Args:
+            * data: A bytes object representing a chunk of the output.
+
+        Returns:
+            An int representing the number of bytes consumed.
+        """
+        text = self._pending + self._decoder.decode(data)
+        self._pending = ''
+        if not self._started:
+            if not text.strip():
+                self._pending = text
+                return len(data)
+            self._started = True
+            self.lexer = self.highlighter.get_lexer(text)
+        if self.lexer is None:
+            self._write(text)
+            return len(data)
+        end = text.rfind('\n') + 1
+        self._pending = text[end:]
+        if end:
+            self._write(self.highlighter.highlight(self.lexer, text[:end]))
+        return len(data)
+
+    def flush(self):
+        """Flushes the output.
+
+        Args:
+            * None.
+
+        Returns:
+            None.
+        """
+        self.out.flush()
+
+    def close(self):
+        """Writes out the rest of the output.
+
+        The output itself is not closed.
+
+        Args:
+            * None.
+
+        Returns:
+            None.
+        """
+        text = self._pending + self._decoder.decode(b'', final=True)
+        self._pending = ''
+        if text:
+            if self.lexer is not None:
+                text = self.highlighter.highlight(self.lexer, text)
+            self._write(text)
+        self.flush()
+
+    def _write(self, text):
+        """Encodes and writes the text to the output.
+
+        Args:
+            * text: A string representing the text.
+
+        Returns:
+            None.
+        """
+        self.out.write(text.encode(self.encoding, 'replace'))
+        self.out.flush()
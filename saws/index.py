@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2015 Donne Martin. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+
+from __future__ import unicode_literals
+from __future__ import print_function
+from bisect import bisect_left
+import heapq
+
+
+class PrefixIndex(object):
+    """Case-insensitive prefix index over a collection of completions.
+
+    The collection is lowercased and sorted once.  A prefix lookup bisects
+    to the first match and reads the matches that follow, so it takes
+    O(log n + k) to find k matches instead of scanning the collection.
+
+    Matches are returned in the order of sorted(collection), the order the
+    completions have always been displayed in.
+
+    Attributes:
+        * names: A list of the collection's strings, sorted.
+        * keys: A list of (lowercase name, rank) tuples sorted by lowercase
+            name, where rank is the name's position in names.
+    """
+
+    def __init__(self, collection):
+        """Initializes PrefixIndex.
+
+        Args:
+            * collection: A collection of strings to index.
+
+        Returns:
+            None.
+        """
+        self.names = sorted(collection)
+        self.keys = sorted((name.lower(), rank)
+                           for rank, name in enumerate(self.names))
+
+    def __len__(self):
+        """Gets the number of indexed strings.
+
+        Args:
+            * None.
+
+        Returns:
+            An int representing the number of indexed strings.
+        """
+        return len(self.names)
+
+    def find_prefix(self, prefix, limit=None):
+        """Finds all indexed strings starting with the prefix, ignoring case.
+
+        With a limit, the first matches in sorted order are selected with a
+        heap, which takes O(k log limit) instead of sorting all k matches.
+
+        Args:
+            * prefix: A string representing the prefix to match.
+            * limit: An int representing the maximum number of matches to
+                return, or None to return all of them.
+
+        Returns:
+            A list of matching strings, in sorted order.
+        """
+        if not prefix:
+            return self.names[:limit]
+        prefix = prefix.lower()
+        ranks = self._find_ranks(bisect_left(self.keys, (prefix,)), prefix)
+        if limit is None:
+            ranks = sorted(ranks)
+        else:
+            ranks = heapq.nsmallest(limit, ranks)
+        return [self.names[rank] for rank in ranks]
+
+    def _find_ranks(self, index, prefix):
+        """Yields the ranks of the strings starting with the prefix.
+
+        Args:
+            * index: An int representing the position in keys of the first
+                string starting with the prefix.
+            * prefix: A lowercase string representing the prefix to match.
+
+        Yields:
+            An int for the rank of each matching string.
+        """
+        keys = self.keys
+        while index < len(keys) and keys[index][0].startswith(prefix):
+            yield keys[index][1]
+            index += 1
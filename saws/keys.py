@@ -117,16 +117,16 @@ class KeyManager(object):
             set_shortcut_match(not get_shortcut_match())
 
         @self.manager.registry.add_binding(Keys.F5)
-        def handle_f5(event):
-            """Refreshes AWS resources.
+        def handle_f5(_):
+            """Refreshes AWS resources in the background.
 
             Args:
-                * event: An instance of prompt_toolkit's Event.
+                * _: An instance of prompt_toolkit's Event (not used).
 
             Returns:
                 None.
             """
-            event.cli.run_in_terminal(refresh_resources_and_options)
+            refresh_resources_and_options()
 
         @self.manager.registry.add_binding(Keys.F9)
         def handle_f9(_):
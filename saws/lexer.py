@@ -13,42 +13,35 @@
 # ANY KIND, either express or implied. See the License for the specific
 # language governing permissions and limitations under the License.
 
+from __future__ import unicode_literals
+from __future__ import print_function
 from pygments.lexer import RegexLexer
 from pygments.lexer import words
 from pygments.token import Keyword, Name, Operator, Generic, Literal
 from .commands import AwsCommands
-from .config import Config
 
 
 class CommandLexer(RegexLexer):
     """Provides highlighting for commands.
 
+    The tokens depend on the commands and shortcuts, use create() to build
+    a lexer for them.  Reading them here, at import time, would read the
+    config and data files a second time on startup.
+
+    With a tokenizer, the text is split with the completer's Tokenizer and
+    each word is lexed on its own.  The lexed words are cached, so only the
+    word being typed is lexed on each keystroke.
+
     Attributes:
-        * config: An instance of Config.
-        * config_obj: An instance of ConfigObj.
-        * shortcuts: An OrderedDict containing the shortcut commands as the
-            keys and their corresponding full commands as the values.
-        * shortcut_tokens: A list containing words for each shortcut key:
-            key: 'aws ec2 ls' -> shortcut_tokens: ['aws', 'ec2', 'ls'].
-        * aws_commands: An instance of AwsCommands.
-        * commands: A tuple, where each tuple element is a list of:
-            * commands
-            * sub_commands
-            * global_options
-            * resource_options
         * tokens: A dictionary of pygments tokens.
+        * TOKEN_TYPES: A list of the pygments token types of the words
+            matched by each pattern, in order.
+        * MAX_CACHED_WORDS: An int representing the number of lexed words
+            cached.
+        * tokenizer: An instance of Tokenizer shared with the completer, or
+            None to lex the whole text with the patterns.
     """
 
-    config = Config()
-    config_obj = config.read_configuration()
-    shortcuts = config.get_shortcuts(config_obj)
-    shortcut_tokens = []
-    for shortcut in shortcuts.keys():
-        tokens = shortcut.split()
-        for token in tokens:
-            shortcut_tokens.append(token)
-    aws_commands = AwsCommands()
-    commands = aws_commands.all_commands
     tokens = {
         'root': [
             (words(
@@ -56,35 +49,156 @@ class CommandLexer(RegexLexer):
                 prefix=r'\b',
                 suffix=r'\b'),
              Literal.String),
-            (words(
-                tuple([AwsCommands.AWS_DOCS]),
-                prefix=r'\b',
-                suffix=r'\b'),
-             Literal.Number),
-            (words(
-                tuple(commands[AwsCommands.CommandType.COMMANDS.value]),
-                prefix=r'\b',
-                suffix=r'\b'),
-             Name.Class),
-            (words(
-                tuple(commands[AwsCommands.CommandType.SUB_COMMANDS.value]),
-                prefix=r'\b',
-                suffix=r'\b'),
-             Keyword.Declaration),
-            (words(
-                tuple(commands[AwsCommands.CommandType.GLOBAL_OPTIONS.value]),
-                prefix=r'',
-                suffix=r'\b'),
-             Generic.Output),
-            (words(
-                tuple(commands[AwsCommands.CommandType.RESOURCE_OPTIONS.value]),
-                prefix=r'',
-                suffix=r'\b'),
-             Operator.Word),
-            (words(
-                tuple(shortcut_tokens),
-                prefix=r'',
-                suffix=r'\b'),
-             Name.Exception),
         ]
     }
+
+    MAX_CACHED_WORDS = 1024
+    tokenizer = None
+
+    TOKEN_TYPES = [
+        Literal.String,
+        Literal.Number,
+        Name.Class,
+        Keyword.Declaration,
+        Generic.Output,
+        Operator.Word,
+        Name.Exception,
+    ]
+
+    def __init__(self, **options):
+        """Initializes CommandLexer.
+
+        Args:
+            * options: A dict of pygments lexer options.
+
+        Returns:
+            None.
+        """
+        super(CommandLexer, self).__init__(**options)
+        self._word_tokens = {}
+
+    def get_tokens_unprocessed(self, text, stack=('root',)):
+        """Lexes the text one word at a time.
+
+        The patterns match within words, lexing each word on its own gives
+        the same tokens as lexing the whole text.
+
+        Args:
+            * text: A string representing the command text.
+            * stack: A tuple of the lexer's initial states.
+
+        Yields:
+            Tuples of the position, pygments token type and text of each
+                token.
+        """
+        if self.tokenizer is None:
+            for token in RegexLexer.get_tokens_unprocessed(self, text, stack):
+                yield token
+            return
+        position = 0
+        for word in self.tokenizer.tokenize(text):
+            for token in self._lex_word(text, position, word.start, stack):
+                yield token
+            for token in self._lex_word(text, word.start, word.end, stack):
+                yield token
+            position = word.end
+        for token in self._lex_word(text, position, len(text), stack):
+            yield token
+
+    def _lex_word(self, text, start, end, stack):
+        """Lexes a word or the whitespace between words, with the cache.
+
+        Args:
+            * text: A string representing the command text.
+            * start: An int representing the position of the word.
+            * end: An int representing the position following the word.
+            * stack: A tuple of the lexer's initial states.
+
+        Returns:
+            A list of tuples of the position, pygments token type and text
+                of each token.
+        """
+        if start >= end:
+            return []
+        word = text[start:end]
+        tokens = self._word_tokens.get(word)
+        if tokens is None:
+            tokens = list(RegexLexer.get_tokens_unprocessed(self, word, stack))
+            if len(self._word_tokens) >= self.MAX_CACHED_WORDS:
+                self._word_tokens.clear()
+            self._word_tokens[word] = tokens
+        return [(start + offset, token_type, value)
+                for offset, token_type, value in tokens]
+
+    @classmethod
+    def get_patterns(cls, shortcuts, commands):
+        """Gets the regexes matching the commands and shortcuts.
+
+        Optimizing the regexes for thousands of words is most of the time
+        it takes to create a lexer, so the patterns can be stored in the
+        startup snapshot and passed to create().
+
+        Args:
+            * shortcuts: An OrderedDict containing the shortcut commands as
+                the keys and their corresponding full commands as the
+                values.
+            * commands: A tuple, where each tuple element is a list of:
+                * commands
+                * sub_commands
+                * global_options
+                * resource_options
+
+        Returns:
+            A list of regex strings, one for each of TOKEN_TYPES.  The regex
+                is empty if there are no words to match, a regex built from
+                no words would match the empty string at every word boundary.
+        """
+        shortcut_tokens = []
+        for shortcut in shortcuts.keys():
+            tokens = shortcut.split()
+            for token in tokens:
+                shortcut_tokens.append(token)
+        command_type = AwsCommands.CommandType
+        word_lists = [
+            (tuple([AwsCommands.AWS_COMMAND]), r'\b'),
+            (tuple([AwsCommands.AWS_DOCS]), r'\b'),
+            (tuple(commands[command_type.COMMANDS.value]), r'\b'),
+            (tuple(commands[command_type.SUB_COMMANDS.value]), r'\b'),
+            (tuple(commands[command_type.GLOBAL_OPTIONS.value]), r''),
+            (tuple(commands[command_type.RESOURCE_OPTIONS.value]), r''),
+            (tuple(shortcut_tokens), r''),
+        ]
+        return [words(word_list, prefix=prefix, suffix=r'\b').get()
+                if word_list else ''
+                for word_list, prefix in word_lists]
+
+    @classmethod
+    def create(cls, shortcuts=None, commands=None, patterns=None,
+               tokenizer=None):
+        """Creates a CommandLexer class for the commands and shortcuts.
+
+        Args:
+            * shortcuts: An OrderedDict containing the shortcut commands as
+                the keys and their corresponding full commands as the
+                values.
+            * commands: A tuple, where each tuple element is a list of:
+                * commands
+                * sub_commands
+                * global_options
+                * resource_options
+            * patterns: A list of regex strings as returned by
+                get_patterns(), used instead of shortcuts and commands.
+            * tokenizer: An instance of Tokenizer shared with the completer,
+                or None.
+
+        Returns:
+            A subclass of CommandLexer.
+        """
+        if patterns is None:
+            patterns = cls.get_patterns(shortcuts, commands)
+        tokens = {
+            'root': [(pattern, token_type) for pattern, token_type
+                     in zip(patterns, cls.TOKEN_TYPES) if pattern],
+        }
+        return type(str('CommandLexer'), (cls,), {'tokens': tokens,
+                                                  'tokenizer': tokenizer})
@@ -17,8 +17,6 @@ from __future__ import unicode_literals
 from __future__ import print_function
 from enum import Enum
 import os
-from awscli.customizations.emr.constants import LIST_CLUSTERS_ACTIVE_STATES, \
-    LIST_CLUSTERS_TERMINATED_STATES, LIST_CLUSTERS_FAILED_STATES
 from .data_util import DataUtil
 
 
@@ -46,9 +44,10 @@ class AwsOptions(object):
         * header_to_type_map: A dict mapping headers as they appear in the
             OPTIONS.txt file to their corresponding OptionType.
         * ec2_states: A list of the possible EC2 instance states.
-        * cluster_states: A list of the possible cluster states.
+        * cluster_states: A list of the possible cluster states, read from
+            the awscli on first use.
         * options_map: A dict mapping of options keywords and
-            options to complete
+            options to complete, built on first use.
     """
 
     class OptionType(Enum):
@@ -67,12 +66,15 @@ class AwsOptions(object):
     OPTIONS_PATH = os.path.join(OPTIONS_DIR, 'data/OPTIONS.txt')
 
     def __init__(self,
-                 all_commands):
+                 all_commands,
+                 ec2_states=None):
         """Initializes AwsResources.
 
         Args:
             * all_commands: A list of all commands, sub_commands, options, etc
                 from data/SOURCES.txt.
+            * ec2_states: A list of the possible EC2 instance states.
+                Defaults to reading them from data/OPTIONS.txt.
 
         Returns:
             None.
@@ -85,14 +87,60 @@ class AwsOptions(object):
         self.header_to_type_map = self.data_util.create_header_to_type_map(
             headers=self.option_headers,
             data_type=self.OptionType)
-        self.ec2_states, _ = DataUtil().get_data(self.OPTIONS_PATH,
-                                                 self.header_to_type_map,
-                                                 self.OptionType)
-        self.cluster_states = self._generate_cluster_states()
-        self.options_map = dict(zip([self.EC2_STATE_OPT,
-                                     self.CLUSTER_STATE_OPT],
-                                    [self.ec2_states,
-                                     self.cluster_states]))
+        if ec2_states is None:
+            ec2_states, _ = DataUtil().get_data(self.OPTIONS_PATH,
+                                                self.header_to_type_map,
+                                                self.OptionType)
+        self.ec2_states = ec2_states
+        self._cluster_states = None
+        self._options_map = None
+
+    @property
+    def cluster_states(self):
+        """Gets the cluster states, reading them from the awscli if needed.
+
+        The awscli's emr customizations import botocore, so they are only
+        imported once the states are needed instead of on startup.
+
+        Args:
+            * None.
+
+        Returns:
+            A list containing all cluster states.
+        """
+        if self._cluster_states is None:
+            self._cluster_states = self._generate_cluster_states()
+        return self._cluster_states
+
+    @cluster_states.setter
+    def cluster_states(self, cluster_states):
+        """Sets the cluster states.
+
+        Args:
+            * cluster_states: A list containing all cluster states.
+
+        Returns:
+            None.
+        """
+        self._cluster_states = cluster_states
+        self._options_map = None
+
+    @property
+    def options_map(self):
+        """Gets the mapping of option keywords and options to complete.
+
+        Args:
+            * None.
+
+        Returns:
+            A dict mapping of options keywords and options to complete.
+        """
+        if self._options_map is None:
+            self._options_map = dict(zip([self.EC2_STATE_OPT,
+                                          self.CLUSTER_STATE_OPT],
+                                         [self.ec2_states,
+                                          self.cluster_states]))
+        return self._options_map
 
     def _make_options_header(self, option):
         """Creates the header string in OPTIONS.txt from the given option.
@@ -115,6 +163,9 @@ class AwsOptions(object):
         Returns:
             A list containing all cluster states.
         """
+        from awscli.customizations.emr.constants import \
+            LIST_CLUSTERS_ACTIVE_STATES, LIST_CLUSTERS_TERMINATED_STATES, \
+            LIST_CLUSTERS_FAILED_STATES
         cluster_states = []
         cluster_states.extend(LIST_CLUSTERS_ACTIVE_STATES)
         cluster_states.extend(LIST_CLUSTERS_TERMINATED_STATES)
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2015 Donne Martin. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+
+from __future__ import unicode_literals
+from __future__ import print_function
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, \
+    TimeoutError, wait
+
+
+class RefreshResult(object):
+    """Encapsulates the outcome of refreshing a single resource.
+
+    Attributes:
+        * resource: An instance of Resource that was refreshed.
+        * error: An Exception raised while querying the resource, or None
+            if the query succeeded.
+        * timed_out: A boolean that specifies whether the query exceeded
+            its timeout.
+        * started: A float representing the time the query started, or None
+            if the query has not started yet.
+        * elapsed: A float representing the query time in seconds, or None
+            if the query did not finish.
+    """
+
+    def __init__(self, resource):
+        """Initializes RefreshResult.
+
+        Args:
+            * resource: An instance of Resource.
+
+        Returns:
+            None.
+        """
+        self.resource = resource
+        self.error = None
+        self.timed_out = False
+        self.started = None
+        self.elapsed = None
+
+    @property
+    def succeeded(self):
+        """Determines whether the resource was refreshed successfully.
+
+        Args:
+            * None.
+
+        Returns:
+            A boolean that specifies whether the query finished without
+                errors.
+        """
+        return self.elapsed is not None and self.error is None
+
+
+class ResourceRefresher(object):
+    """Queries resources concurrently on a bounded worker pool.
+
+    Each resource query typically blocks on an `aws` subprocess, so running
+    them concurrently makes a refresh take roughly as long as the slowest
+    query instead of the sum of all queries.
+
+    A query that runs longer than the timeout is reported as timed out and
+    abandoned.  Its worker thread is not interrupted, it simply finishes in
+    the background.
+
+    Attributes:
+        * MAX_WORKERS: An int representing the default number of resources
+            to query at the same time.
+        * TIMEOUT: An int representing the default number of seconds a
+            single resource query may take.
+        * POLL_INTERVAL: A float representing how often, in seconds, to check
+            for timed out queries while none of them has started.
+        * log_exception: A callable log_exception from SawsLogger.
+        * max_workers: An int representing the number of resources to query
+            at the same time.
+        * timeout: A number representing the seconds a single resource
+            query may take.
+    """
+
+    MAX_WORKERS = 5
+    TIMEOUT = 60
+    POLL_INTERVAL = 0.1
+
+    def __init__(self, log_exception, max_workers=None, timeout=None):
+        """Initializes ResourceRefresher.
+
+        Args:
+            * log_exception: A callable log_exception from SawsLogger.
+            * max_workers: An int representing the number of resources to
+                query at the same time.
+            * timeout: A number representing the seconds a single resource
+                query may take.
+
+        Returns:
+            None.
+        """
+        self.log_exception = log_exception
+        self.max_workers = max_workers or self.MAX_WORKERS
+        self.timeout = timeout or self.TIMEOUT
+        self._lock = threading.Lock()
+
+    def refresh(self, resource_lists, on_progress=None):
+        """Queries all resources concurrently and waits for the results.
+
+        Args:
+            * resource_lists: A list of Resource instances to query.
+            * on_progress: A callable called with the number of finished
+                queries and the total number of queries whenever a query
+                finishes or times out.
+
+        Returns:
+            A list of RefreshResult, in the same order as resource_lists.
+        """
+        results = [RefreshResult(resource) for resource in resource_lists]
+        if not results:
+            return results
+        executor = ThreadPoolExecutor(
+            max_workers=min(self.max_workers, len(results)))
+        try:
+            futures = dict((executor.submit(self._query, result), result)
+                           for result in results)
+            pending = set(futures)
+            while pending:
+                num_pending = len(pending)
+                _, pending = wait(pending,
+                                  timeout=self._time_to_next_deadline(
+                                      [futures[f] for f in pending]),
+                                  return_when=FIRST_COMPLETED)
+                pending = self._expire(pending, futures)
+                if on_progress is not None and len(pending) != num_pending:
+                    on_progress(len(results) - len(pending), len(results))
+        finally:
+            # Do not block on abandoned queries
+            executor.shutdown(wait=False)
+        return results
+
+    def _query(self, result):
+        """Queries a single resource, called from a worker thread.
+
+        Args:
+            * result: An instance of RefreshResult to fill in.
+
+        Returns:
+            None.
+        """
+        with self._lock:
+            if result.timed_out:
+                return
+            result.started = time.time()
+        try:
+            result.resource.query_resource()
+        except Exception as e:
+            with self._lock:
+                result.error = e
+            self.log_exception(e, traceback)
+        with self._lock:
+            if not result.timed_out:
+                result.elapsed = time.time() - result.started
+
+    def _time_to_next_deadline(self, pending_results):
+        """Calculates how long to wait before checking for timeouts.
+
+        Args:
+            * pending_results: A list of RefreshResult still running or
+                waiting for a worker.
+
+        Returns:
+            A float representing the number of seconds to wait.
+        """
+        with self._lock:
+            deadlines = [result.started + self.timeout
+                         for result in pending_results
+                         if result.started is not None]
+        if not deadlines:
+            return self.POLL_INTERVAL
+        return max(0, min(deadlines) - time.time())
+
+    def _expire(self, pending, futures):
+        """Marks queries that ran past their timeout as timed out.
+
+        Args:
+            * pending: A set of Futures that have not completed.
+            * futures: A dict mapping Futures to their RefreshResult.
+
+        Returns:
+            A set of Futures that are still pending and have not timed out.
+        """
+        now = time.time()
+        still_pending = set()
+        with self._lock:
+            for future in pending:
+                result = futures[future]
+                if result.started is not None and \
+                        now - result.started >= self.timeout:
+                    result.timed_out = True
+                    result.error = TimeoutError(
+                        'Timed out refreshing ' + result.resource.OPTION)
+                else:
+                    still_pending.add(future)
+        return still_pending
@@ -0,0 +1,958 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2015 Donne Martin. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+
+from __future__ import unicode_literals
+from __future__ import print_function
+import json
+import os
+import random
+import subprocess
+import threading
+import time
+from abc import ABCMeta, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+
+
+class SharedFetch(object):
+    """Encapsulates a fetch whose result is shared by several resources.
+
+    The first resource to request a fetch runs it, the others wait for its
+    result instead of fetching the same data again.
+
+    Attributes:
+        * result: The fetched data, or None.
+        * error: An Exception raised while fetching, or None.
+    """
+
+    def __init__(self):
+        """Initializes SharedFetch.
+
+        Args:
+            * None.
+
+        Returns:
+            None.
+        """
+        self.result = None
+        self.error = None
+        self._done = threading.Event()
+
+    def set_result(self, result, error=None):
+        """Stores the fetch result and wakes up the waiting resources.
+
+        Args:
+            * result: The fetched data.
+            * error: An Exception raised while fetching, or None.
+
+        Returns:
+            None.
+        """
+        self.result = result
+        self.error = error
+        self._done.set()
+
+    def get_result(self):
+        """Waits for the fetch to finish and returns its result.
+
+        Args:
+            * None.
+
+        Returns:
+            The fetched data.
+
+        Raises:
+            The Exception raised while fetching, if any.
+        """
+        self._done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class ResourceList(list):
+    """A list of resources annotated with metadata.
+
+    Attributes:
+        * meta: A dict mapping resources to a string describing them, such
+            as the regions they were found in.
+    """
+
+    def __init__(self, resources=(), meta=None):
+        """Initializes ResourceList.
+
+        Args:
+            * resources: An iterable of resources.
+            * meta: A dict mapping resources to a string describing them.
+
+        Returns:
+            None.
+        """
+        super(ResourceList, self).__init__(resources)
+        self.meta = meta or {}
+
+
+class Backoff(object):
+    """Retries throttled requests with an adaptive exponential backoff.
+
+    Each throttled attempt doubles the delay, up to MAX_DELAY, and each
+    success halves it again.  The delay is kept between calls, so a region
+    that throttled the last refresh is queried more gently on the next one.
+    Sleeps are randomized between zero and the delay to spread out retries.
+
+    Attributes:
+        * BASE_DELAY: A float representing the initial delay in seconds.
+        * MAX_DELAY: A float representing the maximum delay in seconds.
+        * MAX_ATTEMPTS: An int representing the number of attempts before
+            the throttling error is raised.
+        * delay: A float representing the current delay in seconds.
+    """
+
+    BASE_DELAY = 0.2
+    MAX_DELAY = 20.0
+    MAX_ATTEMPTS = 6
+
+    def __init__(self):
+        """Initializes Backoff.
+
+        Args:
+            * None.
+
+        Returns:
+            None.
+        """
+        self.delay = self.BASE_DELAY
+        self._lock = threading.Lock()
+
+    def call(self, func, is_throttled):
+        """Calls func, retrying it while it is throttled.
+
+        Args:
+            * func: A callable without arguments.
+            * is_throttled: A callable called with an Exception raised by
+                func, returning whether the request was throttled.
+
+        Returns:
+            The value returned by func.
+
+        Raises:
+            The Exception raised by func, if it was not throttled or the
+                last attempt was.
+        """
+        attempt = 1
+        while True:
+            try:
+                result = func()
+            except Exception as e:
+                if attempt >= self.MAX_ATTEMPTS or not is_throttled(e):
+                    raise
+                with self._lock:
+                    self.delay = min(self.delay * 2, self.MAX_DELAY)
+                    delay = self.delay
+                time.sleep(random.uniform(0, delay))
+                attempt += 1
+                continue
+            with self._lock:
+                self.delay = max(self.delay / 2, self.BASE_DELAY)
+            return result
+
+
+class QueryBackend(object):
+    """Encapsulates how resources are queried from AWS.
+
+    Abstract base class for query backends.
+
+    Resources that describe the same AWS data, such as instance ids and
+    instance tags, share a fetch key.  Between calls to begin_refresh and
+    end_refresh, data is fetched once per fetch key and every resource
+    parses its own projection of it.
+
+    A backend queries a single AWS profile and region, the environment's
+    unless they are given.  An empty string stands for the default profile
+    or the profile's region, even if the environment selects another one.
+
+    Regional resources, such as instances, can be queried from several
+    regions instead.  The regions are queried concurrently, each with its
+    own Backoff, and the results are merged into a ResourceList whose meta
+    maps each resource to its regions.
+
+    Attributes:
+        * ALL_REGIONS: A string that selects all regions enabled for the
+            account.
+        * MAX_REGION_WORKERS: An int representing the number of regions
+            queried at the same time.
+        * THROTTLING_CODES: A set of AWS error codes returned when requests
+            are throttled.
+        * profile: A string representing the AWS profile to query, or None
+            to use the environment's.
+        * region: A string representing the AWS region to query, or None
+            to use the environment's.
+        * regions: A list of strings representing the regions to query
+            regional resources from, ALL_REGIONS, or None to only query
+            region.
+        * credentials: An instance of botocore's Credentials resolved for
+            the profile, or None to let each query resolve them.
+    """
+
+    __metaclass__ = ABCMeta
+
+    ALL_REGIONS = 'all'
+    MAX_REGION_WORKERS = 8
+    THROTTLING_CODES = set(['Throttling',
+                            'ThrottlingException',
+                            'ThrottledException',
+                            'RequestLimitExceeded',
+                            'RequestThrottled',
+                            'TooManyRequestsException'])
+
+    def __init__(self, profile=None, region=None, regions=None):
+        """Initializes QueryBackend.
+
+        Args:
+            * profile: A string representing the AWS profile to query.
+            * region: A string representing the AWS region to query.
+            * regions: A list of strings representing the regions to query
+                regional resources from, or ALL_REGIONS.
+
+        Returns:
+            None.
+        """
+        self.profile = profile
+        self.region = region
+        self.regions = regions
+        self._shared_fetches = {}
+        self._refresh_count = 0
+        self._lock = threading.Lock()
+        self._all_regions = None
+        self._backoffs = {}
+        self.credentials = None
+        self._credentials_lock = threading.Lock()
+
+    def with_context(self, profile, region):
+        """Creates a backend of the same kind for another profile and region.
+
+        Args:
+            * profile: A string representing the AWS profile to query.
+            * region: A string representing the AWS region to query.
+
+        Returns:
+            An instance of QueryBackend.
+        """
+        return type(self)(profile=profile, region=region,
+                          regions=self.regions)
+
+    def get_env(self, region=None):
+        """Gets the environment for awscli processes run by this backend.
+
+        Args:
+            * region: A string representing the region to query instead of
+                the backend's region.
+
+        Returns:
+            A dict of environment variables selecting the profile, region
+                and resolved credentials, or None to inherit the
+                environment.
+        """
+        region = region or self.region
+        credentials = self.credentials
+        if self.profile is None and region is None and credentials is None:
+            return None
+        # AWS_DEFAULT_PROFILE takes precedence over AWS_PROFILE
+        variables = [('AWS_PROFILE', self.profile),
+                     ('AWS_DEFAULT_PROFILE',
+                      None if self.profile is None else ''),
+                     ('AWS_DEFAULT_REGION', region)]
+        if credentials is not None:
+            credentials = credentials.get_frozen_credentials()
+            variables.extend([
+                ('AWS_ACCESS_KEY_ID', credentials.access_key or ''),
+                ('AWS_SECRET_ACCESS_KEY', credentials.secret_key or ''),
+                ('AWS_SESSION_TOKEN', credentials.token or '')])
+        env = dict(os.environ)
+        for name, value in variables:
+            if value:
+                env[name] = value
+            elif value is not None:
+                env.pop(name, None)
+        return env
+
+    def resolve_credentials(self):
+        """Resolves the profile's credentials once for all queries.
+
+        Resolving credentials can take a few requests, such as assuming a
+        role or reading an SSO token.  Once resolved, the awscli processes
+        run by the backend get them from their environment instead of
+        resolving them again.  Credentials that expire are refreshed by
+        botocore.
+
+        Args:
+            * None.
+
+        Returns:
+            An instance of botocore's Credentials, or None if the profile
+                has no credentials.
+
+        Raises:
+            An ImportError if botocore is not installed, or a
+                botocore.exceptions.BotoCoreError if the credentials can
+                not be resolved.
+        """
+        with self._credentials_lock:
+            if self.credentials is None:
+                self.credentials = self.create_session().get_credentials()
+            return self.credentials
+
+    def create_session(self):
+        """Creates a botocore session for the backend's profile and region.
+
+        The session does not read an empty profile or region from the
+        environment, like the awscli processes run with get_env().
+
+        Args:
+            * None.
+
+        Returns:
+            An instance of botocore's Session.
+
+        Raises:
+            An ImportError if botocore is not installed.
+        """
+        import botocore.session
+        session_vars = {}
+        if self.profile == '':
+            session_vars['profile'] = (None, None, None, None)
+        if self.region == '':
+            session_vars['region'] = ('region', None, None, None)
+        return botocore.session.Session(session_vars=session_vars or None,
+                                        profile=self.profile or None)
+
+    def begin_refresh(self):
+        """Starts sharing fetches between the resources being refreshed.
+
+        Refreshes may overlap, fetches are shared until the last one ends.
+
+        Args:
+            * None.
+
+        Returns:
+            None.
+        """
+        with self._lock:
+            self._refresh_count += 1
+
+    def end_refresh(self):
+        """Stops sharing fetches once no refresh is running.
+
+        Args:
+            * None.
+
+        Returns:
+            None.
+        """
+        with self._lock:
+            self._refresh_count -= 1
+            if self._refresh_count <= 0:
+                self._refresh_count = 0
+                self._shared_fetches = {}
+
+    def query(self, resource):
+        """Queries AWS for the given resource.
+
+        Args:
+            * resource: An instance of Resource.
+
+        Returns:
+            A list of resources, or None if the query returned nothing.
+        """
+        data = self._fetch_shared(resource)
+        if data is None:
+            return None
+        if self._is_fan_out(resource):
+            return self._parse_regions(resource, data)
+        return self._parse(resource, data)
+
+    def get_regions(self):
+        """Gets the regions regional resources are queried from.
+
+        Args:
+            * None.
+
+        Returns:
+            A list of region strings, empty if only the backend's region is
+                queried.
+        """
+        if not self.regions:
+            return []
+        if self.regions != self.ALL_REGIONS:
+            return list(self.regions)
+        if self._all_regions is None:
+            self._all_regions = sorted(self._list_regions())
+        return self._all_regions
+
+    def _is_fan_out(self, resource):
+        """Determines whether the resource is queried from several regions.
+
+        Args:
+            * resource: An instance of Resource.
+
+        Returns:
+            A boolean that specifies whether the resource is regional and
+                regions are configured.
+        """
+        return bool(resource.REGIONAL and self.regions)
+
+    def _fetch_regions(self, resource):
+        """Fetches the data for the resource from each region concurrently.
+
+        Regions that fail are skipped, unless they all fail.
+
+        Args:
+            * resource: An instance of Resource.
+
+        Returns:
+            A list of (region, data) tuples, one for each region that
+                returned data.
+
+        Raises:
+            The Exception raised by the first region, if all regions fail.
+        """
+        regions = self.get_regions()
+        if not regions:
+            return []
+        with self._lock:
+            for region in regions:
+                if region not in self._backoffs:
+                    self._backoffs[region] = Backoff()
+        with ThreadPoolExecutor(
+                max_workers=min(len(regions),
+                                self.MAX_REGION_WORKERS)) as executor:
+            futures = [(region, executor.submit(
+                self._backoffs[region].call,
+                lambda region=region: self._fetch(resource, region),
+                self._is_throttled)) for region in regions]
+        results = []
+        errors = []
+        for region, future in futures:
+            error = future.exception()
+            if error is not None:
+                errors.append(error)
+            else:
+                results.append((region, future.result()))
+        if errors and not results:
+            raise errors[0]
+        return results
+
+    def _parse_regions(self, resource, data):
+        """Parses and merges the resources fetched from each region.
+
+        Args:
+            * resource: An instance of Resource.
+            * data: A list of (region, data) tuples, as returned by
+                _fetch_regions.
+
+        Returns:
+            A sorted ResourceList whose meta maps each resource to a comma
+                separated string of its regions.
+        """
+        resource_regions = {}
+        for region, region_data in data:
+            if region_data is None:
+                continue
+            for name in self._parse(resource, region_data):
+                resource_regions.setdefault(name, []).append(region)
+        return ResourceList(
+            sorted(resource_regions),
+            dict((name, ','.join(regions))
+                 for name, regions in resource_regions.items()))
+
+    def _is_throttled(self, error):
+        """Determines whether the error was caused by throttling.
+
+        Args:
+            * error: An Exception raised while fetching.
+
+        Returns:
+            A boolean that specifies whether the request was throttled.
+        """
+        response = getattr(error, 'response', None) or {}
+        return response.get('Error', {}).get('Code') in self.THROTTLING_CODES
+
+    def _fetch_shared(self, resource):
+        """Fetches the data for the resource, once per fetch key.
+
+        Outside of a refresh, every call fetches the data again.
+
+        Args:
+            * resource: An instance of Resource.
+
+        Returns:
+            The fetched data.
+        """
+        key = self._fetch_key(resource)
+        with self._lock:
+            if not self._refresh_count:
+                shared_fetch = None
+            else:
+                shared_fetch = self._shared_fetches.get(key)
+                is_owner = shared_fetch is None
+                if is_owner:
+                    shared_fetch = SharedFetch()
+                    self._shared_fetches[key] = shared_fetch
+        if shared_fetch is None:
+            return self._fetch_resource(resource)
+        if is_owner:
+            try:
+                shared_fetch.set_result(self._fetch_resource(resource))
+            except Exception as e:
+                shared_fetch.set_result(None, error=e)
+        return shared_fetch.get_result()
+
+    def _fetch_resource(self, resource):
+        """Fetches the data for the resource, from each region if needed.
+
+        Args:
+            * resource: An instance of Resource.
+
+        Returns:
+            The fetched data.
+        """
+        if self._is_fan_out(resource):
+            return self._fetch_regions(resource)
+        return self._fetch(resource)
+
+    @abstractmethod
+    def _fetch_key(self, resource):
+        """Gets the key identifying the data the resource is parsed from.
+
+        Abstract method.
+
+        Args:
+            * resource: An instance of Resource.
+
+        Returns:
+            A hashable key.
+        """
+        pass
+
+    @abstractmethod
+    def _fetch(self, resource, region=None):
+        """Fetches the data the resource is parsed from.
+
+        Abstract method.
+
+        Args:
+            * resource: An instance of Resource.
+            * region: A string representing the region to query instead of
+                the backend's region.
+
+        Returns:
+            The fetched data, or None if there is nothing to parse.
+        """
+        pass
+
+    @abstractmethod
+    def _list_regions(self):
+        """Lists the regions enabled for the account.
+
+        Abstract method.
+
+        Args:
+            * None.
+
+        Returns:
+            A list of region strings.
+        """
+        pass
+
+    @abstractmethod
+    def _parse(self, resource, data):
+        """Parses the resources from the fetched data.
+
+        Abstract method.
+
+        Args:
+            * resource: An instance of Resource.
+            * data: The data returned by _fetch.
+
+        Returns:
+            A list of resources.
+        """
+        pass
+
+
+class SubprocessBackend(QueryBackend):
+    """Queries resources by running the resource's QUERY with the awscli.
+
+    Each query pays for a new Python interpreter and awscli import, but
+    only requires the `aws` command to be on the path.
+
+    Attributes:
+        * None.
+    """
+
+    def _fetch_key(self, resource):
+        """Gets the key identifying the data the resource is parsed from.
+
+        Args:
+            * resource: An instance of Resource.
+
+        Returns:
+            A string representing the resource's QUERY.
+        """
+        return resource.QUERY
+
+    REGIONS_QUERY = 'aws ec2 describe-regions --query "Regions[].RegionName" --output text'  # NOQA
+
+    def _fetch(self, resource, region=None):
+        """Runs the resource's QUERY in the shell.
+
+        Args:
+            * resource: An instance of Resource.
+            * region: A string representing the region to query instead of
+                the backend's region.
+
+        Returns:
+            A string representing the awscli output.
+
+        Raises:
+            A subprocess.CalledProcessError if check_output returns a non-zero
+                exit status, which is called by resource._query_aws.
+        """
+        if region is None:
+            return resource._query_aws(resource.QUERY)
+        return resource._query_aws(resource.QUERY, region=region)
+
+    def _list_regions(self):
+        """Lists the regions enabled for the account with the awscli.
+
+        Args:
+            * None.
+
+        Returns:
+            A list of region strings.
+
+        Raises:
+            A subprocess.CalledProcessError if the awscli fails.
+        """
+        return subprocess.check_output(self.REGIONS_QUERY,
+                                       universal_newlines=True,
+                                       shell=True,
+                                       env=self.get_env()).split()
+
+    def _parse(self, resource, data):
+        """Parses the resources from the awscli output.
+
+        Args:
+            * resource: An instance of Resource.
+            * data: A string representing the awscli output.
+
+        Returns:
+            A list of resources.
+        """
+        return resource.parse_output(data)
+
+
+class BotocoreBackend(QueryBackend):
+    """Queries resources with botocore clients inside the saws process.
+
+    A single botocore session is shared by all queries and one client is
+    created per service, then reused.  Paginated operations are followed
+    until all pages have been read.
+
+    If botocore can not be imported, queries fall back to the fallback
+    backend.
+
+    Attributes:
+        * session: An instance of botocore's Session, created on first use
+            if not provided.
+        * fallback: An instance of QueryBackend used when botocore is not
+            available.
+        * clients: A dict mapping service names, or (service name, region)
+            tuples for clients of other regions, to botocore clients.
+    """
+
+    def __init__(self, session=None, fallback=None, profile=None,
+                 region=None, regions=None):
+        """Initializes BotocoreBackend.
+
+        Args:
+            * session: An instance of botocore's Session.
+            * fallback: An instance of QueryBackend used when botocore is
+                not available.
+            * profile: A string representing the AWS profile to query.
+            * region: A string representing the AWS region to query.
+            * regions: A list of strings representing the regions to query
+                regional resources from, or ALL_REGIONS.
+
+        Returns:
+            None.
+        """
+        super(BotocoreBackend, self).__init__(profile, region, regions)
+        self.session = session
+        self.fallback = fallback or SubprocessBackend(profile, region,
+                                                      regions)
+        self.clients = {}
+        self._client_lock = threading.Lock()
+
+    def with_context(self, profile, region):
+        """Creates a botocore backend for another profile and region.
+
+        Args:
+            * profile: A string representing the AWS profile to query.
+            * region: A string representing the AWS region to query.
+
+        Returns:
+            An instance of BotocoreBackend.
+        """
+        return BotocoreBackend(
+            fallback=self.fallback.with_context(profile, region),
+            profile=profile,
+            region=region,
+            regions=self.regions)
+
+    def begin_refresh(self):
+        """Starts sharing fetches, including the fallback's.
+
+        Args:
+            * None.
+
+        Returns:
+            None.
+        """
+        super(BotocoreBackend, self).begin_refresh()
+        self.fallback.begin_refresh()
+
+    def end_refresh(self):
+        """Stops sharing fetches, including the fallback's.
+
+        Args:
+            * None.
+
+        Returns:
+            None.
+        """
+        super(BotocoreBackend, self).end_refresh()
+        self.fallback.end_refresh()
+
+    def query(self, resource):
+        """Calls the resource's OPERATION and parses the response pages.
+
+        Args:
+            * resource: An instance of Resource.
+
+        Returns:
+            A list of resources.
+
+        Raises:
+            A botocore.exceptions.BotoCoreError or ClientError if the
+                operation fails.
+        """
+        try:
+            return super(BotocoreBackend, self).query(resource)
+        except ImportError:
+            return self.fallback.query(resource)
+
+    def get_client(self, service_name, region=None):
+        """Gets the shared client for the given service.
+
+        Botocore clients are thread safe, sessions are not, so clients are
+        created under a lock.  The session uses the backend's profile and
+        the clients its region, unless another region is given.
+
+        Args:
+            * service_name: A string representing the service name, such as
+                'ec2'.
+            * region: A string representing the region to query instead of
+                the backend's region.
+
+        Returns:
+            An instance of a botocore client.
+
+        Raises:
+            An ImportError if botocore is not installed.
+        """
+        key = service_name if region is None else (service_name, region)
+        region = region or self.region
+        with self._client_lock:
+            client = self.clients.get(key)
+            if client is None:
+                session = self._get_session()
+                if not region:
+                    client = session.create_client(service_name)
+                else:
+                    client = session.create_client(
+                        service_name, region_name=region)
+                self.clients[key] = client
+        return client
+
+    def resolve_credentials(self):
+        """Resolves the session's credentials once for all clients.
+
+        The fallback backend reuses them too.
+
+        Args:
+            * None.
+
+        Returns:
+            An instance of botocore's Credentials, or None if the profile
+                has no credentials.
+
+        Raises:
+            An ImportError if botocore is not installed, or a
+                botocore.exceptions.BotoCoreError if the credentials can
+                not be resolved.
+        """
+        with self._client_lock:
+            if self.credentials is None:
+                self.credentials = self._get_session().get_credentials()
+                self.fallback.credentials = self.credentials
+            return self.credentials
+
+    def _get_session(self):
+        """Gets the botocore session, creating it on first use.
+
+        Called with the client lock held.
+
+        Args:
+            * None.
+
+        Returns:
+            An instance of botocore's Session.
+
+        Raises:
+            An ImportError if botocore is not installed.
+        """
+        if self.session is None:
+            self.session = self.create_session()
+        return self.session
+
+    def _fetch_key(self, resource):
+        """Gets the key identifying the data the resource is parsed from.
+
+        Args:
+            * resource: An instance of Resource.
+
+        Returns:
+            A tuple of the resource's SERVICE, OPERATION and OPERATION_KWARGS.
+        """
+        return (resource.SERVICE,
+                resource.OPERATION,
+                json.dumps(resource.OPERATION_KWARGS, sort_keys=True))
+
+    def _fetch(self, resource, region=None):
+        """Calls the resource's OPERATION, following all pages.
+
+        Args:
+            * resource: An instance of Resource.
+            * region: A string representing the region to query instead of
+                the backend's region.
+
+        Returns:
+            A list of response dicts, one for each page.
+
+        Raises:
+            An ImportError if botocore is not installed.
+        """
+        return self._paginate(self.get_client(resource.SERVICE, region),
+                              resource.OPERATION,
+                              resource.OPERATION_KWARGS)
+
+    def _list_regions(self):
+        """Lists the regions enabled for the account with DescribeRegions.
+
+        Args:
+            * None.
+
+        Returns:
+            A list of region strings.
+
+        Raises:
+            An ImportError if botocore is not installed.
+        """
+        response = self.get_client('ec2').describe_regions()
+        return [region['RegionName'] for region in response['Regions']]
+
+    def _parse(self, resource, data):
+        """Parses the resources from the response pages.
+
+        Args:
+            * resource: An instance of Resource.
+            * data: A list of response dicts, one for each page.
+
+        Returns:
+            A list of resources.
+        """
+        return resource.parse_response(data)
+
+    def _paginate(self, client, operation, operation_kwargs):
+        """Calls the operation, following all pages if it is paginated.
+
+        Args:
+            * client: An instance of a botocore client.
+            * operation: A string representing the operation name, such as
+                'DescribeInstances'.
+            * operation_kwargs: A dict of parameters for the operation.
+
+        Returns:
+            A list of response dicts, one for each page.
+        """
+        from botocore import xform_name
+        method_name = xform_name(operation)
+        if client.can_paginate(method_name):
+            paginator = client.get_paginator(method_name)
+            return list(paginator.paginate(**operation_kwargs))
+        return [getattr(client, method_name)(**operation_kwargs)]
+
+
+QUERY_BACKENDS = {
+    'botocore': BotocoreBackend,
+    'subprocess': SubprocessBackend,
+}
+
+
+def list_profiles():
+    """Lists the profiles in the AWS config and credentials files.
+
+    Args:
+        * None.
+
+    Returns:
+        A sorted list of profile strings.
+
+    Raises:
+        An ImportError if botocore is not installed.
+    """
+    import botocore.session
+    return sorted(botocore.session.Session().available_profiles)
+
+
+def create_query_backend(name=None, regions=None):
+    """Creates the query backend with the given name.
+
+    Args:
+        * name: A string representing the backend name, one of the keys of
+            QUERY_BACKENDS.  Defaults to 'botocore'.
+        * regions: A list of region strings or a comma separated string of
+            regions, as read from the config, to query regional resources
+            from.  QueryBackend.ALL_REGIONS selects all enabled regions.
+
+    Returns:
+        An instance of QueryBackend.
+    """
+    if not isinstance(regions, (list, tuple)):
+        regions = (regions or '').split(',')
+    regions = [region.strip() for region in regions if region.strip()]
+    if QueryBackend.ALL_REGIONS in regions:
+        regions = QueryBackend.ALL_REGIONS
+    return QUERY_BACKENDS.get(name, BotocoreBackend)(regions=regions or None)
@@ -16,7 +16,6 @@
 from __future__ import unicode_literals
 from __future__ import print_function
 from .resource import Resource
-from abc import ABCMeta, abstractmethod
 
 
 class Bucket(Resource):
@@ -27,27 +26,32 @@ class Bucket(Resource):
     Attributes:
         * OPTION: A string representing the option for bucket uri.
         * QUERY: A string representing the AWS query to list all bucket uri.
+        * PREFIX: A string prepended to the bucket names.
+        * TTL: An int representing the number of seconds the resources stay
+            fresh.  Buckets change rarely, so they expire after a day.
         * resources: A list of bucket uri.
     """
 
-    __metaclass__ = ABCMeta
-
     OPTION = ''
     QUERY = ''
+    PREFIX = ''
+    SERVICE = 's3'
+    OPERATION = 'ListBuckets'
+    TTL = 86400
 
-    def __init__(self):
+    def __init__(self, query_backend=None):
         """Initializes BucketNames.
 
         Args:
-            * None.
+            * query_backend: An instance of QueryBackend.
 
         Returns:
             None.
         """
-        super(Bucket, self).__init__()
+        super(Bucket, self).__init__(query_backend)
 
-    def query_resource(self):
-        """Queries and stores bucket names from AWS.
+    def parse_output(self, output):
+        """Parses bucket names from the `aws s3 ls` output.
 
         Special case for S3:
             We have two ways to invoke S3 completions:
@@ -55,37 +59,54 @@ class Bucket(Resource):
                 Option: s3:       Completion: s3://foo
 
         Args:
-            * None.
+            * output: A string representing the awscli output.
 
         Returns:
-            None.
+            A list of bucket resources.
+        """
+        bucket_names = []
+        for result in output.split('\n'):
+            tokens = result.split()
+            # Ignore blank lines
+            if tokens:
+                bucket_names.append(tokens[-1])
+        return self._create_bucket_resources(bucket_names)
+
+    def parse_response(self, pages):
+        """Parses bucket names from the list-buckets pages.
+
+        Args:
+            * pages: A list of response dicts, one for each page.
+
+        Returns:
+            A list of bucket resources.
+        """
+        return self._create_bucket_resources(
+            bucket['Name']
+            for page in pages
+            for bucket in page.get('Buckets', []))
+
+    def _create_bucket_resources(self, bucket_names):
+        """Creates a new list of bucket resources from the bucket names.
+
+        The list is built apart from the resources, which the completer
+        may be reading while a refresh parses the new ones.
+
+        Args:
+            * bucket_names: An iterable of strings representing bucket names.
 
-        Raises:
-            A subprocess.CalledProcessError if check_output returns a non-zero
-                exit status, which is called by self._query_aws.
+        Returns:
+            A list of bucket resources.
         """
-        output = self._query_aws(self.QUERY)
-        if output is not None:
-            self.clear_resources()
-            result_list = output.split('\n')
-            for result in result_list:
-                try:
-                    result = result.split()[-1]
-                    self.add_bucket_name(result)
-                except:
-                    # Ignore blank lines
-                    pass
-
-    @abstractmethod
+        return [self.PREFIX + bucket_name for bucket_name in bucket_names]
+
     def add_bucket_name(self, bucket_name):
         """Adds the bucket name to our bucket resources.
 
-        Abstract method.
-
         Args:
             * bucket_name: A string representing the bucket name.
 
         Returns:
             None.
         """
-        pass
+        self.resources.append(self.PREFIX + bucket_name)
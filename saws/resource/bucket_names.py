@@ -30,40 +30,13 @@ class BucketNames(Bucket):
     OPTION = '--bucket'
     QUERY = 'aws s3 ls'
 
-    def __init__(self):
+    def __init__(self, query_backend=None):
         """Initializes BucketNames.
 
         Args:
-            * None.
+            * query_backend: An instance of QueryBackend.
 
         Returns:
             None.
         """
-        super(BucketNames, self).__init__()
-
-    def query_resource(self):
-        """Queries and stores bucket names from AWS.
-
-        Args:
-            * None.
-
-        Returns:
-            None.
-
-        Raises:
-            A subprocess.CalledProcessError if check_output returns a non-zero
-                exit status, which is called by self._query_aws.
-        """
-        print('  Refreshing bucket names...')
-        super(BucketNames, self).query_resource()
-
-    def add_bucket_name(self, bucket_name):
-        """Adds the bucket name to our bucket resources.
-
-        Args:
-            * bucket_name: A string representing the bucket name.
-
-        Returns:
-            None.
-        """
-        self.resources.extend([bucket_name])
+        super(BucketNames, self).__init__(query_backend)
@@ -31,40 +31,13 @@ class BucketUris(Bucket):
     QUERY = 'aws s3 ls'
     PREFIX = OPTION + '//'
 
-    def __init__(self):
+    def __init__(self, query_backend=None):
         """Initializes BucketNames.
 
         Args:
-            * None.
+            * query_backend: An instance of QueryBackend.
 
         Returns:
             None.
         """
-        super(BucketUris, self).__init__()
-
-    def query_resource(self):
-        """Queries and stores bucket uris from AWS.
-
-        Args:
-            * None.
-
-        Returns:
-            None.
-
-        Raises:
-            A subprocess.CalledProcessError if check_output returns a non-zero
-                exit status, which is called by self._query_aws.
-        """
-        print('  Refreshing bucket uris...')
-        super(BucketUris, self).query_resource()
-
-    def add_bucket_name(self, bucket_name):
-        """Adds the bucket name to our bucket resources.
-
-        Args:
-            * bucket_name: A string representing the bucket name.
-
-        Returns:
-            None.
-        """
-        self.resources.extend([self.PREFIX + bucket_name])
+        super(BucketUris, self).__init__(query_backend)
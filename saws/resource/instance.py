@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2015 Donne Martin. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+
+from __future__ import unicode_literals
+from __future__ import print_function
+import json
+from .resource import Resource
+from abc import ABCMeta, abstractmethod
+
+
+class Instance(Resource):
+    """Encapsulates resources derived from EC2 instances.
+
+    Base class for InstanceIds, InstanceTagKeys and InstanceTagValues.
+
+    All subclasses share the same QUERY and OPERATION, so the query backend
+    fetches the instances once per refresh and each subclass parses its own
+    projection of them.  New EC2 instance completions such as image ids or
+    subnet ids only need to subclass Instance and implement parse_instances.
+
+    Attributes:
+        * QUERY: A string representing the AWS query to list all instances.
+        * SERVICE: A string representing the botocore service name.
+        * OPERATION: A string representing the botocore operation name.
+        * TTL: An int representing the number of seconds the resources stay
+            fresh.  Instances churn often, so they expire after five minutes.
+        * REGIONAL: A boolean that specifies whether the resources belong to
+            a region.
+        * resources: A list of resources.
+    """
+
+    __metaclass__ = ABCMeta
+
+    QUERY = 'aws ec2 describe-instances --query "Reservations[].Instances[]" --output json'  # NOQA
+    SERVICE = 'ec2'
+    OPERATION = 'DescribeInstances'
+    TTL = 300
+    REGIONAL = True
+
+    def __init__(self, query_backend=None):
+        """Initializes Instance.
+
+        Args:
+            * query_backend: An instance of QueryBackend.
+
+        Returns:
+            None.
+        """
+        super(Instance, self).__init__(query_backend)
+
+    def parse_output(self, output):
+        """Parses the instances from the awscli json output.
+
+        Args:
+            * output: A string representing the awscli output.
+
+        Returns:
+            A list of resources.
+        """
+        return self.parse_instances(json.loads(output) or [])
+
+    def parse_response(self, pages):
+        """Parses the instances from the describe-instances pages.
+
+        Args:
+            * pages: A list of response dicts, one for each page.
+
+        Returns:
+            A list of resources.
+        """
+        return self.parse_instances(
+            [instance
+             for page in pages
+             for reservation in page.get('Reservations', [])
+             for instance in reservation.get('Instances', [])])
+
+    @abstractmethod
+    def parse_instances(self, instances):
+        """Parses the resources from the instances.
+
+        Abstract method.
+
+        Args:
+            * instances: A list of dicts, one for each instance, as returned
+                by describe-instances.
+
+        Returns:
+            A list of resources.
+        """
+        pass
@@ -15,48 +15,37 @@
 
 from __future__ import unicode_literals
 from __future__ import print_function
-import re
-from .resource import Resource
+from .instance import Instance
 
 
-class InstanceIds(Resource):
+class InstanceIds(Instance):
     """Encapsulates the EC2 instance ids resources.
 
     Attributes:
         * OPTION: A string representing the option for instance ids.
-        * QUERY: A string representing the AWS query to list all instance ids.
         * resources: A list of instance ids.
     """
 
     OPTION = '--instance-ids'
-    QUERY = 'aws ec2 describe-instances --query "Reservations[].Instances[].[InstanceId]" --output text'  # NOQA
 
-    def __init__(self):
+    def __init__(self, query_backend=None):
         """Initializes InstanceIds.
 
         Args:
-            * None.
+            * query_backend: An instance of QueryBackend.
 
         Returns:
             None.
         """
-        super(InstanceIds, self).__init__()
+        super(InstanceIds, self).__init__(query_backend)
 
-    def query_resource(self):
-        """Queries and stores instance ids from AWS.
+    def parse_instances(self, instances):
+        """Parses instance ids from the instances.
 
         Args:
-            * None.
+            * instances: A list of dicts, one for each instance.
 
         Returns:
-            The list of resources.
-
-        Raises:
-            A subprocess.CalledProcessError if check_output returns a non-zero
-                exit status, which is called by self._query_aws.
+            A list of instance ids.
         """
-        print('  Refreshing instance ids...')
-        output = self._query_aws(self.QUERY)
-        if output is not None:
-            output = re.sub('\n', ' ', output)
-            self.resources = output.split()
+        return [instance['InstanceId'] for instance in instances]
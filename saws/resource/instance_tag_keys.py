@@ -15,48 +15,39 @@
 
 from __future__ import unicode_literals
 from __future__ import print_function
-from .resource import Resource
+from .instance import Instance
 
 
-class InstanceTagKeys(Resource):
+class InstanceTagKeys(Instance):
     """Encapsulates the EC2 instance tag keys resources.
 
     Attributes:
         * OPTION: A string representing the option for instance tag keys.
-        * QUERY: A string representing the AWS query to list all instance
-            tag keys.
         * resources: A list of instance tag keys.
     """
 
     OPTION = '--ec2-tag-key'
-    QUERY = 'aws ec2 describe-instances --filters "Name=tag-key,Values=*" --query Reservations[].Instances[].Tags[].Key --output text'  # NOQA
 
-    def __init__(self):
+    def __init__(self, query_backend=None):
         """Initializes InstanceTagKeys.
 
         Args:
-            * None.
+            * query_backend: An instance of QueryBackend.
 
         Returns:
             None.
         """
-        super(InstanceTagKeys, self).__init__()
+        super(InstanceTagKeys, self).__init__(query_backend)
 
-    def query_resource(self):
-        """Queries and stores instance ids from AWS.
+    def parse_instances(self, instances):
+        """Parses instance tag keys from the instances.
 
         Args:
-            * None.
+            * instances: A list of dicts, one for each instance.
 
         Returns:
-            The list of resources.
-
-        Raises:
-            A subprocess.CalledProcessError if check_output returns a non-zero
-                exit status, which is called by self._query_aws.
+            A list of unique instance tag keys.
         """
-        # TODO: Refactor query_resource in InstanceTagKeys and InstanceTagValues
-        print('  Refreshing instance tag keys...')
-        output = self._query_aws(self.QUERY)
-        if output is not None:
-            self.resources = list(set(output.split('\t')))
+        return list(set(tag['Key']
+                        for instance in instances
+                        for tag in instance.get('Tags') or []))
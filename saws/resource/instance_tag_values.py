@@ -15,48 +15,39 @@
 
 from __future__ import unicode_literals
 from __future__ import print_function
-from .resource import Resource
+from .instance import Instance
 
 
-class InstanceTagValues(Resource):
+class InstanceTagValues(Instance):
     """Encapsulates the EC2 instance tag values resources.
 
     Attributes:
         * OPTION: A string representing the option for instance tag values.
-        * QUERY: A string representing the AWS query to list all instance
-            tag values.
         * resources: A list of instance tag values.
     """
 
     OPTION = '--ec2-tag-value'
-    QUERY = 'aws ec2 describe-instances --filters "Name=tag-value,Values=*" --query Reservations[].Instances[].Tags[].Value --output text'  # NOQA
 
-    def __init__(self):
+    def __init__(self, query_backend=None):
         """Initializes InstanceTagValues.
 
         Args:
-            * None.
+            * query_backend: An instance of QueryBackend.
 
         Returns:
             None.
         """
-        super(InstanceTagValues, self).__init__()
+        super(InstanceTagValues, self).__init__(query_backend)
 
-    def query_resource(self):
-        """Queries and stores instance ids from AWS.
+    def parse_instances(self, instances):
+        """Parses instance tag values from the instances.
 
         Args:
-            * None.
+            * instances: A list of dicts, one for each instance.
 
         Returns:
-            The list of resources.
-
-        Raises:
-            A subprocess.CalledProcessError if check_output returns a non-zero
-                exit status, which is called by self._query_aws.
+            A list of unique instance tag values.
         """
-        # TODO: Refactor query_resource in InstanceTagKeys and InstanceTagValues
-        print('  Refreshing instance tag values...')
-        output = self._query_aws(self.QUERY)
-        if output is not None:
-            self.resources = list(set(output.split('\t')))
+        return list(set(tag['Value']
+                        for instance in instances
+                        for tag in instance.get('Tags') or []))
@@ -16,7 +16,9 @@
 from __future__ import unicode_literals
 from __future__ import print_function
 import subprocess
+import time
 from abc import ABCMeta, abstractmethod
+from .backend import SubprocessBackend
 
 
 class Resource():
@@ -30,7 +32,19 @@ class Resource():
         * HEADER: A string representing the header in the RESOURCES.txt file
             that denote the start of the given resources.
         * QUERY: A string representing the AWS query to list all resources
+        * SERVICE: A string representing the botocore service name used to
+            query the resources, such as 'ec2'.
+        * OPERATION: A string representing the botocore operation name used
+            to query the resources, such as 'DescribeInstances'.
+        * OPERATION_KWARGS: A dict of parameters for OPERATION.
+        * TTL: An int representing the number of seconds the resources stay
+            fresh after they are fetched.
+        * REGIONAL: A boolean that specifies whether the resources belong to
+            a region, so they can be queried from several regions.
         * resources: A list of resources.
+        * query_backend: An instance of QueryBackend.
+        * fetched_at: A float representing the time the resources were last
+            fetched from AWS, or None if they never were.
     """
 
     __metaclass__ = ABCMeta
@@ -38,18 +52,26 @@ class Resource():
     OPTION = ''
     HEADER = ''
     QUERY = ''
+    SERVICE = ''
+    OPERATION = ''
+    OPERATION_KWARGS = {}
+    TTL = 3600
+    REGIONAL = False
 
-    def __init__(self):
+    def __init__(self, query_backend=None):
         """Initializes Resource.
 
         Args:
-            * None.
+            * query_backend: An instance of QueryBackend.  Defaults to
+                running QUERY with the awscli.
 
         Returns:
             None.
         """
         self.resources = []
         self.HEADER = '[' + self.OPTION + ']'
+        self.query_backend = query_backend or SubprocessBackend()
+        self.fetched_at = None
 
     def clear_resources(self):
         """Clears the resource.
@@ -60,31 +82,86 @@ class Resource():
         Returns:
             None.
         """
-        self.resources[:] = []
+        self.resources = []
+        self.fetched_at = None
+
+    def is_expired(self, now=None):
+        """Determines whether the resources are older than the TTL.
+
+        Resources that were never fetched, such as resources loaded from a
+        cache without fetch times, are always expired.
+
+        Args:
+            * now: A float representing the current time.  Defaults to
+                time.time().
+
+        Returns:
+            A boolean that specifies whether the resources should be
+                queried again.
+        """
+        if self.fetched_at is None:
+            return True
+        if now is None:
+            now = time.time()
+        return now - self.fetched_at >= self.TTL
 
-    @abstractmethod
     def query_resource(self):
         """Queries and stores resources from AWS.
 
-        Abstract method.
-
         Args:
             * None.
 
+        Returns:
+            None.
+
         Raises:
-            A subprocess.CalledProcessError if check_output returns a non-zero
-                exit status, which is called by self._query_aws.
+            A subprocess.CalledProcessError or a botocore error, depending on
+                the query_backend, if the query fails.
+        """
+        resources = self.query_backend.query(self)
+        if resources is not None:
+            self.resources = resources
+        self.fetched_at = time.time()
+
+    @abstractmethod
+    def parse_output(self, output):
+        """Parses the awscli output of QUERY.
+
+        Abstract method.
+
+        Args:
+            * output: A string representing the awscli output.
+
+        Returns:
+            A list of resources.
+        """
+        pass
+
+    @abstractmethod
+    def parse_response(self, pages):
+        """Parses the botocore response pages of OPERATION.
+
+        Abstract method.
+
+        Args:
+            * pages: A list of response dicts, one for each page.
+
+        Returns:
+            A list of resources.
         """
         pass
 
-    def _query_aws(self, query):
+    def _query_aws(self, query, region=None):
         """Sends the given query to the shell for processing.
 
         The awscli will process the command and output its results.  The
-        results are captured and returned.
+        results are captured and returned.  The command runs with the query
+        backend's profile and region, unless another region is given.
 
         Args:
             * command: A string representing the given query.
+            * region: A string representing the region to query instead of
+                the query backend's region.
 
         Returns:
             A string representing the awscli output.
@@ -95,4 +172,5 @@ class Resource():
         """
         return subprocess.check_output(query,
                                        universal_newlines=True,
-                                       shell=True)
+                                       shell=True,
+                                       env=self.query_backend.get_env(region))
@@ -0,0 +1,498 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2015 Donne Martin. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+
+from __future__ import unicode_literals
+from __future__ import print_function
+from bisect import bisect_left
+import heapq
+import io
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from six.moves.urllib.parse import quote
+
+
+class StringTable(object):
+    """A sorted table of strings read from a memory-mapped cache file.
+
+    Strings are decoded when they are accessed, so opening a table with
+    hundreds of thousands of resources does not create any of them.
+
+    Prefix lookups binary-search a second index sorting the strings by
+    their lowercase form, then return the matches in sorted order, like
+    PrefixIndex.  TextUtils uses the table as its own index.
+
+    Attributes:
+        * meta: An instance of StringTableMeta mapping the strings to their
+            meta strings, or None if the table has no meta.
+    """
+
+    def __init__(self, buf, count, offsets_start, keys_start, meta_start=0):
+        """Initializes StringTable.
+
+        Args:
+            * buf: A buffer, such as an mmap, containing the cache file.
+            * count: An int representing the number of strings.
+            * offsets_start: An int representing the position of the
+                offsets of the strings, in sorted order.
+            * keys_start: An int representing the position of the ranks of
+                the strings, in lowercase sorted order.
+            * meta_start: An int representing the position of the offsets
+                of the strings' meta strings, or 0 if there are none.
+
+        Returns:
+            None.
+        """
+        self._buf = buf
+        self._count = count
+        self._offsets_start = offsets_start
+        self._keys_start = keys_start
+        self.meta = StringTableMeta(self, meta_start) if meta_start else None
+
+    def __len__(self):
+        """Gets the number of strings.
+
+        Args:
+            * None.
+
+        Returns:
+            An int representing the number of strings.
+        """
+        return self._count
+
+    def __getitem__(self, index):
+        """Gets the string at the index, in sorted order.
+
+        Args:
+            * index: An int or a slice.
+
+        Returns:
+            A string, or a list of strings for a slice.
+
+        Raises:
+            An IndexError if the index is out of range.
+        """
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError('StringTable index out of range')
+        return self._read_string(self._get_offset(self._offsets_start,
+                                                  index))
+
+    def __iter__(self):
+        """Iterates over the strings in sorted order.
+
+        Args:
+            * None.
+
+        Yields:
+            A string for each entry.
+        """
+        for index in range(self._count):
+            yield self[index]
+
+    def find_prefix(self, prefix, limit=None):
+        """Finds all strings starting with the prefix, ignoring case.
+
+        Args:
+            * prefix: A string representing the prefix to match.
+            * limit: An int representing the maximum number of matches to
+                return, or None to return all of them.
+
+        Returns:
+            A list of matching strings, in sorted order.
+        """
+        if not prefix:
+            return self[:limit]
+        prefix = prefix.lower()
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._get_key(middle) < prefix:
+                low = middle + 1
+            else:
+                high = middle
+        ranks = self._find_ranks(low, prefix)
+        if limit is None:
+            ranks = sorted(ranks)
+        else:
+            ranks = heapq.nsmallest(limit, ranks)
+        return [self[rank] for rank in ranks]
+
+    def _find_ranks(self, position, prefix):
+        """Yields the sorted indexes of the strings starting with the prefix.
+
+        Args:
+            * position: An int representing the lowercase position of the
+                first string starting with the prefix.
+            * prefix: A lowercase string representing the prefix to match.
+
+        Yields:
+            An int for the sorted index of each matching string.
+        """
+        while position < self._count:
+            rank = self._get_rank(position)
+            if not self[rank].lower().startswith(prefix):
+                return
+            yield rank
+            position += 1
+
+    def _get_rank(self, position):
+        """Gets the sorted index of the string at a lowercase position.
+
+        Args:
+            * position: An int representing the position of the string in
+                lowercase sorted order.
+
+        Returns:
+            An int representing the index of the string in sorted order.
+        """
+        rank, = struct.unpack_from(
+            ResourceCache.RANK, self._buf,
+            self._keys_start + position * ResourceCache.RANK_SIZE)
+        return rank
+
+    def _get_offset(self, offsets_start, index):
+        """Gets the OFFSET at the index of an offsets index.
+
+        Args:
+            * offsets_start: An int representing the position of the
+                offsets index.
+            * index: An int representing the index of the offset.
+
+        Returns:
+            An int representing the offset.
+        """
+        offset, = struct.unpack_from(
+            ResourceCache.OFFSET, self._buf,
+            offsets_start + index * ResourceCache.OFFSET_SIZE)
+        return offset
+
+    def _read_string(self, offset):
+        """Reads the string stored at the offset.
+
+        Args:
+            * offset: An int representing the position of the string's
+                LENGTH.
+
+        Returns:
+            A string.
+        """
+        length, = struct.unpack_from(ResourceCache.LENGTH, self._buf, offset)
+        start = offset + ResourceCache.LENGTH_SIZE
+        return self._buf[start:start + length].decode('utf-8')
+
+    def _get_key(self, position):
+        """Gets the lowercase string at a lowercase position.
+
+        Args:
+            * position: An int representing the position of the string in
+                lowercase sorted order.
+
+        Returns:
+            A lowercase string.
+        """
+        return self[self._get_rank(position)].lower()
+
+
+class StringTableMeta(object):
+    """Maps the strings of a StringTable to their meta strings.
+
+    Meta strings describe the strings, such as the regions a resource was
+    found in.  They are looked up by binary-searching the table.
+
+    Attributes:
+        * None.
+    """
+
+    def __init__(self, table, meta_start):
+        """Initializes StringTableMeta.
+
+        Args:
+            * table: An instance of StringTable.
+            * meta_start: An int representing the position of the offsets
+                of the meta strings, in sorted order.  An offset of 0 marks
+                a string without meta.
+
+        Returns:
+            None.
+        """
+        self._table = table
+        self._meta_start = meta_start
+
+    def get(self, name, default=None):
+        """Gets the meta string of the name.
+
+        Args:
+            * name: A string in the table.
+            * default: The value returned if the name has no meta.
+
+        Returns:
+            A string, or default.
+        """
+        index = bisect_left(self._table, name)
+        if index == len(self._table) or self._table[index] != name:
+            return default
+        offset = self._table._get_offset(self._meta_start, index)
+        if not offset:
+            return default
+        return self._table._read_string(offset)
+
+
+class ResourceCache(object):
+    """Reads and writes the binary resource cache.
+
+    The cache holds one section for each resource list:
+
+        file:     MAGIC, VERSION, section count, then the sections' entries
+        entry:    header offset, header length, fetch time (NaN if the
+                  resources were never fetched), string count, offsets
+                  index position, keys index position, meta index position
+                  (0 if the resources have no meta)
+        strings:  each a LENGTH followed by the utf-8 bytes
+        offsets:  an OFFSET for each string, in sorted order
+        keys:     a RANK for each string, in lowercase sorted order
+        meta:     the meta strings, then an OFFSET to each string's meta
+                  string, or 0 if it has none, in sorted order
+
+    All integers are little-endian.  The file is opened with mmap and its
+    sections are returned as StringTables.  It is written to a temporary
+    file in the same directory, then renamed over the cache, so readers
+    never see a partial file.
+
+    Windows can not replace a file that is mapped, so writing the cache
+    closes the maps read from it first.  StringTables read before the
+    write can not be used afterwards, read the cache again instead.
+
+    Attributes:
+        * MAGIC: A bytes string that starts every cache file.
+        * VERSION: An int representing the format version, bump it whenever
+            the format changes.
+        * DIR: A string representing the per-user cache directory.
+    """
+
+    MAGIC = b'SAWSRES\x00'
+    VERSION = 2
+    DIR = os.path.join(
+        os.environ.get('XDG_CACHE_HOME') or os.path.join('~', '.cache'),
+        'saws')
+    PREAMBLE = '<8sII'
+    PREAMBLE_SIZE = struct.calcsize(PREAMBLE)
+    ENTRY = '<QIdIQQQ'
+    ENTRY_SIZE = struct.calcsize(ENTRY)
+    LENGTH = '<I'
+    LENGTH_SIZE = struct.calcsize(LENGTH)
+    OFFSET = '<Q'
+    OFFSET_SIZE = struct.calcsize(OFFSET)
+    RANK = '<I'
+    RANK_SIZE = struct.calcsize(RANK)
+    _maps = {}
+    _maps_lock = threading.Lock()
+
+    @classmethod
+    def get_path(cls, profile, region):
+        """Gets the cache file path for the AWS profile and region.
+
+        The profile and region are quoted, which escapes the '@' joining
+        them, so no two contexts share a file.
+
+        Args:
+            * profile: A string representing the AWS profile, empty for the
+                default profile.
+            * region: A string representing the AWS region, empty for the
+                profile's region.
+
+        Returns:
+            A string representing the full cache file path.
+        """
+        return os.path.expanduser(os.path.join(
+            cls.DIR, 'resources-{0}@{1}.bin'.format(
+                quote(profile or 'default', safe=''),
+                quote(region or 'default', safe=''))))
+
+    @classmethod
+    def is_cache_file(cls, file_path):
+        """Determines whether the file is a binary resource cache.
+
+        Args:
+            * file_path: A string representing the file path.
+
+        Returns:
+            A boolean that specifies whether the file starts with MAGIC.
+
+        Raises:
+            An IOError if the file can not be read.
+        """
+        with io.open(file_path, 'rb') as fp:
+            return fp.read(len(cls.MAGIC)) == cls.MAGIC
+
+    @classmethod
+    def read(cls, file_path):
+        """Opens the cache file with mmap.
+
+        Args:
+            * file_path: A string representing the file path.
+
+        Returns:
+            A list of (header, fetched_at, StringTable) tuples, one for
+                each section.  fetched_at is None if the
+                resources were never fetched.
+
+        Raises:
+            An IOError if the file can not be read or is not a valid cache.
+        """
+        with io.open(file_path, 'rb') as fp:
+            buf = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, num_sections = struct.unpack_from(
+                cls.PREAMBLE, buf, 0)
+            if magic != cls.MAGIC or version != cls.VERSION:
+                raise IOError('Unsupported resource cache: ' + file_path)
+            sections = []
+            for index in range(num_sections):
+                header_offset, header_length, fetched_at, count, \
+                    offsets_start, keys_start, meta_start = \
+                    struct.unpack_from(
+                        cls.ENTRY, buf,
+                        cls.PREAMBLE_SIZE + index * cls.ENTRY_SIZE)
+                header = buf[header_offset:header_offset + header_length] \
+                    .decode('utf-8')
+                if fetched_at != fetched_at:
+                    # NaN marks resources that were never fetched
+                    fetched_at = None
+                sections.append((header, fetched_at,
+                                 StringTable(buf, count, offsets_start,
+                                             keys_start, meta_start)))
+        except struct.error as e:
+            buf.close()
+            raise IOError('Invalid resource cache: ' + str(e))
+        with cls._maps_lock:
+            cls._maps.setdefault(os.path.abspath(file_path), []).append(buf)
+        return sections
+
+    @classmethod
+    def write(cls, file_path, sections):
+        """Writes the cache file atomically.
+
+        The maps read from the file are closed before it is replaced, so
+        StringTables read from it can no longer be used.
+
+        Args:
+            * file_path: A string representing the file path.
+            * sections: A list of (header, fetched_at, resources) tuples,
+                one for each section.  fetched_at is None if the resources
+                were never fetched.  The meta of resources with a meta
+                attribute, such as a ResourceList, is written too.
+
+        Returns:
+            None.
+
+        Raises:
+            An IOError or OSError if the file can not be written.
+        """
+        data = cls._serialize(sections)
+        cache_dir = os.path.dirname(file_path)
+        if cache_dir and not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        fd, temp_path = tempfile.mkstemp(dir=cache_dir or None,
+                                         prefix='.resources',
+                                         suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                fp.write(data)
+            cls._close_maps(file_path)
+            getattr(os, 'replace', os.rename)(temp_path, file_path)
+        except (IOError, OSError):
+            os.remove(temp_path)
+            raise
+
+    @classmethod
+    def _close_maps(cls, file_path):
+        """Closes the maps opened by reading the file.
+
+        Args:
+            * file_path: A string representing the file path.
+
+        Returns:
+            None.
+        """
+        with cls._maps_lock:
+            maps = cls._maps.pop(os.path.abspath(file_path), [])
+        for buf in maps:
+            buf.close()
+
+    @classmethod
+    def _serialize(cls, sections):
+        """Serializes the sections into the cache format.
+
+        Args:
+            * sections: A list of (header, fetched_at, resources) tuples.
+
+        Returns:
+            A bytes string representing the cache file.
+        """
+        chunks = []
+        entries = []
+        position = cls.PREAMBLE_SIZE + len(sections) * cls.ENTRY_SIZE
+        for header, fetched_at, resources in sections:
+            names = sorted(resources)
+            encoded_header = header.encode('utf-8')
+            header_offset = position
+            chunks.append(encoded_header)
+            position += len(encoded_header)
+            offsets = []
+            for name in names:
+                encoded = name.encode('utf-8')
+                offsets.append(position)
+                chunks.append(struct.pack(cls.LENGTH, len(encoded)))
+                chunks.append(encoded)
+                position += cls.LENGTH_SIZE + len(encoded)
+            offsets_start = position
+            chunks.append(struct.pack('<{0}Q'.format(len(offsets)), *offsets))
+            position += len(offsets) * cls.OFFSET_SIZE
+            keys_start = position
+            ranks = sorted(range(len(names)),
+                           key=lambda rank: (names[rank].lower(), rank))
+            chunks.append(struct.pack('<{0}I'.format(len(ranks)), *ranks))
+            position += len(ranks) * cls.RANK_SIZE
+            meta = getattr(resources, 'meta', None) or {}
+            meta_offsets = []
+            for name in names:
+                value = meta.get(name)
+                if not value:
+                    meta_offsets.append(0)
+                    continue
+                encoded = value.encode('utf-8')
+                meta_offsets.append(position)
+                chunks.append(struct.pack(cls.LENGTH, len(encoded)))
+                chunks.append(encoded)
+                position += cls.LENGTH_SIZE + len(encoded)
+            meta_start = 0
+            if any(meta_offsets):
+                meta_start = position
+                chunks.append(struct.pack('<{0}Q'.format(len(meta_offsets)),
+                                          *meta_offsets))
+                position += len(meta_offsets) * cls.OFFSET_SIZE
+            entries.append(struct.pack(
+                cls.ENTRY, header_offset, len(encoded_header),
+                float('nan') if fetched_at is None else fetched_at,
+                len(names), offsets_start, keys_start, meta_start))
+        return b''.join(
+            [struct.pack(cls.PREAMBLE, cls.MAGIC, cls.VERSION,
+                         len(sections))] + entries + chunks)
@@ -16,13 +16,20 @@
 from __future__ import unicode_literals
 from __future__ import print_function
 import os
+import threading
+import time
 try:
     from collections import OrderedDict
 except:
     from ordereddict import OrderedDict
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 from .data_util import DataUtil
+from .refresher import ResourceRefresher
+from .resource_cache import ResourceCache, StringTable
+from .resource.backend import ResourceList, SubprocessBackend, \
+    list_profiles
 from .resource.instance_ids import InstanceIds
 from .resource.instance_tag_keys import InstanceTagKeys
 from .resource.instance_tag_values import InstanceTagValues
@@ -30,15 +37,85 @@ from .resource.bucket_names import BucketNames
 from .resource.bucket_uris import BucketUris
 
 
+class ResourcePartition(object):
+    """Encapsulates the resources of one AWS profile and region.
+
+    Each partition has its own Resource instances, query backend and cache
+    file, so a refresh that is still running for one partition never
+    writes into another.
+
+    The inventory partition, whose profile is INVENTORY, merges the
+    partitions of the inventory profiles in its region.
+
+    Attributes:
+        * INVENTORY: A string representing the profile of the inventory
+            partition.
+        * context: A tuple of the profile and region strings, as returned by
+            AwsResources.get_context().
+        * query_backend: An instance of QueryBackend querying the profile
+            and region.
+        * resource_lists: A list of Resource instances.
+        * resources_path: A string representing the full file path of the
+            partition's resource cache.
+    """
+
+    INVENTORY = '*'
+
+    def __init__(self, context, query_backend, resource_lists,
+                 resources_path):
+        """Initializes ResourcePartition.
+
+        Args:
+            * context: A tuple of the profile and region strings.
+            * query_backend: An instance of QueryBackend.
+            * resource_lists: A list of Resource instances.
+            * resources_path: A string representing the full file path of
+                the partition's resource cache.
+
+        Returns:
+            None.
+        """
+        self.context = context
+        self.query_backend = query_backend
+        self.resource_lists = resource_lists
+        self.resources_path = resources_path
+
+    @property
+    def is_inventory(self):
+        """Determines whether the partition is the inventory partition.
+
+        Args:
+            * None.
+
+        Returns:
+            A boolean that specifies whether the partition merges the
+                inventory profiles.
+        """
+        return self.context[0] == self.INVENTORY
+
+
 class AwsResources(object):
     """Encapsulates AWS resources such as ec2 tags and buckets.
 
+    Resources are partitioned by AWS profile and region, as selected by the
+    AWS_PROFILE and AWS_DEFAULT_REGION environment variables.  Switching to
+    another profile or region swaps in that partition's resources, loading
+    them from its cache file the first time, and only queries AWS for the
+    ones that are missing or expired.
+
+    In inventory mode, unless AWS_PROFILE selects a single profile, the
+    resources of all inventory profiles are refreshed in one concurrent
+    pass and merged, each completion showing the profiles it came from.
+    Credentials are resolved once per profile and reused by its queries.
+
     Attributes:
-        * resources_path: A string representing the full file path of
-            data/RESOURCES.txt.
+        * resources_path: A string representing the full file path of the
+            current partition's resource cache.
         * log_exception: A callable log_exception from SawsLogger.
+        * query_backend: An instance of QueryBackend used by the current
+            partition's resources.
         * resource_lists: A list where each element is a list of completions
-            for each resource.
+            for each resource of the current partition.
         * resources_headers_map: A dict mapping resource headers to
             resources to complete.  Headers denote the start of each
             set of resources in the RESOURCES.txt file.
@@ -49,8 +126,28 @@ class AwsResources(object):
         * data_util: An instance of DataUtil().
         * header_to_type_map: A dict mapping headers as they appear in the
             RESOURCES.txt file to their corresponding ResourceType.
+        * refresher: An instance of ResourceRefresher.
+        * refresh_progress: A tuple of ints (done, total) representing the
+            progress of the running background refresh, or None if no
+            background refresh is running.
+        * RETRY_INTERVAL: An int representing the number of seconds to wait
+            before retrying a failed refresh of an expired resource.
+        * partition: An instance of ResourcePartition for the current
+            profile and region.
+        * inventory_profiles: A list of profile strings merged in inventory
+            mode, ALL_PROFILES for all profiles in the AWS config files, or
+            empty to disable inventory mode.
+        * inventory_refresher: An instance of ResourceRefresher used for
+            inventory refreshes.
+        * ALL_PROFILES: A string that selects all profiles.
+        * INVENTORY_MAX_WORKERS: An int representing the number of
+            resources queried at the same time in inventory mode.
     """
 
+    RETRY_INTERVAL = 60
+    ALL_PROFILES = 'all'
+    INVENTORY_MAX_WORKERS = 16
+
     class ResourceType(Enum):
         """Enum specifying the resource type.
 
@@ -70,19 +167,29 @@ class AwsResources(object):
             BUCKET_NAMES, BUCKET_URIS = range(NUM_TYPES)
 
     def __init__(self,
-                 log_exception):
+                 log_exception,
+                 query_backend=None,
+                 inventory_profiles=None):
         """Initializes AwsResources.
 
         Args:
             * log_exception: A callable log_exception from SawsLogger.
+            * query_backend: An instance of QueryBackend.  Defaults to
+                running each resource's QUERY with the awscli.  Each
+                partition queries with a copy of it for its profile and
+                region.
+            * inventory_profiles: A list of profile strings to merge in
+                inventory mode, or ALL_PROFILES.
 
         Returns:
             None.
         """
-        # TODO: Use a file version instead of a new file
-        self._set_resources_path('data/RESOURCES_v2.txt')
         self.log_exception = log_exception
-        self.resource_lists = self._create_resource_lists()
+        self._query_backend = query_backend or SubprocessBackend()
+        self.inventory_profiles = list(inventory_profiles or [])
+        self._all_profiles = None
+        self.partition = self._create_partition(self._get_current_context())
+        self._partitions = {self.partition.context: self.partition}
         self.resources_headers_map = None
         self.resources_options_map = None
         self.resource_headers = self._get_resource_headers()
@@ -91,25 +198,135 @@ class AwsResources(object):
         self.header_to_type_map = self.data_util.create_header_to_type_map(
             headers=self.resource_headers,
             data_type=self.ResourceType)
+        self.refresher = ResourceRefresher(self.log_exception)
+        self.inventory_refresher = ResourceRefresher(
+            self.log_exception, max_workers=self.INVENTORY_MAX_WORKERS)
+        self.refresh_progress = None
+        self._refresh_lock = threading.Lock()
+        self._refresh_thread = None
+        self._expired_attempts = {}
+
+    @property
+    def resource_lists(self):
+        """Gets the resource lists of the current partition.
+
+        Args:
+            * None.
+
+        Returns:
+            A list of Resource instances.
+        """
+        return self.partition.resource_lists
+
+    @property
+    def query_backend(self):
+        """Gets the query backend of the current partition.
+
+        Args:
+            * None.
+
+        Returns:
+            An instance of QueryBackend.
+        """
+        return self.partition.query_backend
+
+    @property
+    def resources_path(self):
+        """Gets the resource cache path of the current partition.
+
+        Args:
+            * None.
+
+        Returns:
+            A string representing the full file path of the resource cache.
+        """
+        return self.partition.resources_path
+
+    @resources_path.setter
+    def resources_path(self, resources_path):
+        """Sets the resource cache path of the current partition.
 
-    def refresh(self, force_refresh=False):
+        Args:
+            * resources_path: A string representing the full file path of
+                the resource cache.
+
+        Returns:
+            None.
+        """
+        self.partition.resources_path = resources_path
+
+    @staticmethod
+    def get_context():
+        """Gets the AWS profile and region selected by the environment.
+
+        Args:
+            * None.
+
+        Returns:
+            A tuple of the AWS_PROFILE and AWS_DEFAULT_REGION strings, each
+                empty if not set.
+        """
+        return (os.environ.get('AWS_PROFILE', ''),
+                os.environ.get('AWS_DEFAULT_REGION', ''))
+
+    def switch_context(self, context=None, on_progress=None):
+        """Switches to the resources of another profile and region.
+
+        The partition is loaded from its cache the first time it is used,
+        then kept in memory.  Resources that are missing or expired are
+        queried in the background, unless another background refresh is
+        running, in which case they are queried lazily when completed.
+
+        Args:
+            * context: A tuple of the profile and region strings.  Defaults
+                to the ones selected by the environment, or to the
+                inventory in inventory mode.
+            * on_progress: A callable called without arguments whenever the
+                background refresh progresses or finishes.
+
+        Returns:
+            A boolean that specifies whether the partition changed.
+        """
+        if context is None:
+            context = self._get_current_context()
+        if context == self.partition.context:
+            return False
+        partition = self._get_partition(context)
+        self.partition = partition
+        self._update_resources_maps()
+        expired = [resource_list for resource_list in partition.resource_lists
+                   if resource_list.is_expired()]
+        if expired:
+            self._refresh_in_background(on_progress, expired, partition)
+        return True
+
+    def refresh(self, force_refresh=False, background=False,
+                on_progress=None):
         """Refreshes the AWS resources and caches them to a file.
 
         This function is called on startup.
         If no cache exists, it queries AWS to build the resource lists.
         Pressing the `F5` key will set force_refresh to True, which proceeds
         to refresh the list regardless of whether a cache exists.
-        Before returning, it saves the resource lists to cache.
+        Before returning, it saves the queried resource lists to cache.
+
+        If background is True, the AWS queries run on a background thread
+        and this function returns right away.  The current completions stay
+        usable until the new resource lists are swapped in.
 
         Args:
             * force_refresh: A boolean determines whether to force a cache
                 refresh.  This value is set to True when the user presses `F5`.
+            * background: A boolean that determines whether to query AWS on a
+                background thread.
+            * on_progress: A callable called without arguments whenever the
+                background refresh progresses or finishes.
 
         Returns:
             None.
         """
-        self.clear_resources()
         if not force_refresh:
+            self.clear_resources()
             try:
                 self._refresh_resources_from_file()
                 print('Loaded resources from cache')
@@ -117,15 +334,70 @@ class AwsResources(object):
                 print('No resource cache found')
                 force_refresh = True
         if force_refresh:
+            if background:
+                self._update_resources_maps()
+                self._refresh_in_background(on_progress)
+                return
+            self.clear_resources()
             self._query_resources()
-        try:
-            self.resources_headers_map = self._create_resources_map(
-                self.resource_headers)
-            self.resources_options_map = self._create_resources_map(
-                self.resource_options)
-            self._save_resources_to_file()
-        except IOError as e:
-            self.log_exception(e, traceback)
+        self._update_resources_maps()
+        if force_refresh:
+            self._save_resources()
+
+    def refresh_expired(self, option, on_progress=None):
+        """Refreshes the resource for the option in the background if expired.
+
+        Called when the option is completed, so resources whose TTL passed
+        are queried lazily instead of on every refresh.  Failed queries are
+        retried after RETRY_INTERVAL.
+
+        Args:
+            * option: A string representing the resource option, such as
+                '--instance-ids'.
+            * on_progress: A callable called without arguments whenever the
+                background refresh progresses or finishes.
+
+        Returns:
+            A boolean that specifies whether a refresh was started.
+        """
+        now = time.time()
+        for resource_list in self.resource_lists:
+            if resource_list.OPTION != option:
+                continue
+            key = (self.partition.context, option)
+            if not resource_list.is_expired(now) or \
+                    now - self._expired_attempts.get(key, 0) < \
+                    self.RETRY_INTERVAL:
+                return False
+            self._expired_attempts[key] = now
+            return self._refresh_in_background(on_progress, [resource_list])
+        return False
+
+    def get_refresh_progress(self):
+        """Gets the progress of the running background refresh.
+
+        Args:
+            * None.
+
+        Returns:
+            A tuple of ints (done, total), or None if no background refresh
+                is running.
+        """
+        return self.refresh_progress
+
+    def wait_for_refresh(self, timeout=None):
+        """Waits for the running background refresh to finish.
+
+        Args:
+            * timeout: A number representing the seconds to wait, or None to
+                wait until the refresh finishes.
+
+        Returns:
+            None.
+        """
+        thread = self._refresh_thread
+        if thread is not None:
+            thread.join(timeout)
 
     def clear_resources(self):
         """Clears all resources.
@@ -139,23 +411,177 @@ class AwsResources(object):
         for resource_list in self.resource_lists:
             resource_list.clear_resources()
 
-    def _create_resource_lists(self):
+    def _get_current_context(self):
+        """Gets the context of the partition to complete from.
+
+        Args:
+            * None.
+
+        Returns:
+            A tuple of the profile and region strings.  The profile is
+                ResourcePartition.INVENTORY in inventory mode, unless
+                AWS_PROFILE selects a profile.
+        """
+        profile, region = self.get_context()
+        if self.inventory_profiles and not profile:
+            profile = ResourcePartition.INVENTORY
+        return profile, region
+
+    def _get_partition(self, context):
+        """Gets the partition for the context, loading it on first use.
+
+        Args:
+            * context: A tuple of the profile and region strings.
+
+        Returns:
+            An instance of ResourcePartition.
+        """
+        partition = self._partitions.get(context)
+        if partition is None:
+            partition = self._create_partition(context)
+            try:
+                self._refresh_resources_from_file(partition)
+            except IOError:
+                pass
+            self._partitions[context] = partition
+        return partition
+
+    def _get_inventory_profiles(self):
+        """Gets the profiles merged in inventory mode.
+
+        Args:
+            * None.
+
+        Returns:
+            A list of profile strings.
+        """
+        if self.ALL_PROFILES not in self.inventory_profiles:
+            return self.inventory_profiles
+        if self._all_profiles is None:
+            try:
+                self._all_profiles = list_profiles()
+            except Exception as e:
+                self.log_exception(e, traceback)
+                return []
+        return self._all_profiles
+
+    def _get_inventory_members(self, partition):
+        """Gets the partitions merged into the inventory partition.
+
+        Args:
+            * partition: An instance of ResourcePartition, the inventory
+                partition.
+
+        Returns:
+            A list of ResourcePartition, one for each inventory profile in
+                the inventory partition's region.
+        """
+        return [self._get_partition((profile, partition.context[1]))
+                for profile in self._get_inventory_profiles()]
+
+    def _resolve_credentials(self, partitions):
+        """Resolves the credentials of the partitions concurrently.
+
+        Partitions whose credentials can not be resolved are still queried,
+        each query resolves the credentials itself.
+
+        Args:
+            * partitions: A list of ResourcePartition.
+
+        Returns:
+            None.
+        """
+        query_backends = [partition.query_backend for partition in partitions
+                          if partition.query_backend.credentials is None]
+        if not query_backends:
+            return
+        with ThreadPoolExecutor(
+                max_workers=min(len(query_backends),
+                                self.INVENTORY_MAX_WORKERS)) as executor:
+            futures = [executor.submit(query_backend.resolve_credentials)
+                       for query_backend in query_backends]
+        for future in futures:
+            if future.exception() is not None:
+                self.log_exception(future.exception(), traceback)
+
+    def _merge_inventory(self, members, resource_lists):
+        """Merges the resources of the inventory profiles.
+
+        Each merged resource list holds the resources of all profiles once.
+        Its meta maps each resource to the profiles it came from, followed
+        by the regions it was found in, if the resource was queried from
+        several regions.  The merged resources are as fresh as the oldest
+        profile's.
+
+        Args:
+            * members: A list of ResourcePartition, as returned by
+                _get_inventory_members.
+            * resource_lists: A list of the inventory partition's Resource
+                instances to merge into.
+
+        Returns:
+            None.
+        """
+        for resource_list in resource_lists:
+            sources = {}
+            fetch_times = []
+            for member in members:
+                for member_list in member.resource_lists:
+                    if member_list.HEADER != resource_list.HEADER:
+                        continue
+                    fetch_times.append(member_list.fetched_at)
+                    meta = getattr(member_list.resources, 'meta', None) or {}
+                    profile = member.context[0]
+                    for name in member_list.resources:
+                        regions = meta.get(name)
+                        if regions:
+                            labels = [profile + ':' + region
+                                      for region in regions.split(',')]
+                        else:
+                            labels = [profile]
+                        sources.setdefault(name, []).extend(labels)
+            resource_list.resources = ResourceList(
+                sorted(sources),
+                dict((name, ','.join(labels))
+                     for name, labels in sources.items()))
+            if not fetch_times or None in fetch_times:
+                resource_list.fetched_at = None
+            else:
+                resource_list.fetched_at = min(fetch_times)
+
+    def _create_partition(self, context):
+        """Creates an empty partition for the profile and region.
+
+        Args:
+            * context: A tuple of the profile and region strings.
+
+        Returns:
+            An instance of ResourcePartition.
+        """
+        query_backend = self._query_backend.with_context(*context)
+        return ResourcePartition(context,
+                                 query_backend,
+                                 self._create_resource_lists(query_backend),
+                                 ResourceCache.get_path(*context))
+
+    def _create_resource_lists(self, query_backend):
         """Create the resource lists.
 
         Append new resource class instances here.
         Note: Order is important, new resources should be added to the end.
 
         Args:
-            * None.
+            * query_backend: An instance of QueryBackend used by the
+                resources.
 
         Returns:
-            None.
+            A list of Resource instances.
         """
-        return [InstanceIds(),
-                InstanceTagKeys(),
-                InstanceTagValues(),
-                BucketNames(),
-                BucketUris()]
+        return [InstanceIds(query_backend),
+                InstanceTagKeys(query_backend),
+                InstanceTagValues(query_backend),
+                BucketNames(query_backend),
+                BucketUris(query_backend)]
 
     def _get_resource_headers(self):
         """Builds a list of resource headers found in the resource file.
@@ -215,36 +641,178 @@ class AwsResources(object):
         resources_map = OrderedDict(zip(resource_key, resources))
         return resources_map
 
-    def _query_resources(self):
-        """Runs queries for all resources.
+    def _query_resources(self, echo=True, on_progress=None,
+                         resource_lists=None, partition=None):
+        """Runs queries for the resources concurrently.
+
+        Resources that are parsed from the same AWS data, such as instance
+        ids and instance tags, share a single fetch.  Errors are logged by
+        the refresher as they happen, queries that time out are logged here.
+
+        Resources of the inventory partition are queried for each inventory
+        profile in a single pass, then merged.
 
         Args:
-            * None.
+            * echo: A boolean that determines whether to print the refresh
+                status to the console.
+            * on_progress: A callable called with the number of finished
+                queries and the total number of queries whenever a query
+                finishes.
+            * resource_lists: A list of the Resource instances to query.
+                Defaults to all resources of the partition.
+            * partition: An instance of ResourcePartition the resources
+                belong to.  Defaults to the current partition.
+
+        Returns:
+            A list of RefreshResult, one for each resource queried.
+        """
+        if partition is None:
+            partition = self.partition
+        if resource_lists is None:
+            resource_lists = partition.resource_lists
+        if echo:
+            print('Refreshing resources...')
+        refresher = self.refresher
+        queried = resource_lists
+        if partition.is_inventory:
+            members = self._get_inventory_members(partition)
+            self._resolve_credentials(members)
+            headers = set(resource_list.HEADER
+                          for resource_list in resource_lists)
+            queried = [member_list
+                       for member in members
+                       for member_list in member.resource_lists
+                       if member_list.HEADER in headers]
+            refresher = self.inventory_refresher
+        query_backends = set(resource_list.query_backend
+                             for resource_list in queried)
+        for query_backend in query_backends:
+            query_backend.begin_refresh()
+        try:
+            results = refresher.refresh(queried, on_progress=on_progress)
+        finally:
+            for query_backend in query_backends:
+                query_backend.end_refresh()
+        if partition.is_inventory:
+            self._merge_inventory(members, resource_lists)
+        for result in results:
+            if result.timed_out:
+                self.log_exception(result.error, traceback)
+        if echo:
+            print('Done refreshing')
+        return results
+
+    def _refresh_in_background(self, on_progress=None, resource_lists=None,
+                               partition=None):
+        """Starts querying the resources on a background thread.
+
+        Only one background refresh runs at a time.
+
+        Args:
+            * on_progress: A callable called without arguments whenever the
+                refresh progresses or finishes.
+            * resource_lists: A list of the Resource instances to query.
+                Defaults to all resources of the partition.
+            * partition: An instance of ResourcePartition the resources
+                belong to.  Defaults to the current partition.
+
+        Returns:
+            A boolean that specifies whether a new refresh was started.
+        """
+        if partition is None:
+            partition = self.partition
+        if resource_lists is None:
+            resource_lists = partition.resource_lists
+        with self._refresh_lock:
+            if self.refresh_progress is not None:
+                return False
+            self.refresh_progress = (0, len(resource_lists))
+        self._refresh_thread = threading.Thread(
+            target=self._run_background_refresh,
+            args=(on_progress, resource_lists, partition))
+        self._refresh_thread.daemon = True
+        self._refresh_thread.start()
+        return True
+
+    def _run_background_refresh(self, on_progress, resource_lists,
+                                partition):
+        """Queries the resources and swaps in the new resource lists.
+
+        Runs on the background refresh thread.  The new resource lists are
+        only swapped in if the partition is still the current one, they are
+        saved to the partition's cache either way.
+
+        Args:
+            * on_progress: A callable called without arguments whenever the
+                refresh progresses or finishes.
+            * resource_lists: A list of the Resource instances to query.
+            * partition: An instance of ResourcePartition the resources
+                belong to.
 
         Returns:
             None.
         """
-        print('Refreshing resources...')
-        for resource_list in self.resource_lists:
-            try:
-                resource_list.query_resource()
-            except Exception as e:
-                self.log_exception(e, traceback)
-        print('Done refreshing')
+        def update_progress(done, total):
+            self.refresh_progress = (done, total)
+            if on_progress is not None:
+                on_progress()
 
-    def _get_all_resources(self):
-        """Gets all resources from the data/RESOURCES.txt file.
+        try:
+            self._query_resources(echo=False,
+                                  on_progress=update_progress,
+                                  resource_lists=resource_lists,
+                                  partition=partition)
+            if partition is self.partition:
+                self._update_resources_maps()
+            self._save_resources(partition)
+        except Exception as e:
+            self.log_exception(e, traceback)
+        finally:
+            with self._refresh_lock:
+                self.refresh_progress = None
+            if on_progress is not None:
+                on_progress()
+
+    def _update_resources_maps(self):
+        """Swaps in resource maps built from the current resource lists.
+
+        Each map is built completely before it is assigned, so readers on
+        other threads see either the old or the new resources.
 
         Args:
             * None.
 
         Returns:
-            A list, where each element is a list of completions for each
-                ResourceType
+            None.
+        """
+        self.resources_headers_map = self._create_resources_map(
+            self.resource_headers)
+        self.resources_options_map = self._create_resources_map(
+            self.resource_options)
+
+    def _save_resources(self, partition=None):
+        """Saves the AWS resources to cache, logging any IOError.
+
+        Saving the inventory partition also saves the partitions of the
+        inventory profiles.
+
+        Args:
+            * partition: An instance of ResourcePartition to save.
+                Defaults to the current partition.
+
+        Returns:
+            None.
         """
-        return DataUtil().get_data(self.resources_path,
-                                   self.header_to_type_map,
-                                   self.ResourceType)
+        if partition is None:
+            partition = self.partition
+        partitions = [partition]
+        if partition.is_inventory:
+            partitions.extend(self._get_inventory_members(partition))
+        for partition in partitions:
+            try:
+                self._save_resources_to_file(partition)
+            except (IOError, OSError) as e:
+                self.log_exception(e, traceback)
 
     def _set_resources_path(self, resources_file):
         """Sets the path of where to load the resources.
@@ -259,30 +827,85 @@ class AwsResources(object):
         RESOURCES_DIR = os.path.dirname(os.path.realpath(__file__))
         self.resources_path = os.path.join(RESOURCES_DIR, resources_file)
 
-    def _refresh_resources_from_file(self):
-        """Refreshes the AWS resources from data/RESOURCES.txt.
+    def _refresh_resources_from_file(self, partition=None):
+        """Refreshes the AWS resources from the resource cache.
+
+        The binary cache is memory-mapped, each resource list becomes a
+        StringTable reading its resources from the file on demand.  Text
+        files in the RESOURCES.txt format, such as the sample resources,
+        are read with DataUtil.
+
+        Each header stores the time its resources were fetched.  Resources
+        from a cache without fetch times are treated as expired.
 
         Args:
-            * file_path: A string representing the resource file path.
+            * partition: An instance of ResourcePartition to load.
+                Defaults to the current partition.
 
         Returns:
             None.
+
+        Raises:
+            An IOError if the cache can not be read.
         """
-        all_resources = self._get_all_resources()
+        if partition is None:
+            partition = self.partition
+        resources_path = partition.resources_path
+        resource_lists = partition.resource_lists
+        if ResourceCache.is_cache_file(resources_path):
+            sections = dict(
+                (header, (fetched_at, resources)) for header, fetched_at,
+                resources in ResourceCache.read(resources_path))
+            for resource_list in resource_lists:
+                resource_list.fetched_at, resource_list.resources = \
+                    sections.get(resource_list.HEADER, (None, []))
+            return
+        all_resources, header_values = self.data_util.read_data(
+            resources_path,
+            self.header_to_type_map,
+            self.ResourceType)
         for index, resources in enumerate(all_resources):
-            self.resource_lists[index].resources = resources
+            resource_lists[index].resources = resources
+            try:
+                resource_lists[index].fetched_at = \
+                    float(header_values[index][0])
+            except (IndexError, ValueError):
+                resource_lists[index].fetched_at = None
+
+    def _save_resources_to_file(self, partition=None):
+        """Saves the AWS resources to the resource cache.
 
-    def _save_resources_to_file(self):
-        """Saves the AWS resources to data/RESOURCES.txt.
+        Each resource list is written with the time its resources were
+        fetched, if they were.  Writing closes the cache that resources
+        not queried since they were loaded were read from, so they are
+        read again from the new cache.
 
         Args:
-            * None.
+            * partition: An instance of ResourcePartition to save.
+                Defaults to the current partition.
 
         Returns:
             None.
+
+        Raises:
+            An IOError or OSError if the cache can not be written.
         """
-        with open(self.resources_path, 'wt') as fp:
-            for key, resources in self.resources_headers_map.items():
-                fp.write(key + ': ' + str(len(resources)) + '\n')
-                for resource in resources:
-                    fp.write(resource + '\n')
+        if partition is None:
+            partition = self.partition
+        ResourceCache.write(
+            partition.resources_path,
+            [(resource_list.HEADER,
+              resource_list.fetched_at,
+              resource_list.resources)
+             for resource_list in partition.resource_lists])
+        stale_lists = [resource_list
+                       for resource_list in partition.resource_lists
+                       if isinstance(resource_list.resources, StringTable)]
+        if stale_lists:
+            sections = dict(
+                (header, resources) for header, _, resources
+                in ResourceCache.read(partition.resources_path))
+            for resource_list in stale_lists:
+                resource_list.resources = sections[resource_list.HEADER]
+            if partition is self.partition:
+                self._update_resources_maps()
@@ -0,0 +1,362 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2015 Donne Martin. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+
+from __future__ import unicode_literals
+from __future__ import print_function
+import os
+import re
+import time
+from collections import OrderedDict
+
+
+class ResultCache(object):
+    """Caches the output of read-only aws commands for a while.
+
+    Entries are keyed by the command's arguments, with shortcuts already
+    replaced, and by the profile and region set in the environment.  Any
+    other command on a service may change its resources, so it drops the
+    entries of the service in every profile and region.
+
+    Attributes:
+        * READ_PREFIXES: A tuple of the prefixes of read-only subcommands.
+        * READ_COMMANDS: A dict mapping commands to a list of their
+            read-only subcommands without one of the prefixes.
+        * UNCACHED: A list of read-only subcommands whose output is not
+            cached, as they write files or return short-lived credentials.
+        * SERVICES: A dict mapping commands to the service whose entries
+            they share.
+        * FLAGS: A list of the global options that do not take a value.
+        * CONTEXT_ENV: A list of the environment variables selecting the
+            profile and region.
+        * MAX_ENTRIES: An int representing the number of entries kept, the
+            least recently used are dropped first.
+        * MAX_OUTPUT_SIZE: An int representing the size in bytes of the
+            largest output cached.
+        * AWS_REGEX: A compiled regex matching the `aws` word in a shell
+            command.
+        * SHELL_OPERATORS_REGEX: A compiled regex matching the operators
+            ending the first command of a shell command.
+        * SERVICE_REGEX: A compiled regex matching a plain service name.
+        * ttl: A number representing how long entries are kept, in seconds.
+        * entries: An OrderedDict mapping keys to a tuple of the service,
+            the time the output was cached and the output bytes.
+    """
+
+    READ_PREFIXES = ('describe-', 'list-', 'get-')
+    READ_COMMANDS = {
+        's3': ['ls'],
+    }
+    UNCACHED = [
+        'get-authorization-token',
+        'get-federation-token',
+        'get-login',
+        'get-login-password',
+        'get-object',
+        'get-object-torrent',
+        'get-session-token',
+    ]
+    SERVICES = {
+        's3api': 's3',
+    }
+    FLAGS = [
+        '--debug',
+        '--no-cli-auto-prompt',
+        '--no-cli-pager',
+        '--no-paginate',
+        '--no-sign-request',
+        '--no-verify-ssl',
+    ]
+    CONTEXT_ENV = [
+        'AWS_PROFILE',
+        'AWS_DEFAULT_PROFILE',
+        'AWS_REGION',
+        'AWS_DEFAULT_REGION',
+    ]
+    MAX_ENTRIES = 64
+    MAX_OUTPUT_SIZE = 4 * 1024 * 1024
+    AWS_REGEX = re.compile(r'(?<![\w.$/-])aws(?![\w.-])')
+    SHELL_OPERATORS_REGEX = re.compile(r'[|;&<>()`\n]')
+    SERVICE_REGEX = re.compile(r'^[a-z0-9-]+$')
+
+    def __init__(self, ttl):
+        """Initializes ResultCache.
+
+        Args:
+            * ttl: A number representing how long entries are kept, in
+                seconds.
+
+        Returns:
+            None.
+        """
+        self.ttl = ttl
+        self.entries = OrderedDict()
+
+    def find_command(self, args):
+        """Finds the command and subcommand in the arguments.
+
+        Args:
+            * args: A list of strings representing the arguments of the aws
+                command, without `aws`.
+
+        Returns:
+            A tuple of the command and subcommand strings, either is None
+                if not found.
+        """
+        words = []
+        expects_value = False
+        for arg in args:
+            if expects_value:
+                expects_value = False
+            elif arg.startswith('--'):
+                # Only global options come before the subcommand, most of
+                # them take a value
+                expects_value = arg not in self.FLAGS and '=' not in arg
+            else:
+                words.append(arg)
+                if len(words) == 2:
+                    break
+        words.extend([None, None])
+        return words[0], words[1]
+
+    def is_cacheable(self, args):
+        """Determines whether the output of the command can be cached.
+
+        Args:
+            * args: A list of strings representing the arguments of the aws
+                command, without `aws`.
+
+        Returns:
+            A boolean that specifies whether the command is read-only and
+                its output can be cached.
+        """
+        command, sub_command = self.find_command(args)
+        if command is None or sub_command is None or \
+                sub_command in self.UNCACHED:
+            return False
+        return sub_command.startswith(self.READ_PREFIXES) or \
+            sub_command in self.READ_COMMANDS.get(command, [])
+
+    def get_key(self, args):
+        """Gets the key of the command's entry.
+
+        Args:
+            * args: A list of strings representing the arguments of the aws
+                command, without `aws`.
+
+        Returns:
+            A tuple representing the key.
+        """
+        return tuple(os.environ.get(name, '') for name in self.CONTEXT_ENV) \
+            + tuple(args)
+
+    def get(self, args):
+        """Gets the cached output of the command.
+
+        Args:
+            * args: A list of strings representing the arguments of the aws
+                command, without `aws`.
+
+        Returns:
+            A tuple of the output bytes and a float representing its age in
+                seconds, or None if the output is not cached or expired.
+        """
+        key = self.get_key(args)
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        _, created, output = entry
+        age = time.time() - created
+        if age > self.ttl or age < 0:
+            del self.entries[key]
+            return None
+        # Keep the most recently used entries last
+        del self.entries[key]
+        self.entries[key] = entry
+        return output, age
+
+    def put(self, args, output):
+        """Caches the output of the command.
+
+        Args:
+            * args: A list of strings representing the arguments of the aws
+                command, without `aws`.
+            * output: A bytes object representing the output.
+
+        Returns:
+            None.
+        """
+        if len(output) > self.MAX_OUTPUT_SIZE:
+            return
+        key = self.get_key(args)
+        self.entries.pop(key, None)
+        self.entries[key] = (self._get_service(args), time.time(), output)
+        while len(self.entries) > self.MAX_ENTRIES:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, args):
+        """Drops the entries of the service the command may change.
+
+        Args:
+            * args: A list of strings representing the arguments of the aws
+                command, without `aws`.
+
+        Returns:
+            None.
+        """
+        service = self._get_service(args)
+        if service is not None:
+            self._drop_service(service)
+
+    def invalidate_shell_command(self, text):
+        """Drops the entries a shell command may change.
+
+        Commands that can not be parsed into aws arguments, such as
+        commands with pipes or variables, are invalidated conservatively:
+        a single aws command with a plain service drops the entries of the
+        service, any other command running aws drops all of the entries.
+
+        Args:
+            * text: A string that represents the input command text.
+
+        Returns:
+            None.
+        """
+        runs_aws = self.AWS_REGEX.findall(text)
+        if not runs_aws:
+            return
+        words = self.SHELL_OPERATORS_REGEX.split(text, 1)[0].split()
+        if len(runs_aws) == 1 and words[:1] == ['aws']:
+            service = self._get_service(words[1:])
+            if service is not None and self.SERVICE_REGEX.match(service):
+                self._drop_service(service)
+                return
+        self.clear()
+
+    def clear(self):
+        """Drops all entries.
+
+        Args:
+            * None.
+
+        Returns:
+            None.
+        """
+        self.entries.clear()
+
+    def _drop_service(self, service):
+        """Drops the entries of the service in every profile and region.
+
+        Args:
+            * service: A string representing the service.
+
+        Returns:
+            None.
+        """
+        for key, entry in list(self.entries.items()):
+            if entry[0] == service:
+                del self.entries[key]
+
+    def _get_service(self, args):
+        """Gets the service of the command.
+
+        Args:
+            * args: A list of strings representing the arguments of the aws
+                command, without `aws`.
+
+        Returns:
+            A string representing the service, or None if there is no
+                command.
+        """
+        command, _ = self.find_command(args)
+        return self.SERVICES.get(command, command)
+
+
+class RecordingStream(object):
+    """A binary file object recording the output written through it.
+
+    Stops recording once the output is larger than MAX_OUTPUT_SIZE, large
+    outputs are not cached.
+
+    Attributes:
+        * out: A binary file object the output is passed on to, or None.
+        * chunks: A list of the bytes written.
+        * size: An int representing the number of bytes written.
+    """
+
+    def __init__(self, out=None):
+        """Initializes RecordingStream.
+
+        Args:
+            * out: A binary file object the output is passed on to, or None.
+
+        Returns:
+            None.
+        """
+        self.out = out
+        self.chunks = []
+        self.size = 0
+
+    @property
+    def complete(self):
+        """Whether all of the output was recorded.
+
+        Args:
+            * None.
+
+        Returns:
+            A boolean that specifies whether all of the output was recorded.
+        """
+        return self.size <= ResultCache.MAX_OUTPUT_SIZE
+
+    def write(self, data):
+        """Records the data and passes it on.
+
+        Args:
+            * data: A bytes object representing a chunk of the output.
+
+        Returns:
+            An int representing the number of bytes consumed.
+        """
+        self.size += len(data)
+        if self.complete:
+            self.chunks.append(bytes(data))
+        else:
+            self.chunks = []
+        if self.out is not None:
+            self.out.write(data)
+        return len(data)
+
+    def flush(self):
+        """Flushes the output passed on.
+
+        Args:
+            * None.
+
+        Returns:
+            None.
+        """
+        if self.out is not None:
+            self.out.flush()
+
+    def getvalue(self):
+        """Gets the recorded output.
+
+        Args:
+            * None.
+
+        Returns:
+            A bytes object representing the output.
+        """
+        return b''.join(self.chunks)
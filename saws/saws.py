@@ -18,7 +18,10 @@ from __future__ import print_function
 import click
 import os
 import platform
+import re
 import subprocess
+import sys
+import threading
 import traceback
 import webbrowser
 from prompt_toolkit import AbortAction, Application, CommandLineInterface
@@ -33,7 +36,6 @@ from prompt_toolkit.history import FileHistory
 from prompt_toolkit.key_binding.input_processor import KeyPress
 from prompt_toolkit.keys import Keys
 from prompt_toolkit.auto_suggest import AutoSuggestFromHistory
-from awscli import completer as awscli_completer
 from .completer import AwsCompleter
 from .lexer import CommandLexer
 from .config import Config
@@ -41,6 +43,11 @@ from .style import StyleFactory
 from .keys import KeyManager
 from .toolbar import Toolbar
 from .commands import AwsCommands
+from .options import AwsOptions
+from .snapshot import Snapshot
+from .worker import AwsWorker
+from .highlighter import OutputHighlighter
+from .result_cache import ResultCache, RecordingStream
 from .logger import SawsLogger
 from .__init__ import __version__
 
@@ -55,14 +62,26 @@ class Saws(object):
         * config_obj: An instance of ConfigObj, reads from ~/.sawsrc.
         * theme: A string representing the lexer theme.
         * logger: An instance of SawsLogger.
+        * snapshot: An instance of Snapshot holding the static completion
+            data.
         * all_commands: A list of all commands, sub_commands, options, etc
             from data/SOURCES.txt.
         * commands: A list of commands from data/SOURCES.txt.
         * sub_commands: A list of sub_commands from data/SOURCES.txt.
+        * command_tree: An instance of CommandTree.
+        * shortcuts: An OrderedDict containing shortcuts commands as keys
+            and their corresponding full commands as values.
         * completer: An instance of AwsCompleter.
+        * worker: An instance of AwsWorker running aws commands, or None if
+            they run in the shell.
+        * output_highlighter: An instance of OutputHighlighter, created the
+            first time output is highlighted.
+        * result_cache: An instance of ResultCache, or None if the output
+            of commands is not cached.
     """
 
-    PYGMENTS_CMD = ' | pygmentize -l json'
+    CHUNK_SIZE = 65536
+    ENV_NAME_REGEX = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
 
     def __init__(self, refresh_resources=True):
         """Inits Saws.
@@ -83,21 +102,42 @@ class Saws(object):
             __name__,
             self.config_obj[self.config.MAIN][self.config.LOG_FILE],
             self.config_obj[self.config.MAIN][self.config.LOG_LEVEL]).logger
-        self.all_commands = AwsCommands().all_commands
+        self.snapshot = Snapshot.load(self.config,
+                                      self.config_obj,
+                                      log_exception=self.log_exception)
+        self.all_commands = self.snapshot.all_commands
+        self.command_tree = self.snapshot.command_tree
+        self.shortcuts = self.snapshot.shortcuts
         self.commands = \
             self.all_commands[AwsCommands.CommandType.COMMANDS.value]
         self.sub_commands = \
             self.all_commands[AwsCommands.CommandType.SUB_COMMANDS.value]
         self.completer = AwsCompleter(
-            awscli_completer,
+            None,
             self.all_commands,
             self.config,
             self.config_obj,
             self.log_exception,
             fuzzy_match=self.get_fuzzy_match(),
-            shortcut_match=self.get_shortcut_match())
+            shortcut_match=self.get_shortcut_match(),
+            shortcuts=self.shortcuts,
+            command_tree=self.command_tree,
+            options=AwsOptions(self.all_commands,
+                               ec2_states=self.snapshot.ec2_states),
+            on_refresh_progress=self._request_redraw)
+        self.worker = None
+        self.output_highlighter = None
+        self.result_cache = None
+        result_cache_ttl = self.config_obj[self.config.MAIN].as_int(
+            self.config.RESULT_CACHE_TTL)
+        if result_cache_ttl > 0:
+            self.result_cache = ResultCache(result_cache_ttl)
+        if self.config_obj[self.config.MAIN].as_bool(self.config.AWS_WORKER):
+            self.worker = AwsWorker()
         if refresh_resources:
-            self.completer.refresh_resources_and_options()
+            self.completer.refresh_resources_and_options(
+                background=True,
+                on_progress=self._request_redraw)
         self._create_cli()
 
     def log_exception(self, e, traceback, echo=False):
@@ -212,7 +252,9 @@ class Saws(object):
     def refresh_resources_and_options(self):
         """Convenience function to refresh resources and options for completion.
 
-        Used by prompt_toolkit's KeyBindingManager.
+        Used by prompt_toolkit's KeyBindingManager.  The AWS queries run on a
+        background thread so the prompt stays responsive, the toolbar shows
+        the refresh progress.
 
         Args:
             * None.
@@ -220,7 +262,26 @@ class Saws(object):
         Returns:
             None.
         """
-        self.completer.refresh_resources_and_options(force_refresh=True)
+        if self.result_cache is not None:
+            self.result_cache.clear()
+        self.completer.refresh_resources_and_options(
+            force_refresh=True,
+            background=True,
+            on_progress=self._request_redraw)
+
+    def get_refresh_status(self):
+        """Gets the progress of the running background resource refresh.
+
+        Used by the Toolbar.
+
+        Args:
+            * None.
+
+        Returns:
+            A tuple of ints (done, total), or None if no background refresh
+                is running.
+        """
+        return self.completer.resources.get_refresh_progress()
 
     def handle_docs(self, text=None, from_fkey=False):
         """Displays contextual web docs for `F9` or the `docs` command.
@@ -256,13 +317,14 @@ class Saws(object):
         if len(tokens) > 2 and tokens[-1] == AwsCommands.AWS_DOCS:
             prev_word = tokens[-2]
             # If we have a command, build the url
-            if prev_word in self.commands:
+            if self.command_tree.is_command(prev_word):
                 prev_word = prev_word + '/'
                 url = base_url + prev_word + index_html
                 webbrowser.open(url)
                 return True
             # if we have a command and subcommand, build the url
-            elif prev_word in self.sub_commands:
+            elif self.command_tree.is_sub_command(prev_word,
+                                                  command=tokens[-3]):
                 command_url = tokens[-3] + '/'
                 sub_command_url = tokens[-2] + '.html'
                 url = base_url + command_url + sub_command_url
@@ -276,6 +338,33 @@ class Saws(object):
             return True
         return False
 
+    def _request_redraw(self):
+        """Requests a redraw of the prompt_toolkit's CommandLineInterface.
+
+        Safe to call from any thread, such as the background refresh thread.
+
+        Args:
+            * None.
+
+        Returns:
+            None.
+        """
+        if self.aws_cli is not None:
+            self.aws_cli.invalidate()
+
+    def _on_text_changed(self, buffer):
+        """Cancels completing text the user has changed since.
+
+        Registered before prompt_toolkit starts completing the new text.
+
+        Args:
+            * buffer: An instance of prompt_toolkit's Buffer.
+
+        Returns:
+            None.
+        """
+        self.completer.cancel_stale_completions(buffer.text)
+
     def _handle_cd(self, text):
         """Handles a `cd` shell command by calling python's os.chdir.
 
@@ -308,8 +397,47 @@ class Saws(object):
             return True
         return False
 
-    def _colorize_output(self, text):
-        """Highlights output with pygments.
+    def _handle_export(self, text):
+        """Handles `export` and `unset` shell commands by updating os.environ.
+
+        Passing them to subprocess.call would only change the environment of
+        the subshell.  Setting AWS_PROFILE or AWS_DEFAULT_REGION this way
+        switches the aws commands and the resource completions to another
+        profile or region.
+        Only lines made entirely of `NAME=value` or `NAME` arguments are
+        handled.  Lines with options, such as `export -p`, or shell syntax,
+        such as `export AWS_PROFILE=dev; aws s3 ls`, are passed to the shell.
+        Note: Like `cd`, the changes are only in effect while running Saws.
+
+        Attributes:
+            * text: A string representing the input command text.
+
+        Returns:
+            A boolean representing an `export` or `unset` command was found
+                and handled.
+        """
+        EXPORT_CMD = 'export'
+        UNSET_CMD = 'unset'
+        tokens = AwsWorker.split_plain_command(text)
+        if not tokens or len(tokens) < 2 or \
+                tokens[0] not in (EXPORT_CMD, UNSET_CMD):
+            return False
+        assignments = []
+        for token in tokens[1:]:
+            name, _, value = token.partition('=')
+            if not self.ENV_NAME_REGEX.match(name) or \
+                    (tokens[0] == UNSET_CMD and token != name):
+                return False
+            assignments.append((name, value if token != name else None))
+        for name, value in assignments:
+            if tokens[0] == UNSET_CMD:
+                os.environ.pop(name, None)
+            elif value is not None:
+                os.environ[name] = value
+        return True
+
+    def _should_colorize(self, text):
+        """Determines whether to highlight the output of the command.
 
         Only highlights the output if all of the following conditions are True:
 
@@ -318,27 +446,55 @@ class Saws(object):
         * The text does not contain the `configure` command
         * The text does not contain the `help` command, which already does
             output highlighting
+        * The text does not pipe the output to another command
 
         Args:
             * text: A string that represents the input command text.
 
         Returns:
-            A string that represents:
-                * The original command text if no highlighting was performed.
-                * The pygments highlighted command text otherwise.
+            A boolean that specifies whether to highlight the output.
         """
         stripped_text = text.strip()
         if not self.get_color() or stripped_text == '':
-            return text
+            return False
         if AwsCommands.AWS_COMMAND not in stripped_text.split():
-            return text
+            return False
         excludes = [AwsCommands.AWS_CONFIGURE,
                     AwsCommands.AWS_HELP,
                     '|']
-        if not any(substring in stripped_text for substring in excludes):
-            return text.strip() + self.PYGMENTS_CMD
-        else:
-            return text
+        return not any(substring in stripped_text for substring in excludes)
+
+    def _stream_output(self, text, write_output, recorder=None):
+        """Writes the output of the command to the terminal.
+
+        Args:
+            * text: A string that represents the input command text.
+            * write_output: A function writing the output to the binary
+                file object it is passed and returning the exit status.
+            * recorder: An instance of RecordingStream to record the output
+                with, or None.
+
+        Returns:
+            An int representing the exit status returned by write_output.
+        """
+        sys.stdout.flush()
+        out = getattr(sys.stdout, 'buffer', sys.stdout)
+        highlighted = None
+        if self._should_colorize(text):
+            if self.output_highlighter is None:
+                self.output_highlighter = OutputHighlighter(self.theme)
+            highlighted = out = self.output_highlighter.create_stream(
+                out, getattr(sys.stdout, 'encoding', None))
+        if recorder is not None:
+            recorder.out = out
+            out = recorder
+        try:
+            return write_output(out)
+        finally:
+            if highlighted is not None:
+                highlighted.close()
+            else:
+                out.flush()
 
     def _handle_keyboard_interrupt(self, e, platform):
         """Handles keyboard interrupts more gracefully on Mac/Unix/Linux.
@@ -383,16 +539,123 @@ class Saws(object):
             if self.handle_docs(text):
                 return
         try:
-            if not self._handle_cd(text):
-                text = self._colorize_output(text)
-                # Pass the command onto the shell so aws-cli can execute it
-                subprocess.call(text, shell=True)
+            if self._handle_export(text):
+                self.completer.resources.switch_context(
+                    on_progress=self._request_redraw)
+            elif not self._handle_cd(text):
+                self._run_command(text)
             print('')
         except KeyboardInterrupt as e:
             self._handle_keyboard_interrupt(e, platform.system())
         except Exception as e:
             self.log_exception(e, traceback, echo=True)
 
+    def _run_command(self, text):
+        """Runs the command, showing its cached output if there is one.
+
+        The output of read-only commands that succeed is cached, other aws
+        commands drop the cached output of their service.  Commands using
+        shell syntax are not cached and drop the output they may change.
+
+        Args:
+            * text: A string that represents the input command text.
+
+        Returns:
+            None.
+        """
+        args = AwsWorker.parse_command(text)
+        if self.result_cache is None:
+            self._execute(text, args)
+            return
+        if args is None:
+            self.result_cache.invalidate_shell_command(text)
+            self._execute(text, args)
+            return
+        if not self.result_cache.is_cacheable(args):
+            self.result_cache.invalidate(args)
+            self._execute(text, args)
+            return
+        cached = self.result_cache.get(args)
+        if cached is not None:
+            output, age = cached
+            self._stream_output(text, lambda stream: stream.write(output))
+            click.secho('(cached {0}s ago)'.format(int(age)), fg='cyan')
+            return
+        recorder = RecordingStream()
+        if self._execute(text, args, recorder) == 0 and recorder.complete:
+            self.result_cache.put(args, recorder.getvalue())
+
+    def _execute(self, text, args, recorder=None):
+        """Runs the command on the worker if possible, else in the shell.
+
+        Args:
+            * text: A string that represents the input command text.
+            * args: A list of strings representing the arguments of the aws
+                command, or None if it can not run on the worker.
+            * recorder: An instance of RecordingStream to record the output
+                with, or None.
+
+        Returns:
+            An int representing the exit status of the command.
+        """
+        if self.worker is not None and args is not None:
+            return self._run_on_worker(text, args, recorder)
+        return self._run_in_shell(text, recorder)
+
+    def _run_in_shell(self, text, recorder=None):
+        """Passes the command onto the shell so aws-cli can execute it.
+
+        Output to highlight or record is read from the command as it runs,
+        a chunk at a time.
+
+        Args:
+            * text: A string that represents the input command text.
+            * recorder: An instance of RecordingStream to record the output
+                with, or None.
+
+        Returns:
+            An int representing the exit status of the command.
+        """
+        if recorder is None and not self._should_colorize(text):
+            return subprocess.call(text, shell=True)
+        process = subprocess.Popen(text, shell=True, stdout=subprocess.PIPE,
+                                   bufsize=0)
+
+        def copy_output(stream):
+            try:
+                for chunk in iter(
+                        lambda: process.stdout.read(self.CHUNK_SIZE), b''):
+                    stream.write(chunk)
+            finally:
+                process.stdout.close()
+                process.wait()
+            return process.returncode
+
+        return self._stream_output(text, copy_output, recorder)
+
+    def _run_on_worker(self, text, args, recorder=None):
+        """Runs the aws command on the worker.
+
+        Output to highlight or record is passed through a stream as the
+        worker sends it.
+
+        Args:
+            * text: A string that represents the input command text.
+            * args: A list of strings representing the arguments of the aws
+                command.
+            * recorder: An instance of RecordingStream to record the output
+                with, or None.
+
+        Returns:
+            An int representing the exit status of the command.
+        """
+        if recorder is None and not self._should_colorize(text):
+            return self.worker.run(args)
+        return self._stream_output(
+            text,
+            lambda stream: self.worker.run(args, stdout=stream, tty=False),
+            recorder)
+
     def _create_cli(self):
         """Creates the prompt_toolkit's CommandLineInterface.
 
@@ -405,11 +668,14 @@ class Saws(object):
         history = FileHistory(os.path.expanduser('~/.saws-history'))
         toolbar = Toolbar(self.get_color,
                           self.get_fuzzy_match,
-                          self.get_shortcut_match)
+                          self.get_shortcut_match,
+                          self.get_refresh_status)
         layout = create_default_layout(
             message='saws> ',
             reserve_space_for_menu=8,
-            lexer=CommandLexer,
+            lexer=CommandLexer.create(
+                patterns=self.snapshot.lexer_patterns,
+                tokenizer=self.completer.text_utils.tokenizer),
             get_bottom_toolbar_tokens=toolbar.handler,
             extra_input_processors=[
                 ConditionalProcessor(
@@ -423,6 +689,7 @@ class Saws(object):
             auto_suggest=AutoSuggestFromHistory(),
             enable_history_search=True,
             completer=self.completer,
+            on_text_changed=self._on_text_changed,
             complete_while_typing=Always(),
             accept_action=AcceptAction.RETURN_DOCUMENT)
         self.key_manager = KeyManager(
@@ -460,6 +727,16 @@ class Saws(object):
         """
         print('Version:', __version__)
         print('Theme:', self.theme)
-        while True:
-            document = self.aws_cli.run(reset_current_buffer=True)
-            self._process_command(document.text)
+        # Load the awscli while the user types the first command
+        warm_up_thread = threading.Thread(target=self.completer.warm_up)
+        warm_up_thread.daemon = True
+        warm_up_thread.start()
+        if self.worker is not None:
+            self.worker.start()
+        try:
+            while True:
+                document = self.aws_cli.run(reset_current_buffer=True)
+                self._process_command(document.text)
+        finally:
+            if self.worker is not None:
+                self.worker.stop()
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2015 Donne Martin. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+
+from __future__ import unicode_literals
+from __future__ import print_function
+import re
+from collections import OrderedDict
+
+
+class ShortcutTrie(object):
+    """Expands shortcuts in command text with a trie of their tokens.
+
+    The trie is built once from the shortcuts.  Expanding walks the text's
+    tokens from left to right: at each token, the trie finds the shortcuts
+    starting there and the first one in the shortcuts file is expanded,
+    then the walk carries on after it.  The cost depends on the length of
+    the text, not on the number of shortcuts, and every shortcut in the
+    text is expanded in the same pass.
+
+    Each `%s` in an expansion is replaced with the next token following
+    the shortcut, as long as it is not a shell operator such as `|`.
+
+    Expansions are cached per text, as the completer expands the same text
+    on each keystroke and again when the command runs.
+
+    Attributes:
+        * SUBSTITUTION_MARKER: A string representing the marker replaced
+            with the token following the shortcut.
+        * MAX_CACHED: An int representing the number of expansions cached,
+            the least recently used are dropped first.
+        * TERMINAL: The key of a trie node's shortcut, None as it can not
+            be a token.
+        * TOKEN_REGEX: A compiled regex matching the tokens of the text.
+        * SHELL_OPERATORS: A tuple of the prefixes of tokens not used for
+            substitutions.
+        * root: A dict representing the trie's root node.  Nodes map tokens
+            to child nodes, and TERMINAL to a tuple of the shortcut's
+            position in the shortcuts and its full command.
+        * cache: An OrderedDict mapping texts to their expansions.
+    """
+
+    SUBSTITUTION_MARKER = '%s'
+    MAX_CACHED = 256
+    TERMINAL = None
+    TOKEN_REGEX = re.compile(r'\S+')
+    SHELL_OPERATORS = ('|', '&', ';', '<', '>')
+
+    def __init__(self, shortcuts):
+        """Initializes ShortcutTrie.
+
+        Args:
+            * shortcuts: An OrderedDict containing shortcuts commands as keys
+                and their corresponding full commands as values.
+
+        Returns:
+            None.
+        """
+        self.root = {}
+        self.cache = OrderedDict()
+        for position, (key, value) in enumerate(shortcuts.items()):
+            tokens = key.split()
+            if not tokens:
+                continue
+            node = self.root
+            for token in tokens:
+                node = node.setdefault(token, {})
+            node.setdefault(self.TERMINAL, (position, value))
+
+    def expand(self, text):
+        """Expands the shortcuts in the text.
+
+        Args:
+            * text: A string representing the input command text.
+
+        Returns:
+            A string representing the text with its shortcuts replaced
+                by their full commands.
+        """
+        expanded = self.cache.get(text)
+        if expanded is None:
+            expanded = self._expand(text)
+            self.cache[text] = expanded
+            if len(self.cache) > self.MAX_CACHED:
+                self.cache.popitem(last=False)
+        else:
+            # Keep the most recently used expansions last
+            del self.cache[text]
+            self.cache[text] = expanded
+        return expanded
+
+    def _expand(self, text):
+        """Expands the shortcuts in the text, without the cache.
+
+        Args:
+            * text: A string representing the input command text.
+
+        Returns:
+            A string representing the expanded text.
+        """
+        spans = [match.span() for match in self.TOKEN_REGEX.finditer(text)]
+        tokens = [text[start:end] for start, end in spans]
+        pieces = []
+        copied = 0
+        index = 0
+        while index < len(tokens):
+            match = self._match(tokens, index)
+            if match is None:
+                index += 1
+                continue
+            end, value = match
+            pieces.append(text[copied:spans[index][0]])
+            parts = value.split(self.SUBSTITUTION_MARKER)
+            pieces.append(parts[0])
+            for part in parts[1:]:
+                if end < len(tokens) and \
+                        not tokens[end].startswith(self.SHELL_OPERATORS):
+                    pieces.append(tokens[end])
+                    end += 1
+                else:
+                    pieces.append(self.SUBSTITUTION_MARKER)
+                pieces.append(part)
+            copied = spans[end - 1][1]
+            index = end
+        if not pieces:
+            return text
+        pieces.append(text[copied:])
+        return ''.join(pieces)
+
+    def _match(self, tokens, index):
+        """Finds the shortcut to expand at the token.
+
+        Args:
+            * tokens: A list of strings representing the text's tokens.
+            * index: An int representing the position of the token.
+
+        Returns:
+            A tuple of an int representing the position of the token
+                following the shortcut and a string representing its full
+                command, or None if no shortcut starts at the token.
+        """
+        node = self.root
+        best = None
+        for end in range(index, len(tokens)):
+            node = node.get(tokens[end])
+            if node is None:
+                break
+            terminal = node.get(self.TERMINAL)
+            if terminal is not None and \
+                    (best is None or terminal[0] < best[0]):
+                best = (terminal[0], end + 1, terminal[1])
+        if best is None:
+            return None
+        return best[1], best[2]
@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2015 Donne Martin. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+
+from __future__ import unicode_literals
+from __future__ import print_function
+import os
+import sys
+import traceback
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
+from .command_tree import CommandTree
+from .commands import AwsCommands
+from .config import Config
+from .lexer import CommandLexer
+from .options import AwsOptions
+from .resource_cache import ResourceCache
+from .__init__ import __version__
+
+
+class Snapshot(object):
+    """Encapsulates the static completion data read on startup.
+
+    Reading the commands, options and shortcuts from their text files,
+    sorting them and optimizing the lexer's regexes for thousands of words
+    takes a noticeable part of the startup time, although the files rarely
+    change.  The results are pickled to a single file, which later launches
+    load with one read.
+
+    The snapshot records the modification time and size of every file it
+    was built from.  If any of them changed, or the snapshot was written by
+    another version, it is rebuilt from the text files.  It is kept in the
+    per-user cache directory, next to the resource caches.
+
+    Attributes:
+        * VERSION: An int representing the snapshot format version, bump it
+            whenever the pickled data changes.
+        * PATH: A string representing the snapshot file path, in the
+            per-user cache directory.
+        * all_commands: A list of all commands, sub_commands, options, etc
+            from data/SOURCES.txt.
+        * command_tree: An instance of CommandTree.
+        * ec2_states: A list of the possible EC2 instance states.
+        * shortcuts: An OrderedDict containing shortcuts commands as keys
+            and their corresponding full commands as values.
+        * lexer_patterns: A list of regex strings as returned by
+            CommandLexer.get_patterns().
+    """
+
+    VERSION = 3
+    PATH = os.path.join(ResourceCache.DIR, 'snapshot.pickle')
+
+    def __init__(self, all_commands, command_tree, ec2_states, shortcuts,
+                 lexer_patterns):
+        """Initializes Snapshot.
+
+        Args:
+            * all_commands: A list of all commands, sub_commands, options,
+                etc from data/SOURCES.txt.
+            * command_tree: An instance of CommandTree.
+            * ec2_states: A list of the possible EC2 instance states.
+            * shortcuts: An OrderedDict containing shortcuts commands as
+                keys and their corresponding full commands as values.
+            * lexer_patterns: A list of regex strings as returned by
+                CommandLexer.get_patterns().
+
+        Returns:
+            None.
+        """
+        self.all_commands = all_commands
+        self.command_tree = command_tree
+        self.ec2_states = ec2_states
+        self.shortcuts = shortcuts
+        self.lexer_patterns = lexer_patterns
+
+    @classmethod
+    def load(cls, config, config_obj, snapshot_path=None,
+             log_exception=None):
+        """Loads the snapshot, rebuilding it if it is missing or stale.
+
+        Args:
+            * config: An instance of Config.
+            * config_obj: An instance of ConfigObj, reads from ~/.sawsrc.
+            * snapshot_path: A string representing the snapshot file path.
+                Defaults to PATH.
+            * log_exception: A callable log_exception from SawsLogger, or
+                None to ignore errors writing the snapshot.
+
+        Returns:
+            An instance of Snapshot.
+        """
+        snapshot_path = os.path.expanduser(snapshot_path or cls.PATH)
+        snapshot = cls.read(snapshot_path, cls.get_source_stats())
+        if snapshot is not None:
+            return snapshot
+        snapshot = cls.build(config, config_obj)
+        try:
+            snapshot.write(snapshot_path)
+        except (IOError, OSError, pickle.PicklingError) as e:
+            if log_exception is not None:
+                log_exception(e, traceback)
+        return snapshot
+
+    @classmethod
+    def build(cls, config, config_obj):
+        """Builds the snapshot from the text files.
+
+        Args:
+            * config: An instance of Config.
+            * config_obj: An instance of ConfigObj, reads from ~/.sawsrc.
+
+        Returns:
+            An instance of Snapshot.
+        """
+        aws_commands = AwsCommands()
+        shortcuts = config.get_shortcuts(config_obj)
+        return cls(aws_commands.all_commands,
+                   aws_commands.command_tree,
+                   AwsOptions(aws_commands.all_commands).ec2_states,
+                   shortcuts,
+                   CommandLexer.get_patterns(shortcuts,
+                                             aws_commands.all_commands))
+
+    @classmethod
+    def read(cls, snapshot_path, source_stats):
+        """Reads the snapshot file, unless it is stale.
+
+        Args:
+            * snapshot_path: A string representing the snapshot file path.
+            * source_stats: A dict as returned by get_source_stats().
+
+        Returns:
+            An instance of Snapshot, or None if the file is missing,
+                unreadable or stale.
+        """
+        try:
+            with open(snapshot_path, 'rb') as fp:
+                data = pickle.loads(fp.read())
+            if data['version'] != cls.VERSION or \
+                    data['saws_version'] != __version__ or \
+                    data['source_stats'] != source_stats:
+                return None
+            return cls(data['all_commands'],
+                       CommandTree(data['commands'], data['global_options'],
+                                   data['flat_command_tree'],
+                                   data['awscli_version']),
+                       data['ec2_states'],
+                       OrderedDict(data['shortcuts']),
+                       data['lexer_patterns'])
+        except (EnvironmentError, pickle.UnpicklingError, EOFError,
+                AttributeError, ImportError, IndexError, KeyError, TypeError,
+                ValueError):
+            return None
+
+    def write(self, snapshot_path):
+        """Writes the snapshot file.
+
+        The file is written next to snapshot_path and renamed over it, so
+        a concurrent launch never reads a partial snapshot.
+
+        Args:
+            * snapshot_path: A string representing the snapshot file path.
+
+        Returns:
+            None.
+
+        Raises:
+            An IOError or OSError if the file can not be written.
+        """
+        data = {
+            'version': self.VERSION,
+            'saws_version': __version__,
+            'source_stats': self.get_source_stats(),
+            'all_commands': self.all_commands,
+            'commands': dict(
+                (command, dict((sub_command, None) for sub_command in subs))
+                for command, subs in self.command_tree.commands.items()),
+            'global_options': self.command_tree.global_options,
+            'flat_command_tree': self.command_tree.flat,
+            'awscli_version': self.command_tree.awscli_version,
+            'ec2_states': self.ec2_states,
+            'shortcuts': list(self.shortcuts.items()),
+            'lexer_patterns': self.lexer_patterns,
+        }
+        snapshot_dir = os.path.dirname(snapshot_path)
+        if snapshot_dir and not os.path.isdir(snapshot_dir):
+            os.makedirs(snapshot_dir)
+        temp_path = '{0}.{1}.tmp'.format(snapshot_path, os.getpid())
+        with open(temp_path, 'wb') as fp:
+            fp.write(pickle.dumps(data, protocol=2))
+        try:
+            getattr(os, 'replace', os.rename)(temp_path, snapshot_path)
+        except OSError:
+            os.remove(temp_path)
+            raise
+
+    @classmethod
+    def get_source_stats(cls):
+        """Gets the modification time and size of the snapshot's sources.
+
+        Args:
+            * None.
+
+        Returns:
+            A dict mapping each source file path to a tuple of its
+                modification time and size, or to None if it is missing.
+        """
+        config_dir = os.path.dirname(os.path.realpath(__file__))
+        source_paths = [
+            AwsCommands.DATA_PATH,
+            CommandTree.DATA_PATH,
+            AwsOptions.OPTIONS_PATH,
+            os.path.join(config_dir, Config.SHORTCUTS_TEMPLATE),
+            os.path.expanduser(Config.SHORTCUTS_PATH),
+        ]
+        source_stats = {}
+        for source_path in source_paths:
+            try:
+                stat = os.stat(source_path)
+                source_stats[source_path] = (stat.st_mtime, stat.st_size)
+            except OSError:
+                source_stats[source_path] = None
+        return source_stats
+
+
+if __name__ == '__main__':
+    # Rebuild the startup snapshot from the text files
+    config = Config()
+    snapshot_path = sys.argv[1] if len(sys.argv) > 1 else Snapshot.PATH
+    Snapshot.build(config, config.read_configuration()).write(
+        os.path.expanduser(snapshot_path))
@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2015 Donne Martin. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+
+from __future__ import unicode_literals
+from __future__ import print_function
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+
+
+class Token(object):
+    """A word of the command text.
+
+    Attributes:
+        * value: A string representing the word, with its quotes and
+            escapes removed as the shell would.
+        * start: An int representing the position of the word's first
+            character in the text.
+        * end: An int representing the position following the word's last
+            character in the text.
+    """
+
+    def __init__(self, value, start, end):
+        """Initializes Token.
+
+        Args:
+            * value: A string representing the word.
+            * start: An int representing the position of the word's first
+                character.
+            * end: An int representing the position following the word's
+                last character.
+
+        Returns:
+            None.
+        """
+        self.value = value
+        self.start = start
+        self.end = end
+
+    def __eq__(self, other):
+        return isinstance(other, Token) and \
+            (self.value, self.start, self.end) == \
+            (other.value, other.start, other.end)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return 'Token({0!r}, {1}, {2})'.format(self.value, self.start,
+                                               self.end)
+
+
+class Tokenizer(object):
+    """Splits command text into words the way the shell would.
+
+    Quotes and escapes are handled like shlex.split in POSIX mode, but an
+    unterminated quote or a trailing backslash is not an error: the quote
+    runs to the end of the text, as it does while the user is typing it.
+
+    The tokens of the texts seen last are cached, so the completer and the
+    lexer split each document text once between them.  A new text is only
+    scanned from the first word its edit may have changed, the words
+    before it are reused from the last text.  Typing at the end of a long
+    `--filters` or `--query` line scans the last word, not the line.
+
+    The completer runs on a thread of its own, the cache is locked.
+
+    Attributes:
+        * MAX_CACHED: An int representing the number of texts whose tokens
+            are cached.
+        * QUOTES: A string of the quote characters.
+        * ESCAPE: A string representing the escape character.
+        * cache: An OrderedDict mapping texts to a list of their Tokens.
+    """
+
+    MAX_CACHED = 16
+    QUOTES = '\'"'
+    ESCAPE = '\\'
+
+    def __init__(self):
+        """Initializes Tokenizer.
+
+        Args:
+            * None.
+
+        Returns:
+            None.
+        """
+        self.cache = OrderedDict()
+        self._last_text = ''
+        self._last_tokens = []
+        self._last_ends = []
+        self._lock = threading.Lock()
+
+    def tokenize(self, text):
+        """Gets the tokens of the text.
+
+        Args:
+            * text: A string representing the command text.
+
+        Returns:
+            A list of Tokens, which must not be modified.
+        """
+        with self._lock:
+            tokens = self.cache.pop(text, None)
+            if tokens is None:
+                tokens = self._tokenize_tail(text)
+                self._last_text = text
+                self._last_tokens = tokens
+                self._last_ends = [token.end for token in tokens]
+            self.cache[text] = tokens
+            while len(self.cache) > self.MAX_CACHED:
+                self.cache.popitem(last=False)
+            return tokens
+
+    def get_words(self, text):
+        """Gets the words of the text.
+
+        Args:
+            * text: A string representing the command text.
+
+        Returns:
+            A list of strings for each word in the text.
+        """
+        return [token.value for token in self.tokenize(text)]
+
+    def scan(self, text, position=0):
+        """Splits the text into tokens, without the cache.
+
+        Args:
+            * text: A string representing the command text.
+            * position: An int representing the position to start from,
+                which must not be inside a word.
+
+        Returns:
+            A list of Tokens.
+        """
+        tokens = []
+        length = len(text)
+        index = position
+        while True:
+            while index < length and text[index].isspace():
+                index += 1
+            if index >= length:
+                return tokens
+            start = index
+            chars = []
+            quote = None
+            while index < length:
+                char = text[index]
+                if quote is None:
+                    if char.isspace():
+                        break
+                    if char in self.QUOTES:
+                        quote = char
+                    elif char == self.ESCAPE and index + 1 < length:
+                        index += 1
+                        chars.append(text[index])
+                    else:
+                        chars.append(char)
+                elif char == quote:
+                    quote = None
+                elif quote == '"' and char == self.ESCAPE and \
+                        index + 1 < length and text[index + 1] in '"\\':
+                    index += 1
+                    chars.append(text[index])
+                else:
+                    chars.append(char)
+                index += 1
+            tokens.append(Token(''.join(chars), start, index))
+
+    def _tokenize_tail(self, text):
+        """Tokenizes the text, reusing the tokens of the last text.
+
+        Called with the lock held.  The tokens of the last text that end
+        before the first changed character, and are followed by whitespace,
+        are the same in the text.
+
+        Args:
+            * text: A string representing the command text.
+
+        Returns:
+            A list of Tokens.
+        """
+        common = self._common_prefix_length(self._last_text, text)
+        # Tokens end at whitespace or at the end of the text, ending before
+        # the common prefix does means being followed by whitespace
+        kept = bisect_left(self._last_ends, common)
+        position = self._last_ends[kept - 1] if kept else 0
+        return self._last_tokens[:kept] + self.scan(text, position)
+
+    def _common_prefix_length(self, first, second):
+        """Gets the length of the common prefix of the strings.
+
+        Args:
+            * first: A string.
+            * second: A string.
+
+        Returns:
+            An int representing the length of the common prefix.
+        """
+        if second.startswith(first):
+            return len(first)
+        if first.startswith(second):
+            return len(second)
+        # Bisect on slice comparisons rather than comparing each character
+        low, high = 0, min(len(first), len(second))
+        while low < high:
+            middle = (low + high + 1) // 2
+            if first[:middle] == second[:middle]:
+                low = middle
+            else:
+                high = middle - 1
+        return low
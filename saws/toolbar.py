@@ -25,7 +25,8 @@ class Toolbar(object):
         * handler: A callable get_toolbar_items.
     """
 
-    def __init__(self, color_cfg, fuzzy_cfg, shortcuts_cfg):
+    def __init__(self, color_cfg, fuzzy_cfg, shortcuts_cfg,
+                 refresh_status=None):
         """Initializes ToolBar.
 
         Args:
@@ -33,15 +34,19 @@ class Toolbar(object):
             * fuzzy_cfg: A boolean that spedifies whether to do fuzzy matching.
             * shortcuts_cfg: A boolean that spedifies whether to match
                 shortcuts.
+            * refresh_status: A callable returning a tuple of ints
+                (done, total) while resources are refreshing, else None.
 
         Returns:
             None
         """
         self.handler = self._create_toolbar_handler(color_cfg,
                                                     fuzzy_cfg,
-                                                    shortcuts_cfg)
+                                                    shortcuts_cfg,
+                                                    refresh_status)
 
-    def _create_toolbar_handler(self, color_cfg, fuzzy_cfg, shortcuts_cfg):
+    def _create_toolbar_handler(self, color_cfg, fuzzy_cfg, shortcuts_cfg,
+                                refresh_status=None):
         """Creates the toolbar handler.
 
         Args:
@@ -49,6 +54,8 @@ class Toolbar(object):
             * fuzzy_cfg: A boolean that spedifies whether to do fuzzy matching.
             * shortcuts_cfg: A boolean that spedifies whether to match
                 shortcuts.
+            * refresh_status: A callable returning a tuple of ints
+                (done, total) while resources are refreshing, else None.
 
         Returns:
             A callable get_toolbar_items.
@@ -56,6 +63,7 @@ class Toolbar(object):
         assert callable(color_cfg)
         assert callable(fuzzy_cfg)
         assert callable(shortcuts_cfg)
+        assert refresh_status is None or callable(refresh_status)
 
         def get_toolbar_items(_):
             """Returns bottom menu items.
@@ -84,11 +92,18 @@ class Toolbar(object):
             else:
                 shortcuts_token = Token.Toolbar.Off
                 shortcuts = 'OFF'
+            progress = refresh_status() if refresh_status else None
+            if progress is not None:
+                refresh_token = Token.Toolbar.On
+                refresh = ' [F5] Refreshing {0}/{1} '.format(*progress)
+            else:
+                refresh_token = Token.Toolbar
+                refresh = ' [F5] Refresh '
             return [
                 (color_token, ' [F2] Color: {0} '.format(color)),
                 (fuzzy_token, ' [F3] Fuzzy: {0} '.format(fuzzy)),
                 (shortcuts_token, ' [F4] Shortcuts: {0} '.format(shortcuts)),
-                (Token.Toolbar, ' [F5] Refresh '),
+                (refresh_token, refresh),
                 (Token.Toolbar, ' [F9] Docs '),
                 (Token.Toolbar, ' [F10] Exit ')
             ]
@@ -15,20 +15,52 @@
 
 from __future__ import unicode_literals
 from __future__ import print_function
-import re
-import six
-import shlex
 from prompt_toolkit.completion import Completion
+from .fuzzy import FuzzyMatcher
+from .index import PrefixIndex
+from .tokenizer import Tokenizer
 
 
 class TextUtils(object):
     """Utilities for parsing and matching text.
 
+    Prefix matching uses a PrefixIndex and fuzzy matching a FuzzyMatcher
+    for each collection.  These are built the first time a collection is
+    matched and reused until the collection is replaced or changes size,
+    such as after a resource refresh.
+
     Attributes:
-        * None.
+        * INDEX_MIN_SIZE: An int representing the smallest collection worth
+            indexing, smaller collections are scanned.
+        * MAX_INDEXES: An int representing the number of indexes to keep.
+        * FUZZY_MATCH_LIMIT: An int representing the maximum number of
+            fuzzy matches to complete for a limited collection.
+        * PREFIX_MATCH_LIMIT: An int representing the maximum number of
+            prefix matches to complete for a limited collection.
+        * tokenizer: An instance of Tokenizer splitting the text, shared
+            with the lexer.
     """
 
-    def find_matches(self, word, collection, fuzzy):
+    INDEX_MIN_SIZE = 64
+    MAX_INDEXES = 32
+    FUZZY_MATCH_LIMIT = 100
+    PREFIX_MATCH_LIMIT = 1000
+
+    def __init__(self):
+        """Initializes TextUtils.
+
+        Args:
+            * None.
+
+        Returns:
+            None.
+        """
+        self.tokenizer = Tokenizer()
+        self._indexes = {}
+        self._fuzzy_matchers = {}
+
+    def find_matches(self, word, collection, fuzzy, should_stop=None,
+                     limit_matches=True):
         """Finds all matches in collection for word.
 
         Args:
@@ -36,13 +68,18 @@ class TextUtils(object):
                 the cursor.
             * collection: A collection of words to match.
             * fuzzy: A boolean that specifies whether to use fuzzy matching.
+            * should_stop: A callable returning True to give up fuzzy
+                matching for prefix matching, or None.
+            * limit_matches: A boolean that specifies whether to complete
+                only the best matches, such as for large resource
+                collections.
 
         Yields:
             A generator of prompt_toolkit's Completions.
         """
         word = self._last_token(word).lower()
         for suggestion in self._find_collection_matches(
-                word, collection, fuzzy):
+                word, collection, fuzzy, should_stop, limit_matches):
             yield suggestion
 
     def get_tokens(self, text):
@@ -55,9 +92,7 @@ class TextUtils(object):
             A list of strings for each word in the text.
         """
         if text is not None:
-            text = text.strip()
-            words = self._safe_split(text)
-            return words
+            return self.tokenizer.get_words(text)
         return []
 
     def get_token_index(self, text, collection):
@@ -86,95 +121,109 @@ class TextUtils(object):
             A string representing the last word in the text.
         """
         if text is not None:
-            text = text.strip()
-            if len(text) > 0:
-                word = self._safe_split(text)[-1]
-                word = word.strip()
-                return word
+            # The word before the cursor changes on each keystroke, keep it
+            # out of the tokenizer's cache of document texts
+            tokens = self.tokenizer.scan(text)
+            if tokens:
+                return tokens[-1].value.strip()
         return ''
 
-    def _fuzzy_finder(self, text, collection, case_sensitive=True):
-        """Customized fuzzy finder with optional case-insensitive matching.
+    def _find_collection_matches(self, word, collection, fuzzy,
+                                 should_stop=None, limit_matches=True):
+        """Yields all matching names in list.
 
-        Adapted from: https://github.com/amjith/fuzzyfinder.
+        Collections annotated with a meta dict, such as resources queried
+        from several regions, display each name's meta next to it.
 
-        Args:
-            text: A string which is typically entered by a user.
-            collection: An iterable that represents a collection of strings
-                which will be filtered based on the input `text`.
-            case_sensitive: A boolean that indicates whether the find
-                will be case sensitive.
+        Fuzzy matching a large collection can take longer than the user
+        waits between keystrokes.  If should_stop returns True while fuzzy
+        matching, the collection is prefix matched instead, which is
+        indexed and fast.
 
-        Returns:
-            A generator object that produces a list of suggestions
-            narrowed down from `collections` using the `text` input.
-        """
-        suggestions = []
-        if case_sensitive:
-            pat = '.*?'.join(map(re.escape, text))
-        else:
-            pat = '.*?'.join(map(re.escape, text.lower()))
-        regex = re.compile(pat)
-        for item in collection:
-            if case_sensitive:
-                r = regex.search(item)
-            else:
-                r = regex.search(item.lower())
-            if r:
-                suggestions.append((len(r.group()), r.start(), item))
-
-        return (z for _, _, z in sorted(suggestions))
-
-    def _find_collection_matches(self, word, collection, fuzzy):
-        """Yields all matching names in list.
+        Only the best matches are completed: prompt_toolkit shows a few rows
+        of the menu, and creating a Completion for each of 100k instance ids
+        would take longer than matching them.  The top matches are selected
+        with a heap rather than by sorting all of them.  Commands and
+        subcommands are not limited, each of them must stay reachable in
+        the menu.
 
         Args:
             * word: A string representing the word before
                 the cursor.
             * collection: A collection of words to match.
             * fuzzy: A boolean that specifies whether to use fuzzy matching.
+            * should_stop: A callable returning True to give up fuzzy
+                matching, or None.
+            * limit_matches: A boolean that specifies whether to complete
+                only the best matches.
 
         Yields:
             A generator of prompt_toolkit's Completions.
         """
         word = word.lower()
+        meta = getattr(collection, 'meta', None) or {}
+        names = None
         if fuzzy:
-            for suggestion in self._fuzzy_finder(word,
-                                                 collection,
-                                                 case_sensitive=False):
-                yield Completion(suggestion, -len(word))
-        else:
-            for name in sorted(collection):
-                if name.lower().startswith(word) or not word:
-                    yield Completion(name, -len(word))
-
-    def _shlex_split(self, text):
-        """Wrapper for shlex, because it does not seem to handle unicode in 2.6.
+            if len(collection) < self.INDEX_MIN_SIZE:
+                matcher = FuzzyMatcher(collection)
+            else:
+                matcher = self._get_cached(self._fuzzy_matchers,
+                                           collection,
+                                           FuzzyMatcher.create)
+            limit = self.FUZZY_MATCH_LIMIT if limit_matches else None
+            names = matcher.find(word, limit, should_stop)
+        if names is None:
+            if len(collection) < self.INDEX_MIN_SIZE:
+                names = (name for name in sorted(collection)
+                         if name.lower().startswith(word) or not word)
+            else:
+                limit = self.PREFIX_MATCH_LIMIT if limit_matches else None
+                names = self._get_index(collection).find_prefix(word, limit)
+        for name in names:
+            yield Completion(name, -len(word), display_meta=meta.get(name))
+
+    def _get_index(self, collection):
+        """Gets the prefix index for the collection, building it if needed.
+
+        Collections that can search themselves, such as the StringTables
+        read from the resource cache, are their own index.
 
         Args:
-            * text: A string to split.
+            * collection: A collection of words to match.
 
         Returns:
-            A list that contains words for each split element of text.
+            An instance of PrefixIndex, or the collection.
         """
-        if six.PY2:
-            text = text.encode('utf-8')
-        return shlex.split(text)
+        if hasattr(collection, 'find_prefix'):
+            return collection
+        return self._get_cached(self._indexes, collection, PrefixIndex)
 
-    def _safe_split(self, text):
-        """Safely splits the input text.
+    def _get_cached(self, cache, collection, factory):
+        """Gets the cached index for the collection, building it if needed.
 
-        Shlex can't always split. For example, "\" crashes the completer.
+        Indexes are keyed by the collection's identity.  The collection is
+        kept alongside its index so the identity can not be reused by
+        another collection while the index is cached.
 
         Args:
-            * text: A string to split.
+            * cache: A dict mapping collection ids to the collection and
+                its index.
+            * collection: A collection of words to match.
+            * factory: A callable building the index from the collection,
+                such as PrefixIndex.
 
         Returns:
-            A list that contains words for each split element of text.
-
+            The index built by factory.
         """
-        try:
-            words = self._shlex_split(text)
-            return words
-        except:
-            return text
+        key = id(collection)
+        cached = cache.get(key)
+        if cached is not None:
+            cached_collection, index = cached
+            if cached_collection is collection and \
+                    len(index) == len(collection):
+                return index
+        if key not in cache and len(cache) >= self.MAX_INDEXES:
+            cache.clear()
+        index = factory(collection)
+        cache[key] = (collection, index)
+        return index
@@ -0,0 +1,611 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2015 Donne Martin. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+
+from __future__ import unicode_literals
+from __future__ import print_function
+import io
+import json
+import os
+import shlex
+import signal
+import struct
+import subprocess
+import sys
+import threading
+import traceback
+from collections import OrderedDict
+import six
+
+
+class AwsWorker(object):
+    """Runs aws commands in a long-lived awscli process.
+
+    Running `aws` in the shell starts a new interpreter for each command,
+    which imports awscli and botocore, loads the service models and
+    resolves credentials before sending a single request.  The worker is a
+    child process that imports awscli once and keeps its CLIDrivers, with
+    their botocore sessions, credentials and connection pools, between
+    commands.
+
+    Each command is sent as a json line on the worker's stdin, with the
+    environment and working directory to run it in.  The worker streams the
+    command's stdout and stderr back as frames on its stdout, followed by an
+    exit frame holding the exit status.  A frame is a FRAME header, the
+    frame kind and the payload length, followed by the payload.
+
+    Only plain `aws` commands run on the worker.  Commands using shell
+    syntax, such as pipes, variables or globs, and commands in EXCLUDES,
+    which need the terminal or read stdin, run in the shell.
+
+    Attributes:
+        * EXCLUDES: A set of words that make a command run in the shell.
+        * SHELL_CHARS: A string of the characters that are special to the
+            shell outside of quotes.  Some, such as '#' and '~', are only
+            special at the start of a word but are always rejected.
+        * DOUBLE_QUOTED_SHELL_CHARS: A string of the characters that are
+            special to the shell inside double quotes.
+        * FRAME: A string representing the struct format of frame headers.
+        * STDOUT: A bytes string representing the kind of stdout frames.
+        * STDERR: A bytes string representing the kind of stderr frames.
+        * EXIT: A bytes string representing the kind of exit frames.
+        * process: An instance of subprocess.Popen running the worker, or
+            None if the worker is not running.
+    """
+
+    EXCLUDES = set(['configure', 'help', 'history', 'start-session',
+                    'execute-command', 'start-live-tail', '-', '--debug'])
+    SHELL_CHARS = '|&;<>()$`\\\n*?[]{}~!#'
+    DOUBLE_QUOTED_SHELL_CHARS = '$`\\!'
+    FRAME = '>cI'
+    FRAME_SIZE = struct.calcsize(FRAME)
+    STDOUT = b'o'
+    STDERR = b'e'
+    EXIT = b'x'
+
+    def __init__(self):
+        """Initializes AwsWorker.
+
+        Args:
+            * None.
+
+        Returns:
+            None.
+        """
+        self.process = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def parse_command(cls, text):
+        """Parses the command text into awscli arguments.
+
+        Args:
+            * text: A string that represents the input command text.
+
+        Returns:
+            A list of argument strings without the leading `aws`, or None
+                if the command should run in the shell.
+        """
+        words = cls.split_plain_command(text)
+        if words is None or len(words) < 2 or words[0] != 'aws':
+            return None
+        if any(word in cls.EXCLUDES for word in words):
+            return None
+        return words[1:]
+
+    @classmethod
+    def split_plain_command(cls, text):
+        """Splits the command text into words if it uses no shell syntax.
+
+        Args:
+            * text: A string that represents the input command text.
+
+        Returns:
+            A list of the words of the command, with quotes removed, or
+                None if the command uses shell syntax.
+        """
+        if not cls._is_plain_command(text):
+            return None
+        try:
+            return shlex.split(text)
+        except ValueError:
+            return None
+
+    def start(self):
+        """Starts the worker process if it is not running.
+
+        The worker starts importing awscli right away, so starting it
+        early hides the import time.
+
+        Args:
+            * None.
+
+        Returns:
+            None.
+        """
+        with self._lock:
+            if self.process is not None and self.process.poll() is None:
+                return
+            # Commands run with the environment sent with each request, the
+            # PYTHONPATH only makes saws importable by the worker
+            env = dict(os.environ)
+            env['PYTHONPATH'] = os.pathsep.join(
+                [os.path.dirname(os.path.dirname(os.path.abspath(__file__)))] +
+                [path for path in [env.get('PYTHONPATH')] if path])
+            self.process = subprocess.Popen(
+                [sys.executable, '-m', 'saws.worker'],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                bufsize=0,
+                env=env)
+
+    def stop(self):
+        """Stops the worker process.
+
+        Args:
+            * None.
+
+        Returns:
+            None.
+        """
+        with self._lock:
+            process, self.process = self.process, None
+        if process is None:
+            return
+        try:
+            process.stdin.close()
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+        except (IOError, OSError):
+            pass
+
+    def run(self, args, stdout=None, stderr=None, tty=None):
+        """Runs the awscli command on the worker.
+
+        The output is written as it arrives.  If the command is interrupted
+        or the worker exits, the worker is stopped and started again for
+        the next command.
+
+        Args:
+            * args: A list of argument strings without the leading `aws`.
+            * stdout: A binary file object the command's stdout is written
+                to.  Defaults to sys.stdout.
+            * stderr: A binary file object the command's stderr is written
+                to.  Defaults to sys.stderr.
+            * tty: A boolean that specifies whether the awscli should format
+                its output for a terminal.  Defaults to whether sys.stdout
+                is a terminal.
+
+        Returns:
+            An int representing the exit status of the command.
+
+        Raises:
+            An IOError if the worker exits while running the command.
+        """
+        sys.stdout.flush()
+        sys.stderr.flush()
+        if stdout is None:
+            stdout = getattr(sys.stdout, 'buffer', sys.stdout)
+        if stderr is None:
+            stderr = getattr(sys.stderr, 'buffer', sys.stderr)
+        if tty is None:
+            tty = sys.stdout.isatty()
+        request = json.dumps({
+            'args': args,
+            'env': dict(os.environ),
+            'cwd': os.getcwd(),
+            'tty': tty,
+            'encoding': getattr(sys.stdout, 'encoding', None) or 'utf-8',
+        }) + '\n'
+        try:
+            self._send(request.encode('utf-8'))
+        except (IOError, OSError):
+            # The worker exited since the last command, start a new one
+            self.stop()
+            self._send(request.encode('utf-8'))
+        try:
+            return self._read_frames(stdout, stderr)
+        except BaseException:
+            self.stop()
+            raise
+
+    @classmethod
+    def _is_plain_command(cls, text):
+        """Determines whether the command text uses no shell syntax.
+
+        Quoted characters are allowed, so JMESPath queries such as
+        --query 'Reservations[*]' still run on the worker.
+
+        Args:
+            * text: A string that represents the input command text.
+
+        Returns:
+            A boolean that specifies whether the command can run without a
+                shell.
+        """
+        quote = None
+        for char in text.strip():
+            if quote == "'":
+                if char == "'":
+                    quote = None
+            elif quote == '"':
+                if char == '"':
+                    quote = None
+                elif char in cls.DOUBLE_QUOTED_SHELL_CHARS:
+                    return False
+            elif char in '\'"':
+                quote = char
+            elif char in ' \t':
+                continue
+            elif char in cls.SHELL_CHARS:
+                return False
+        return quote is None
+
+    def _send(self, data):
+        """Sends the data to the worker, starting it if needed.
+
+        Args:
+            * data: A bytes string.
+
+        Returns:
+            None.
+
+        Raises:
+            An IOError or OSError if the worker exited.
+        """
+        self.start()
+        self.process.stdin.write(data)
+        self.process.stdin.flush()
+
+    def _read_frames(self, stdout, stderr):
+        """Writes the output frames of the command until it exits.
+
+        Args:
+            * stdout: A binary file object for the stdout frames.
+            * stderr: A binary file object for the stderr frames.
+
+        Returns:
+            An int representing the exit status of the command.
+
+        Raises:
+            An IOError if the worker exits.
+        """
+        streams = {self.STDOUT: stdout, self.STDERR: stderr}
+        while True:
+            kind, length = struct.unpack(
+                self.FRAME, self._read_exact(self.FRAME_SIZE))
+            payload = self._read_exact(length)
+            if kind == self.EXIT:
+                return int(payload)
+            streams[kind].write(payload)
+            streams[kind].flush()
+
+    def _read_exact(self, size):
+        """Reads exactly size bytes from the worker.
+
+        Args:
+            * size: An int representing the number of bytes to read.
+
+        Returns:
+            A bytes string.
+
+        Raises:
+            An IOError if the worker exits.
+        """
+        chunks = []
+        while size:
+            chunk = self.process.stdout.read(size)
+            if not chunk:
+                raise IOError('The aws worker exited unexpectedly')
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b''.join(chunks)
+
+
+class FrameStream(io.RawIOBase):
+    """A writable stream sending what is written as worker frames.
+
+    Used by the worker as the stdout and stderr of commands.  A stream
+    standing in for a terminal reports the terminal's file descriptor, so
+    the awscli can size tables and decide whether to use colors.
+
+    On Python 2 the awscli writes both encoded bytes and unicode strings to
+    sys.stdout, the stream is used as is and encodes the strings.
+
+    Attributes:
+        * encoding: A string representing the encoding of unicode strings
+            written to the stream.
+    """
+
+    def __init__(self, out, kind, lock, tty_fd=None, encoding='utf-8'):
+        """Initializes FrameStream.
+
+        Args:
+            * out: A binary file object of the frame channel.
+            * kind: A bytes string representing the kind of the frames.
+            * lock: A threading.Lock serializing writes to out.
+            * tty_fd: An int representing the file descriptor of the
+                terminal the output ends up in, or None.
+            * encoding: A string representing the encoding of unicode
+                strings written to the stream.
+
+        Returns:
+            None.
+        """
+        super(FrameStream, self).__init__()
+        self.encoding = encoding
+        self._out = out
+        self._kind = kind
+        self._lock = lock
+        self._tty_fd = tty_fd
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        """Sends the data as a frame.
+
+        Args:
+            * data: A bytes-like object, or a unicode string.
+
+        Returns:
+            An int representing the number of bytes written.
+        """
+        if isinstance(data, six.text_type):
+            data = data.encode(self.encoding, 'replace')
+        # bytes() of a memoryview is its repr on Python 2
+        data = memoryview(data).tobytes()
+        if data:
+            with self._lock:
+                self._out.write(struct.pack(AwsWorker.FRAME, self._kind,
+                                            len(data)) + data)
+                self._out.flush()
+        return len(data)
+
+    def fileno(self):
+        if self._tty_fd is None:
+            raise io.UnsupportedOperation('fileno')
+        return self._tty_fd
+
+    def isatty(self):
+        return self._tty_fd is not None
+
+
+class WorkerServer(object):
+    """Runs the commands sent to the worker process.
+
+    One CLIDriver is kept for each environment and set of SESSION_OPTIONS
+    and SESSION_FLAGS, since the awscli stores them in the driver's
+    session.  A driver that ran `--no-sign-request` would otherwise send
+    every later command unsigned.
+
+    Attributes:
+        * MAX_DRIVERS: An int representing the number of CLIDrivers to keep.
+        * SESSION_OPTIONS: A list of the global options taking a value that
+            change the driver's session.
+        * SESSION_FLAGS: A list of the global options without a value that
+            change the driver's session.
+        * KEEP_ENV: A list of environment variables set by the awscli when
+            it is imported, which are kept when commands replace the
+            environment.
+    """
+
+    MAX_DRIVERS = 8
+    SESSION_OPTIONS = [
+        '--profile',
+        '--region',
+        '--endpoint-url',
+        '--ca-bundle',
+        '--cli-connect-timeout',
+        '--cli-read-timeout',
+    ]
+    SESSION_FLAGS = [
+        '--debug',
+        '--no-sign-request',
+        '--no-verify-ssl',
+    ]
+    KEEP_ENV = ['AWS_DATA_PATH']
+
+    def __init__(self, requests, out, tty_fd=None):
+        """Initializes WorkerServer.
+
+        Args:
+            * requests: A binary file object the requests are read from.
+            * out: A binary file object the frames are written to.
+            * tty_fd: An int representing the file descriptor of the
+                terminal, or None.
+
+        Returns:
+            None.
+        """
+        self._requests = requests
+        self._out = out
+        self._tty_fd = tty_fd
+        self._lock = threading.Lock()
+        self._drivers = OrderedDict()
+        self._kept_env = {}
+
+    def serve(self):
+        """Runs requests until the parent closes the request channel.
+
+        Args:
+            * None.
+
+        Returns:
+            None.
+        """
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        try:
+            import awscli  # NOQA
+            self._kept_env = dict((name, os.environ[name])
+                                  for name in self.KEEP_ENV
+                                  if name in os.environ)
+            self._get_driver([]).create_help_command()
+        except Exception:
+            pass
+        while True:
+            line = self._requests.readline()
+            if not line:
+                return
+            status = self.run(json.loads(line.decode('utf-8')))
+            self._write(AwsWorker.EXIT, str(status).encode('ascii'))
+
+    def run(self, request):
+        """Runs a single command.
+
+        Args:
+            * request: A dict with the command's args, env, cwd, tty and
+                encoding.
+
+        Returns:
+            An int representing the exit status of the command.
+        """
+        os.environ.clear()
+        os.environ.update(request['env'])
+        os.environ.update(self._kept_env)
+        try:
+            os.chdir(request['cwd'])
+        except OSError:
+            pass
+        stdout, stderr = sys.stdout, sys.stderr
+        sys.stdout = self._create_stream(
+            AwsWorker.STDOUT, request['encoding'],
+            self._tty_fd if request['tty'] else None)
+        sys.stderr = self._create_stream(AwsWorker.STDERR,
+                                         request['encoding'])
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        try:
+            status = self._get_driver(request['args']).main(request['args'])
+        except KeyboardInterrupt:
+            status = 128 + signal.SIGINT
+        except SystemExit as e:
+            # Like the interpreter: no code is success, a message is 1
+            if e.code is None or isinstance(e.code, int):
+                status = e.code
+            else:
+                status = 1
+        except Exception:
+            traceback.print_exc()
+            status = 255
+        finally:
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            for stream in (sys.stdout, sys.stderr):
+                try:
+                    stream.flush()
+                except Exception:
+                    pass
+            sys.stdout, sys.stderr = stdout, stderr
+        return status or 0
+
+    def _create_stream(self, kind, encoding, tty_fd=None):
+        """Creates a text stream sending frames of the kind.
+
+        Args:
+            * kind: A bytes string representing the kind of the frames.
+            * encoding: A string representing the encoding of the text.
+            * tty_fd: An int representing the file descriptor of the
+                terminal, or None.
+
+        Returns:
+            An instance of io.TextIOWrapper, or of FrameStream on Python 2.
+        """
+        stream = FrameStream(self._out, kind, self._lock, tty_fd, encoding)
+        if six.PY2:
+            return stream
+        return io.TextIOWrapper(stream,
+                                encoding=encoding,
+                                errors='replace',
+                                line_buffering=True,
+                                write_through=True)
+
+    def _get_driver(self, args):
+        """Gets the CLIDriver for the environment and arguments.
+
+        Args:
+            * args: A list of argument strings without the leading `aws`.
+
+        Returns:
+            An instance of the awscli's CLIDriver.
+        """
+        key = (tuple(sorted((name, value)
+                            for name, value in os.environ.items()
+                            if name.startswith('AWS_'))),
+               tuple(self._get_option(args, name)
+                     for name in self.SESSION_OPTIONS),
+               tuple(name in args for name in self.SESSION_FLAGS))
+        driver = self._drivers.pop(key, None)
+        if driver is None:
+            from awscli.clidriver import create_clidriver
+            driver = create_clidriver()
+            if len(self._drivers) >= self.MAX_DRIVERS:
+                self._drivers.popitem(last=False)
+        self._drivers[key] = driver
+        return driver
+
+    def _get_option(self, args, name):
+        """Gets the value of the option in the arguments.
+
+        Args:
+            * args: A list of argument strings.
+            * name: A string representing the option, such as '--profile'.
+
+        Returns:
+            A string representing the option's value, or None.
+        """
+        for index, arg in enumerate(args):
+            if arg == name and index + 1 < len(args):
+                return args[index + 1]
+            if arg.startswith(name + '='):
+                return arg[len(name) + 1:]
+        return None
+
+    def _write(self, kind, data):
+        """Writes a frame.
+
+        Args:
+            * kind: A bytes string representing the kind of the frame.
+            * data: A bytes string.
+
+        Returns:
+            None.
+        """
+        FrameStream(self._out, kind, self._lock).write(data)
+
+
+def main():
+    """Runs the worker process.
+
+    The request and frame channels are moved off stdin and stdout.  Stdin
+    is replaced by the null device and stdout by stderr, so processes
+    started by commands can not read requests or corrupt frames.
+
+    Args:
+        * None.
+
+    Returns:
+        None.
+    """
+    requests = io.open(os.dup(0), 'rb')
+    out = io.open(os.dup(1), 'wb', buffering=0)
+    null_fd = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(null_fd, 0)
+    os.close(null_fd)
+    os.dup2(2, 1)
+    tty_fd = 2 if os.isatty(2) else None
+    WorkerServer(requests, out, tty_fd).serve()
+
+
+if __name__ == '__main__':
+    main()
@@ -20,6 +20,9 @@ if sys.version_info < (2, 7):
 if sys.version_info < (3, 4):
     # Backport of Python 3.4 enums to earlier versions
     install_requires.append('enum34>=1.0.4')
+if sys.version_info < (3, 2):
+    # Backport of Python 3.2 concurrent.futures to earlier versions
+    install_requires.append('futures>=3.0.3')
 
 setup(
     description='SAWS: A Supercharged AWS Command Line Interface (CLI)',
@@ -35,6 +38,9 @@ setup(
             'mock>=1.0.1',
             'tox>=1.9.2'
         ],
+        'numpy': [
+            'numpy>=1.7.0'
+        ],
     },
     entry_points={
         'console_scripts': 'saws = saws.main:cli'
@@ -43,6 +49,7 @@ setup(
     package_data={'saws': ['sawsrc',
                            'saws.shortcuts',
                            'data/SOURCES.txt',
+                           'data/COMMANDS.json',
                            'data/RESOURCES_SAMPLE.txt',
                            'data/OPTIONS.txt']},
     scripts=[],
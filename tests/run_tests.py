@@ -19,11 +19,26 @@ from __future__ import print_function
 import unittest
 from test_completer import CompleterTest  # NOQA
 from test_commands import CommandsTest  # NOQA
+from test_command_tree import CommandTreeTest  # NOQA
+from test_data_util import DataUtilTest  # NOQA
 from test_resources import ResourcesTest  # NOQA
+from test_refresher import RefresherTest  # NOQA
+from test_resource_cache import ResourceCacheTest  # NOQA
+from test_backend import BackendTest  # NOQA
+from test_regions import RegionsTest  # NOQA
+from test_worker import WorkerTest  # NOQA
+from test_highlighter import HighlighterTest  # NOQA
+from test_result_cache import ResultCacheTest  # NOQA
+from test_shortcut_trie import ShortcutTrieTest  # NOQA
+from test_tokenizer import TokenizerTest  # NOQA
 from test_options import OptionsTest  # NOQA
+from test_index import IndexTest  # NOQA
+from test_fuzzy import FuzzyTest, NumpyFuzzyTest  # NOQA
 from test_saws import SawsTest  # NOQA
 from test_toolbar import ToolbarTest  # NOQA
 from test_keys import KeysTest  # NOQA
+from test_startup import StartupTest  # NOQA
+from test_snapshot import SnapshotTest  # NOQA
 try:
     from test_cli import CliTest  # NOQA
 except:
@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2015 Donne Martin. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+
+from __future__ import unicode_literals
+from __future__ import print_function
+import mock
+import os
+import shutil
+import tempfile
+import botocore.session
+from botocore.credentials import ReadOnlyCredentials
+from botocore.stub import Stubber
+from tests.compat import unittest
+from saws.resource.backend import BotocoreBackend, SubprocessBackend, \
+    create_query_backend
+from saws.resource.instance_ids import InstanceIds
+from saws.resource.instance_tag_keys import InstanceTagKeys
+from saws.resource.instance_tag_values import InstanceTagValues
+from saws.resource.bucket_names import BucketNames
+from saws.resource.bucket_uris import BucketUris
+
+
+class BackendTest(unittest.TestCase):
+
+    RESERVATIONS_PAGE_1 = {
+        'Reservations': [{
+            'Instances': [
+                {'InstanceId': 'i-a51d05f4',
+                 'Tags': [{'Key': 'Name', 'Value': 'production'}]},
+                {'InstanceId': 'i-b815ecc3'},
+            ]
+        }],
+        'NextToken': 'page-2',
+    }
+    RESERVATIONS_PAGE_2 = {
+        'Reservations': [{
+            'Instances': [
+                {'InstanceId': 'i-c86cba18',
+                 'Tags': [{'Key': 'Name', 'Value': 'testing'},
+                          {'Key': 'Stack', 'Value': 'production'}]},
+            ]
+        }],
+    }
+    BUCKETS = {
+        'Buckets': [{'Name': 'web-server-logs'},
+                    {'Name': 'web-server-images'}],
+    }
+
+    def setUp(self):
+        self.session = botocore.session.get_session()
+        self.backend = BotocoreBackend(session=self.session)
+        self.stubbers = []
+
+    def tearDown(self):
+        for stubber in self.stubbers:
+            stubber.assert_no_pending_responses()
+            stubber.deactivate()
+
+    def create_stubber(self, service_name):
+        client = self.session.create_client(
+            service_name,
+            region_name='us-east-1',
+            aws_access_key_id='foo',
+            aws_secret_access_key='bar')
+        self.backend.clients[service_name] = client
+        stubber = Stubber(client)
+        stubber.activate()
+        self.stubbers.append(stubber)
+        return stubber
+
+    def stub_describe_instances(self):
+        stubber = self.create_stubber('ec2')
+        stubber.add_response('describe_instances',
+                             self.RESERVATIONS_PAGE_1,
+                             {})
+        stubber.add_response('describe_instances',
+                             self.RESERVATIONS_PAGE_2,
+                             {'NextToken': 'page-2'})
+
+    def test_instance_ids(self):
+        self.stub_describe_instances()
+        instance_ids = InstanceIds(self.backend)
+        assert instance_ids.query_backend is self.backend
+        with mock.patch('saws.resource.instance_ids.print'):
+            instance_ids.query_resource()
+        assert instance_ids.resources == \
+            ['i-a51d05f4', 'i-b815ecc3', 'i-c86cba18']
+
+    def test_instance_tag_keys(self):
+        self.stub_describe_instances()
+        instance_tag_keys = InstanceTagKeys(self.backend)
+        with mock.patch('saws.resource.instance_tag_keys.print'):
+            instance_tag_keys.query_resource()
+        assert sorted(instance_tag_keys.resources) == ['Name', 'Stack']
+
+    def test_instance_tag_values(self):
+        self.stub_describe_instances()
+        instance_tag_values = InstanceTagValues(self.backend)
+        with mock.patch('saws.resource.instance_tag_values.print'):
+            instance_tag_values.query_resource()
+        assert sorted(instance_tag_values.resources) == \
+            ['production', 'testing']
+
+    def test_buckets(self):
+        stubber = self.create_stubber('s3')
+        stubber.add_response('list_buckets', self.BUCKETS, {})
+        bucket_names = BucketNames(self.backend)
+        bucket_uris = BucketUris(self.backend)
+        self.backend.begin_refresh()
+        with mock.patch('saws.resource.bucket_names.print'):
+            bucket_names.query_resource()
+        with mock.patch('saws.resource.bucket_uris.print'):
+            bucket_uris.query_resource()
+        self.backend.end_refresh()
+        assert bucket_names.resources == \
+            ['web-server-logs', 'web-server-images']
+        assert bucket_uris.resources == \
+            ['s3://web-server-logs', 's3://web-server-images']
+
+    @mock.patch('saws.resource.instance_ids.print')
+    @mock.patch('saws.resource.instance_tag_keys.print')
+    @mock.patch('saws.resource.instance_tag_values.print')
+    def test_instances_fetched_once(self, *_):
+        self.stub_describe_instances()
+        resource_lists = [InstanceIds(self.backend),
+                          InstanceTagKeys(self.backend),
+                          InstanceTagValues(self.backend)]
+        self.backend.begin_refresh()
+        for resource_list in resource_lists:
+            resource_list.query_resource()
+        self.backend.end_refresh()
+        assert len(resource_lists[0].resources) == 3
+        assert sorted(resource_lists[1].resources) == ['Name', 'Stack']
+        assert sorted(resource_lists[2].resources) == \
+            ['production', 'testing']
+        # Outside of a refresh, fetches are no longer shared
+        self.stub_describe_instances()
+        resource_lists[0].query_resource()
+
+    def test_shared_fetch_error(self):
+        backend = SubprocessBackend()
+        error = ValueError('test_shared_fetch_error')
+        instance_ids = InstanceIds(backend)
+        instance_tag_keys = InstanceTagKeys(backend)
+        backend.begin_refresh()
+        with mock.patch.object(instance_ids, '_query_aws',
+                               side_effect=error) as mock_query_aws:
+            with self.assertRaises(ValueError):
+                backend.query(instance_ids)
+            with self.assertRaises(ValueError):
+                backend.query(instance_tag_keys)
+        backend.end_refresh()
+        assert mock_query_aws.call_count == 1
+
+    def test_clients_are_shared(self):
+        self.session = mock.Mock()
+        self.backend = BotocoreBackend(session=self.session)
+        assert self.backend.get_client('ec2') is \
+            self.backend.get_client('ec2')
+        self.session.create_client.assert_called_once_with('ec2')
+
+    def test_fallback_without_botocore(self):
+        fallback = mock.Mock()
+        self.backend = BotocoreBackend(fallback=fallback)
+        instance_ids = InstanceIds(self.backend)
+        with mock.patch.object(self.backend, 'get_client',
+                               side_effect=ImportError):
+            self.backend.query(instance_ids)
+        fallback.query.assert_called_with(instance_ids)
+
+    def test_subprocess_backend(self):
+        backend = SubprocessBackend()
+        instance_ids = InstanceIds(backend)
+        instance_tag_values = InstanceTagValues(backend)
+        output = '[{"InstanceId": "i-a51d05f4", "Tags": null}, ' \
+                 '{"InstanceId": "i-b815ecc3", ' \
+                 '"Tags": [{"Key": "Name", "Value": "production"}]}]'
+        backend.begin_refresh()
+        with mock.patch.object(instance_ids, '_query_aws',
+                               return_value=output) as mock_query_aws:
+            with mock.patch('saws.resource.instance_ids.print'):
+                instance_ids.query_resource()
+            with mock.patch('saws.resource.instance_tag_values.print'):
+                instance_tag_values.query_resource()
+        backend.end_refresh()
+        mock_query_aws.assert_called_once_with(InstanceIds.QUERY)
+        assert instance_ids.resources == ['i-a51d05f4', 'i-b815ecc3']
+        assert instance_tag_values.resources == ['production']
+        bucket_uris = BucketUris(SubprocessBackend())
+        output = '2015-07-26 16:45:07 web-server-logs\n\n'
+        with mock.patch.object(bucket_uris, '_query_aws',
+                               return_value=output):
+            with mock.patch('saws.resource.bucket_uris.print'):
+                bucket_uris.query_resource()
+        assert bucket_uris.resources == ['s3://web-server-logs']
+
+    def test_subprocess_fan_out(self):
+        backend = SubprocessBackend(regions=['us-east-1', 'eu-west-1'])
+        instance_ids = InstanceIds(backend)
+        outputs = {
+            'us-east-1': '[{"InstanceId": "i-a51d05f4"}]',
+            'eu-west-1': '[{"InstanceId": "i-b815ecc3"}]',
+        }
+        with mock.patch.object(
+                instance_ids, '_query_aws',
+                side_effect=lambda query, region: outputs[region]):
+            with mock.patch('saws.resource.instance_ids.print'):
+                instance_ids.query_resource()
+        assert instance_ids.resources == ['i-a51d05f4', 'i-b815ecc3']
+        assert instance_ids.resources.meta == {'i-a51d05f4': 'us-east-1',
+                                               'i-b815ecc3': 'eu-west-1'}
+        env = backend.get_env('eu-west-1')
+        assert env['AWS_DEFAULT_REGION'] == 'eu-west-1'
+
+    def test_with_context(self):
+        with mock.patch.dict('os.environ', {'AWS_PROFILE': 'dev'}):
+            assert SubprocessBackend().get_env() is None
+            backend = SubprocessBackend().with_context('prod', 'us-west-2')
+            assert isinstance(backend, SubprocessBackend)
+            env = backend.get_env()
+            assert env['AWS_PROFILE'] == 'prod'
+            assert env['AWS_DEFAULT_REGION'] == 'us-west-2'
+            os.environ['AWS_DEFAULT_PROFILE'] = 'dev'
+            env = SubprocessBackend().with_context('', '').get_env()
+            assert 'AWS_PROFILE' not in env
+            assert 'AWS_DEFAULT_PROFILE' not in env
+            assert 'AWS_DEFAULT_REGION' not in env
+            env = SubprocessBackend().with_context('prod', None).get_env()
+            assert env['AWS_PROFILE'] == 'prod'
+            assert 'AWS_DEFAULT_PROFILE' not in env
+        backend = BotocoreBackend().with_context('prod', 'us-west-2')
+        assert backend.fallback.get_env()['AWS_PROFILE'] == 'prod'
+        backend.session = mock.Mock()
+        backend.get_client('ec2')
+        backend.session.create_client.assert_called_once_with(
+            'ec2', region_name='us-west-2')
+
+    def test_default_context_ignores_environment(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            config_path = os.path.join(temp_dir, 'config')
+            with open(config_path, 'w') as fp:
+                fp.write('[default]\nregion = eu-west-1\n'
+                         '[profile dev]\nregion = us-west-2\n')
+            with mock.patch.dict('os.environ',
+                                 {'AWS_CONFIG_FILE': config_path,
+                                  'AWS_PROFILE': 'dev',
+                                  'AWS_DEFAULT_REGION': 'ap-south-1'}):
+                backend = BotocoreBackend().with_context('', '')
+                session = backend.create_session()
+                assert session.get_config_variable('profile') is None
+                assert backend.get_client('ec2').meta.region_name == \
+                    'eu-west-1'
+                env = backend.fallback.get_env()
+                assert 'AWS_PROFILE' not in env
+                assert 'AWS_DEFAULT_REGION' not in env
+                session = BotocoreBackend().create_session()
+                assert session.get_config_variable('profile') == 'dev'
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_resolve_credentials(self):
+        credentials = mock.Mock(**{
+            'get_frozen_credentials.return_value': ReadOnlyCredentials(
+                'foo', 'bar', None)})
+        session = mock.Mock(**{'get_credentials.return_value': credentials})
+        backend = BotocoreBackend(session=session, profile='prod')
+        assert backend.resolve_credentials() is credentials
+        assert backend.resolve_credentials() is credentials
+        session.get_credentials.assert_called_once_with()
+        with mock.patch.dict('os.environ', {'AWS_SESSION_TOKEN': 'baz'}):
+            env = backend.fallback.get_env()
+        assert env['AWS_PROFILE'] == 'prod'
+        assert env['AWS_ACCESS_KEY_ID'] == 'foo'
+        assert env['AWS_SECRET_ACCESS_KEY'] == 'bar'
+        assert 'AWS_SESSION_TOKEN' not in env
+
+    def test_create_query_backend(self):
+        assert isinstance(create_query_backend('subprocess'),
+                          SubprocessBackend)
+        assert isinstance(create_query_backend('botocore'),
+                          BotocoreBackend)
+        assert isinstance(create_query_backend(), BotocoreBackend)
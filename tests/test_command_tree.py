@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2015 Donne Martin. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+
+from __future__ import unicode_literals
+from __future__ import print_function
+import mock
+import os
+import shutil
+import tempfile
+from tests.compat import unittest
+from saws.command_tree import CommandTree
+
+
+class CommandTreeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tree = CommandTree(
+            {'ec2': {'describe-instances': None, 'start-instances': None},
+             's3api': {'get-bucket-acl': ['--bucket', '--debug']}},
+            ['--debug', '--region'])
+
+    def test_lookups(self):
+        assert self.tree.is_command('ec2')
+        assert not self.tree.is_command('describe-instances')
+        assert self.tree.is_sub_command('get-bucket-acl')
+        assert self.tree.is_sub_command('get-bucket-acl', command='s3api')
+        assert not self.tree.is_sub_command('get-bucket-acl', command='ec2')
+
+    def test_complete(self):
+        assert self.tree.complete('aws ') == ['ec2', 's3api']
+        assert self.tree.complete('aws s') == ['s3api']
+        assert self.tree.complete('aws ec2 ') == \
+            ['describe-instances', 'start-instances']
+        assert self.tree.complete('aws ec2 st') == ['start-instances']
+        assert self.tree.complete('aws s3api get-bucket-acl --') == \
+            ['--bucket', '--debug', '--region']
+        assert self.tree.complete(
+            'aws s3api get-bucket-acl --bucket b --debug --') == \
+            ['--region']
+        # Left to the awscli completer
+        for text in ['', 'ls', 'aws --re', 'aws ec2', 'aws ec2 --debug',
+                     'aws s3 ', 'aws s3api get-bucket-acl ',
+                     'aws s3api get-bucket-acl --bucket',
+                     'aws s3api get-bucket-acl --bucket b',
+                     'aws ec2 describe-instances --']:
+            with mock.patch.object(self.tree, '_read_options',
+                                   side_effect=ImportError):
+                assert self.tree.complete(text) is None, text
+        flat = CommandTree.from_commands(['ec2'], ['ls'], ['--debug'])
+        assert flat.complete('aws ') is None
+
+    def test_complete_matches_awscli(self):
+        from awscli.completer import Completer
+        tree = CommandTree.from_file()
+        completer = Completer()
+        # The services the awscli loads can differ from the packaged tree,
+        # options are read from the awscli either way
+        for text in ['aws ec2 describe-instances --',
+                     'aws ec2 describe-instances --filters x --f',
+                     'aws s3 ', 'aws s3 ls --', 'aws s3api get-bucket-acl --b',
+                     'aws dynamodb scan --t']:
+            assert tree.complete(text) == \
+                sorted(completer.complete(text, len(text))), text
+
+    def test_get_options_from_awscli(self):
+        options = self.tree.get_options('ec2', 'describe-instances')
+        assert '--instance-ids' in options
+        assert self.tree.commands['ec2']['describe-instances'] is options
+        assert self.tree.get_options('ec2', 'not-a-sub-command') == []
+
+    def test_file_round_trip(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            file_path = os.path.join(temp_dir, 'COMMANDS.json')
+            self.tree.to_file(file_path)
+            tree = CommandTree.from_file(file_path)
+        finally:
+            shutil.rmtree(temp_dir)
+        assert tree.commands == {
+            'ec2': {'describe-instances': None, 'start-instances': None},
+            's3api': {'get-bucket-acl': None}}
+        assert tree.global_options == ['--debug', '--region']
+        assert tree.awscli_version is None
+
+    def test_file_without_awscli_version(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            file_path = os.path.join(temp_dir, 'COMMANDS.json')
+            with open(file_path, 'w') as fp:
+                fp.write('{"commands": {}, "global_options": []}')
+            with self.assertRaises(KeyError):
+                CommandTree.from_file(file_path)
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_packaged_tree(self):
+        tree = CommandTree.from_file()
+        assert tree.is_sub_command('describe-instances', command='ec2')
+        assert '--region' in tree.global_options
+        assert tree.awscli_version
+
+    def test_awscli_version(self):
+        from awscli import __version__ as awscli_version
+        assert self.tree.is_current()
+        self.tree.awscli_version = awscli_version
+        self.tree._is_current = None
+        assert self.tree.is_current()
+        assert self.tree.complete('aws ') == ['ec2', 's3api']
+        # Trees generated from another awscli leave completion to it
+        self.tree.awscli_version = '0.0.0'
+        self.tree._is_current = None
+        assert not self.tree.is_current()
+        assert self.tree.complete('aws ') is None
+
+    def test_from_commands(self):
+        tree = CommandTree.from_commands(['ec2', 's3'], ['ls'], ['--debug'])
+        assert tree.is_sub_command('ls', command='ec2')
+        assert tree.is_sub_command('ls', command='s3')
+        assert tree.global_options == ['--debug']
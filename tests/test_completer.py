@@ -18,9 +18,11 @@ from __future__ import print_function
 import unittest
 import mock
 import re
+import time
 from prompt_toolkit.document import Document
 from awscli import completer as awscli_completer
 from saws.completer import AwsCompleter
+from saws.command_tree import CommandTree
 from saws.commands import AwsCommands
 from saws.saws import Saws
 
@@ -34,6 +36,10 @@ class CompleterTest(unittest.TestCase):
         self.completer.resources._set_resources_path(
             'data/RESOURCES_SAMPLE.txt')
         self.completer.refresh_resources_and_options()
+        # The sample resources have no fetch times, mark them as fresh so
+        # completing them does not query AWS
+        for resource_list in self.completer.resources.resource_lists:
+            resource_list.fetched_at = time.time()
         self.completer_event = self.create_completer_event()
         mock_print.assert_called_with('Loaded resources from cache')
 
@@ -109,6 +115,16 @@ class CompleterTest(unittest.TestCase):
                     'cancel-spot-instance-requests']
         self.verify_completions(commands, expected)
 
+    def test_commands_not_limited(self):
+        self.completer.fuzzy_match = True
+        limit = self.completer.text_utils.FUZZY_MATCH_LIMIT
+        result = [c.text for c in self._get_completions('aws ')]
+        assert len(result) > limit
+        assert 's3' in result
+        assert 'ec2' in result
+        result = self._get_completions('aws ec2 ')
+        assert len(result) > limit
+
     def test_aws_command(self):
         commands = ['a', 'aw']
         expected = [AwsCommands.AWS_COMMAND]
@@ -212,6 +228,140 @@ class CompleterTest(unittest.TestCase):
         instance_ids.resources.extend(expected)
         self.verify_completions(commands, expected)
 
+    def test_expired_resources_refreshed_lazily(self):
+        resources = self.completer.resources
+        instance_ids = resources.resource_lists[
+            resources.ResourceType.INSTANCE_IDS.value]
+        instance_ids.fetched_at = time.time() - instance_ids.TTL
+        with mock.patch.object(resources,
+                               '_refresh_in_background') as mock_refresh:
+            self._get_completions('aws s3 ls s3:')
+            assert not mock_refresh.called
+            self._get_completions('aws ec2 ls --instance-ids i-')
+            mock_refresh.assert_called_once_with(None, [instance_ids])
+            self._get_completions('aws ec2 ls --instance-ids i-a')
+            assert mock_refresh.call_count == 1
+
+    def test_stale_completions_cancelled(self):
+        self.completer.cancel_stale_completions('aws ec2 ls --instance-ids')
+        assert self._get_completions('aws ec2 ls --instance-ids i-a')  \
+            == set()
+        self.completer.cancel_stale_completions(
+            'aws ec2 ls --instance-ids i-a')
+        assert self._get_completions('aws ec2 ls --instance-ids i-a')
+        # Completions stop when the text changes while they are yielded
+        self.completer.cancel_stale_completions('aws --out')
+        completions = self.completer.get_completions(
+            Document(text='aws --out', cursor_position=9),
+            self.completer_event)
+        assert next(completions)
+        self.completer.cancel_stale_completions('aws --outp')
+        assert list(completions) == []
+
+    def test_latency_budget(self):
+        self.completer.fuzzy_match = True
+        names = ['i-{0:05d}'.format(i) for i in range(2000)]
+        resources = self.completer.resources
+        instance_ids = resources.resource_lists[
+            resources.ResourceType.INSTANCE_IDS.value]
+        instance_ids.resources[:] = names
+        self.completer.latency_budget = None
+        command = 'aws ec2 ls --instance-ids i1999'
+        fuzzy = set(c.text for c in self._get_completions(command))
+        assert fuzzy == set(['i-01999'])
+        self.completer.latency_budget = 0.01
+        command = 'aws ec2 ls --instance-ids i1998'
+        with mock.patch('saws.completer.time') as mock_time:
+            mock_time.time.side_effect = [0, 1]
+            prefix = set(c.text for c in self._get_completions(command))
+        # Past the budget, fuzzy matching falls back to prefix matching
+        assert prefix == set()
+        command = 'aws ec2 ls --instance-ids i-0001'
+        with mock.patch('saws.completer.time') as mock_time:
+            mock_time.time.side_effect = [0, 1]
+            prefix = set(c.text for c in self._get_completions(command))
+        assert prefix == set(name for name in names
+                             if name.startswith('i-0001'))
+
+    def test_completion_states(self):
+        texts = ['aws ec', 'aws ec2', 'aws ec2 ', 'aws ec2 d', 'aws ec2 de',
+                 'aws ec2 desc', 'aws ec2 describe-instances --fi',
+                 'aws ec2 describe-instances --filters', 'aws ec2 de',
+                 'aws --out', 'aws --output', 'aws s3 ls s3:']
+        fresh_results = []
+        for text in texts:
+            self.completer.clear_completion_states()
+            fresh_results.append(
+                set(c.text for c in self._get_completions(text)))
+        self.completer.clear_completion_states()
+        with mock.patch.object(
+                self.completer, '_get_aws_cli_completions',
+                wraps=self.completer._get_aws_cli_completions) as mock_aws:
+            for text, fresh_result in zip(texts, fresh_results):
+                result = set(c.text for c in self._get_completions(text))
+                assert result == fresh_result
+            called_texts = [args[0].text
+                            for args, _ in mock_aws.call_args_list]
+        assert 'aws ec2 de' not in called_texts
+        assert 'aws ec2 desc' not in called_texts
+        assert 'aws ec2' in called_texts
+        assert 'aws --output' in called_texts
+
+    def test_aws_cli_completions_cached(self):
+        document = Document(text='aws ec2 describe-ins')
+        with mock.patch.object(self.completer, '_complete_aws_cli',
+                               return_value=['describe-instances']) \
+                as mock_complete:
+            for text in ['aws ec2 describe-ins', 'aws  ec2 describe-ins ']:
+                assert self.completer._get_aws_cli_completions(
+                    Document(text=text)) == ['describe-instances']
+        mock_complete.assert_called_once_with(document.text)
+
+    def test_command_tree_completions(self):
+        completer = AwsCompleter(awscli_completer,
+                                 self.all_commands,
+                                 self.saws.config,
+                                 self.saws.config_obj,
+                                 self.saws.logger,
+                                 command_tree=self.saws.command_tree)
+        # The shared completer completes from a flat tree, this one from
+        # the packaged tree
+        assert not self.completer.command_tree.complete('aws ec')
+        assert not completer.command_tree.flat
+        assert completer.command_tree.is_current()
+        for text in ['aws s3 l', 'aws ec2 describe-instances --fi']:
+            expected = self.completer._get_aws_cli_completions(
+                Document(text=text))
+            with mock.patch.object(completer, '_complete_aws_cli') \
+                    as mock_complete:
+                assert completer._get_aws_cli_completions(
+                    Document(text=text)) == sorted(expected)
+            mock_complete.assert_not_called()
+
+    def test_stale_command_tree_completions(self):
+        command_tree = CommandTree.from_file()
+        command_tree.awscli_version = '0.0.0'
+        completer = AwsCompleter(awscli_completer,
+                                 self.all_commands,
+                                 self.saws.config,
+                                 self.saws.config_obj,
+                                 self.saws.logger,
+                                 command_tree=command_tree)
+        with mock.patch.object(completer, '_complete_aws_cli',
+                               return_value=['ec2']) as mock_complete:
+            assert completer._get_aws_cli_completions(
+                Document(text='aws ec')) == ['ec2']
+        mock_complete.assert_called_once_with('aws ec')
+
+    def test_aws_cli_completions_printed(self):
+        aws_completer = mock.Mock(spec=['complete'])
+        aws_completer.complete.side_effect = \
+            lambda text, _: print('ec2 \necs \necr')
+        self.completer.aws_completer = aws_completer
+        assert self.completer._get_aws_cli_completions(
+            Document(text='aws ec')) == ['ec2', 'ecs', 'ecr']
+        aws_completer.complete.assert_called_once_with('aws ec', 6)
+
     def test_instance_ids_fuzzy(self):
         self.completer.fuzzy_match = True
         commands = ['aws ec2 ls --instance-ids a5']
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2015 Donne Martin. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+
+from __future__ import unicode_literals
+from __future__ import print_function
+import os
+import shutil
+import tempfile
+from tests.compat import unittest
+from saws.data_util import DataUtil
+from saws.resources import AwsResources
+
+
+class DataUtilTest(unittest.TestCase):
+
+    def setUp(self):
+        self.data_util = DataUtil()
+        self.header_to_type_map = self.data_util.create_header_to_type_map(
+            headers=['[--instance-ids]', '[--bucket]', '[s3:]'],
+            data_type=AwsResources.ResourceType)
+        self.temp_dir = tempfile.mkdtemp()
+        self.data_file_path = os.path.join(self.temp_dir, 'RESOURCES.txt')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def read_data(self, text):
+        with open(self.data_file_path, 'w') as fp:
+            fp.write(text)
+        return self.data_util.read_data(self.data_file_path,
+                                        self.header_to_type_map,
+                                        AwsResources.ResourceType)
+
+    def test_read_data(self):
+        data_lists, header_values = self.read_data(
+            '[--instance-ids]: 2 1450000000.5\n'
+            'i-b\n'
+            'i-a\n'
+            '[--bucket]: 1\n'
+            'bucket-[s3:]\n'
+            '[s3:]: 1\n'
+            's3://bucket\n')
+        assert data_lists[0] == ['i-a', 'i-b']
+        assert data_lists[1] == ['bucket-[s3:]']
+        assert data_lists[2] == ['s3://bucket']
+        assert header_values[0] == ['1450000000.5']
+        assert header_values[1] == []
+
+    def test_read_data_wrong_counts(self):
+        data_lists, _ = self.read_data(
+            '[--instance-ids]: 1\n'
+            'i-b\n'
+            '\n'
+            'i-a\n'
+            '[--bucket]\n'
+            'bucket\n')
+        assert data_lists[0] == ['i-a', 'i-b']
+        assert data_lists[1] == ['bucket']
+        assert data_lists[2] == []
+        # Storage is reserved for at most as many lines as the file has bytes
+        data_lists, _ = self.read_data(
+            '[--bucket]: 1000000000000\n'
+            'bucket\n'
+            '\n')
+        assert data_lists[1] == ['bucket']
+
+    def test_get_data_packaged_files(self):
+        from saws.commands import AwsCommands
+        from saws.options import AwsOptions
+        commands = AwsCommands().all_commands
+        assert 'ec2' in commands[AwsCommands.CommandType.COMMANDS.value]
+        assert '--debug' in \
+            commands[AwsCommands.CommandType.GLOBAL_OPTIONS.value]
+        assert 'running' in AwsOptions(commands).ec2_states
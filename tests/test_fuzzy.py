@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2015 Donne Martin. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+
+from __future__ import unicode_literals
+from __future__ import print_function
+import random
+from tests.compat import unittest
+from saws.fuzzy import FuzzyMatcher, NumpyFuzzyMatcher, import_numpy
+
+
+class FuzzyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.collection = ['i-a875ecc3', 'i-a41d55f4', 'i-a3628153',
+                           'web-server-logs', 'Web-Server-Images', 'prod']
+        self.matcher = FuzzyMatcher(self.collection)
+
+    def test_find(self):
+        assert self.matcher.find('a5') == ['i-a875ecc3', 'i-a41d55f4',
+                                           'i-a3628153']
+        assert self.matcher.find('WSI') == ['Web-Server-Images']
+        assert self.matcher.find('ws') == ['Web-Server-Images',
+                                           'web-server-logs']
+        assert self.matcher.find('xyz') == []
+
+    def test_find_limit(self):
+        assert self.matcher.find('i-a', limit=2) == ['i-a3628153',
+                                                     'i-a41d55f4']
+        assert self.matcher.find('i-a', limit=10) == \
+            self.matcher.find('i-a')
+
+    def test_find_narrows_previous_matches(self):
+        assert self.matcher.find('we') == ['Web-Server-Images',
+                                           'web-server-logs']
+        # Only the previous matches are searched while the query grows
+        self.matcher.lowered[5] = 'wel'
+        assert self.matcher.find('wel') == ['web-server-logs']
+        self.matcher.lowered[5] = 'prod'
+        assert self.matcher.find('d') == ['prod', 'i-a41d55f4']
+
+    def test_find_should_stop(self):
+        matcher = FuzzyMatcher(['i-{0:05d}'.format(i) for i in range(2000)])
+        calls = []
+
+        def should_stop():
+            calls.append(True)
+            return len(calls) == 2
+        assert matcher.find('i-01', should_stop=should_stop) is None
+        assert len(calls) == 2
+        # A search given up does not narrow the next one
+        assert matcher.find('i-019') == \
+            FuzzyMatcher(matcher.collection).find('i-019')
+        # Collections smaller than the check interval are always matched
+        assert self.matcher.find('prod', should_stop=lambda: True) == \
+            ['prod']
+
+
+@unittest.skipIf(import_numpy() is None, 'numpy is not installed')
+class NumpyFuzzyTest(unittest.TestCase):
+
+    def test_create(self):
+        assert type(FuzzyMatcher.create(['prod'])) is FuzzyMatcher
+        collection = ['i-{0:05d}'.format(i)
+                      for i in range(FuzzyMatcher.NUMPY_MIN_SIZE)]
+        assert isinstance(FuzzyMatcher.create(collection), NumpyFuzzyMatcher)
+
+    def test_find_matches_regex_order(self):
+        rand = random.Random(0)
+        chars = 'abAB-1/\n\xe9'
+        for _ in range(200):
+            collection = [''.join(rand.choice(chars)
+                                  for _ in range(rand.randint(0, 8)))
+                          for _ in range(rand.randint(0, 50))]
+            expected = FuzzyMatcher(collection)
+            matcher = NumpyFuzzyMatcher(collection)
+            text = ''
+            for _ in range(4):
+                text += rand.choice(chars)
+                for limit in (None, 1, 5):
+                    assert matcher.find(text, limit) == \
+                        expected.find(text, limit)
+
+    def test_find(self):
+        matcher = NumpyFuzzyMatcher(['i-a875ecc3', 'i-a41d55f4',
+                                     'i-a3628153', 'web-server-logs',
+                                     'Web-Server-Images', 'prod', 'w\nsi'])
+        assert matcher.find('WSI') == ['Web-Server-Images']
+        assert matcher.find('ws') == ['Web-Server-Images', 'web-server-logs']
+        assert matcher.find('i-a', limit=2) == ['i-a3628153', 'i-a41d55f4']
+        assert matcher.find('xyz') == []
+        assert matcher.find('') == sorted(matcher.collection)
+
+    def test_find_should_stop(self):
+        matcher = NumpyFuzzyMatcher(['i-{0:05d}'.format(i)
+                                     for i in range(2000)])
+        calls = []
+
+        def should_stop():
+            calls.append(True)
+            return len(calls) == 2
+        assert matcher.find('i-01', should_stop=should_stop) is None
+        assert len(calls) == 2
+        assert matcher.find('i-019') == \
+            FuzzyMatcher(matcher.collection).find('i-019')
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2015 Donne Martin. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+
+from __future__ import unicode_literals
+from __future__ import print_function
+import io
+import re
+from pygments.token import Number, Punctuation, String
+from tests.compat import unittest
+from saws.highlighter import AwsTableLexer, OutputHighlighter
+
+
+class HighlighterTest(unittest.TestCase):
+
+    JSON = ('{\n'
+            '    "Reservations": [\n'
+            '        {\n'
+            '            "InstanceId": "i-a51d05f4",\n'
+            '            "AmiLaunchIndex": 0\n'
+            '        }\n'
+            '    ]\n'
+            '}\n')
+    TABLE = ('-------------------------------\n'
+             '|      DescribeInstances      |\n'
+             '+-----------------------------+\n'
+             '||        Reservations       ||\n'
+             '|+------------+--------------+|\n'
+             '||  OwnerId   |  1234        ||\n'
+             '|+------------+--------------+|\n')
+    ESCAPE = re.compile(r'\x1b\[[0-9;]*m')
+
+    def setUp(self):
+        self.highlighter = OutputHighlighter()
+        self.out = io.BytesIO()
+        self.stream = self.highlighter.create_stream(self.out)
+
+    def get_output(self):
+        return self.out.getvalue().decode('utf-8')
+
+    def write_chunks(self, data, size):
+        for start in range(0, len(data), size):
+            self.stream.write(data[start:start + size])
+
+    def test_get_lexer(self):
+        lexers = self.highlighter.lexers
+        assert self.highlighter.get_lexer(self.JSON) is \
+            lexers[OutputHighlighter.JSON]
+        assert self.highlighter.get_lexer('\n  [\n') is \
+            lexers[OutputHighlighter.JSON]
+        assert self.highlighter.get_lexer(self.TABLE) is \
+            lexers[OutputHighlighter.TABLE]
+        assert self.highlighter.get_lexer('RESERVATIONS\t1234\n') is None
+
+    def test_streams_complete_lines(self):
+        self.stream.write(b'{\n    "Reservations": [')
+        output = self.get_output()
+        assert self.ESCAPE.sub('', output) == '{\n'
+        self.stream.write(b']\n')
+        assert self.ESCAPE.sub('', self.get_output()) == \
+            '{\n    "Reservations": []\n'
+        self.stream.write(b'}')
+        self.stream.close()
+        assert self.ESCAPE.sub('', self.get_output()) == \
+            '{\n    "Reservations": []\n}'
+
+    def test_chunks_match_whole_output(self):
+        data = self.JSON.encode('utf-8')
+        self.stream.write(data)
+        self.stream.close()
+        whole = self.get_output()
+        assert whole != self.JSON
+        assert self.ESCAPE.sub('', whole) == self.JSON
+        for size in (1, 7, 64):
+            self.setUp()
+            self.write_chunks(data, size)
+            self.stream.close()
+            assert self.ESCAPE.sub('', self.get_output()) == self.JSON
+
+    def test_split_characters(self):
+        data = '[\n    "café"\n]\n'.encode('utf-8')
+        self.write_chunks(data, 1)
+        self.stream.close()
+        assert 'é' in self.get_output()
+
+    def test_plain_output(self):
+        self.stream.write(b'\n')
+        assert self.get_output() == ''
+        self.stream.write(b'RESERVATIONS\t1234\nINSTANCES\ti-a51d')
+        # Output that is not highlighted is written out as it arrives
+        assert self.get_output() == '\nRESERVATIONS\t1234\nINSTANCES\ti-a51d'
+        self.stream.close()
+
+    def test_table_lexer(self):
+        tokens = list(AwsTableLexer().get_tokens(self.TABLE))
+        assert (Punctuation, '-------------------------------') in tokens
+        assert (String, 'DescribeInstances') in tokens
+        assert (String, 'OwnerId') in tokens
+        assert (Number, '1234') in tokens
+        self.stream.write(self.TABLE.encode('utf-8'))
+        self.stream.close()
+        assert self.ESCAPE.sub('', self.get_output()) == self.TABLE
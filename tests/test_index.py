@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2015 Donne Martin. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+
+from __future__ import unicode_literals
+from __future__ import print_function
+import mock
+import random
+from tests.compat import unittest
+from saws.index import PrefixIndex
+from saws.utils import TextUtils
+
+
+class IndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.names = ['i-b815ecc3', 'i-a51d05f4', 'Stack', 'stackset',
+                      'Name', 'name', 'production', 'production-blue']
+        self.index = PrefixIndex(self.names)
+
+    def scan(self, names, prefix):
+        return [name for name in sorted(names)
+                if name.lower().startswith(prefix.lower())]
+
+    def test_find_prefix(self):
+        assert self.index.find_prefix('i-') == ['i-a51d05f4', 'i-b815ecc3']
+        assert self.index.find_prefix('st') == ['Stack', 'stackset']
+        assert self.index.find_prefix('NAME') == ['Name', 'name']
+        assert self.index.find_prefix('production-') == ['production-blue']
+        assert self.index.find_prefix('foo') == []
+        assert self.index.find_prefix('') == sorted(self.names)
+
+    def test_find_prefix_matches_scan(self):
+        rand = random.Random(0)
+        names = [''.join(rand.choice('abcABC-') for _ in range(6))
+                 for _ in range(500)]
+        index = PrefixIndex(names)
+        for prefix in ['a', 'Ab', 'c-', 'CCC', 'b-a', 'z', '']:
+            assert index.find_prefix(prefix) == self.scan(names, prefix)
+
+    def test_text_utils_index_cache(self):
+        text_utils = TextUtils()
+        names = ['i-%05d' % number for number in range(100)]
+        completions = list(text_utils.find_matches('i-0009', names, False))
+        assert [c.text for c in completions] == ['i-00090', 'i-00091',
+                                                 'i-00092', 'i-00093',
+                                                 'i-00094', 'i-00095',
+                                                 'i-00096', 'i-00097',
+                                                 'i-00098', 'i-00099']
+        index = text_utils._get_index(names)
+        assert text_utils._get_index(names) is index
+        names.append('i-00099a')
+        completions = list(text_utils.find_matches('i-00099', names, False))
+        assert [c.text for c in completions] == ['i-00099', 'i-00099a']
+        assert text_utils._get_index(names) is not index
+
+    def test_find_prefix_limit(self):
+        names = ['i-{0:05x}'.format(i) for i in range(3000)] + \
+            ['I-{0:05x}'.format(i) for i in range(0, 3000, 7)]
+        random.shuffle(names)
+        index = PrefixIndex(names)
+        for prefix in ['', 'i', 'I-0', 'i-00a', 'i-1', 'x']:
+            for limit in [0, 1, 10, 5000]:
+                assert index.find_prefix(prefix, limit) == \
+                    index.find_prefix(prefix)[:limit]
+
+    def test_text_utils_limits_prefix_matches(self):
+        names = ['i-{0:05d}'.format(i) for i in range(3000)]
+        text_utils = TextUtils()
+        with mock.patch.object(TextUtils, 'PREFIX_MATCH_LIMIT', 50):
+            completions = list(text_utils.find_matches('i-0', names, False))
+        assert [c.text for c in completions] == names[:50]
@@ -61,5 +61,12 @@ class KeysTest(unittest.TestCase):
 
     @mock.patch('saws.resources.print')
     def test_f5(self, mock_print):
-        self.feed_key(Keys.F5)
-        mock_print.assert_called_with('Done refreshing')
+        resources = self.saws.completer.resources
+        with mock.patch.object(resources, '_query_resources') as mock_query:
+            self.feed_key(Keys.F5)
+            resources.wait_for_refresh(5)
+        mock_query.assert_called_with(echo=False,
+                                      on_progress=mock.ANY,
+                                      resource_lists=resources.resource_lists,
+                                      partition=resources.partition)
+        assert resources.get_refresh_progress() is None
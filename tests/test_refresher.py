@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2015 Donne Martin. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+
+from __future__ import unicode_literals
+from __future__ import print_function
+import mock
+import threading
+import time
+from tests.compat import unittest
+from saws.refresher import ResourceRefresher
+
+
+class SleepyResource(object):
+
+    OPTION = '--sleepy'
+
+    def __init__(self, delay, error=None):
+        self.delay = delay
+        self.error = error
+        self.resources = []
+        self.thread_name = None
+
+    def query_resource(self):
+        self.thread_name = threading.current_thread().name
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        self.resources = ['queried']
+
+
+class RefresherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.log_exception = mock.Mock()
+        self.refresher = ResourceRefresher(self.log_exception,
+                                           max_workers=5,
+                                           timeout=5)
+
+    def test_refresh_runs_concurrently(self):
+        resources = [SleepyResource(0.2) for _ in range(5)]
+        start = time.time()
+        results = self.refresher.refresh(resources)
+        assert time.time() - start < 0.2 * len(resources)
+        assert len(set(r.thread_name for r in resources)) > 1
+        for resource, result in zip(resources, results):
+            assert result.resource is resource
+            assert result.succeeded
+            assert resource.resources == ['queried']
+
+    def test_refresh_collects_errors(self):
+        error = ValueError('test_refresh_collects_errors')
+        resources = [SleepyResource(0), SleepyResource(0, error=error)]
+        results = self.refresher.refresh(resources)
+        assert results[0].succeeded
+        assert not results[1].succeeded
+        assert results[1].error is error
+        assert not results[1].timed_out
+        assert self.log_exception.called
+
+    def test_refresh_times_out(self):
+        self.refresher.timeout = 0.1
+        resources = [SleepyResource(0), SleepyResource(1)]
+        start = time.time()
+        results = self.refresher.refresh(resources)
+        assert time.time() - start < 1
+        assert results[0].succeeded
+        assert results[1].timed_out
+        assert results[1].error is not None
+
+    def test_refresh_bounded_pool(self):
+        self.refresher.max_workers = 1
+        resources = [SleepyResource(0) for _ in range(3)]
+        results = self.refresher.refresh(resources)
+        assert len(set(r.thread_name for r in resources)) == 1
+        assert all(result.succeeded for result in results)
+
+    def test_refresh_empty(self):
+        assert self.refresher.refresh([]) == []
@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2015 Donne Martin. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+
+from __future__ import unicode_literals
+from __future__ import print_function
+import re
+import threading
+import time
+import mock
+import botocore.session
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from six.moves import BaseHTTPServer, socketserver
+from six.moves.urllib.parse import parse_qs
+from tests.compat import unittest
+from saws.resource.backend import Backoff, BotocoreBackend, \
+    QueryBackend, create_query_backend
+from saws.resource.instance_ids import InstanceIds
+from saws.resource.instance_tag_keys import InstanceTagKeys
+from saws.resource.bucket_names import BucketNames
+
+
+class StubEc2Server(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    """Serves canned EC2 responses for each region on localhost.
+
+    The region of a request is read from the credential scope of its
+    signature.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, instances):
+        BaseHTTPServer.HTTPServer.__init__(self, ('127.0.0.1', 0),
+                                           StubEc2Handler)
+        self.instances = instances
+        self.throttle = {}
+        self.errors = {}
+        self.delay = 0
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{0}'.format(self.server_address[1])
+
+
+class StubEc2Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    INSTANCE = ('<item><instanceId>{0}</instanceId><tagSet><item>'
+                '<key>Region</key><value>{1}</value>'
+                '</item></tagSet></item>')
+    ERROR = ('<Response><Errors><Error><Code>{0}</Code>'
+             '<Message>{0}</Message></Error></Errors>'
+             '<RequestID>stub</RequestID></Response>')
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        action = parse_qs(body.decode('utf-8'))['Action'][0]
+        region = re.search(r'Credential=[^/]+/[^/]+/([^/]+)/',
+                           self.headers['Authorization']).group(1)
+        with server.lock:
+            server.requests.append((action, region))
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight,
+                                       server.in_flight)
+            throttled = server.throttle.get(region, 0) > 0
+            if throttled:
+                server.throttle[region] -= 1
+        time.sleep(server.delay)
+        try:
+            if throttled:
+                self.respond(503, self.ERROR.format('RequestLimitExceeded'))
+            elif region in server.errors:
+                self.respond(401, self.ERROR.format(server.errors[region]))
+            elif action == 'DescribeRegions':
+                self.respond(200, (
+                    '<DescribeRegionsResponse><regionInfo>{0}'
+                    '</regionInfo></DescribeRegionsResponse>').format(''.join(
+                        '<item><regionName>{0}</regionName></item>'.format(
+                            name) for name in sorted(server.instances))))
+            else:
+                self.respond(200, (
+                    '<DescribeInstancesResponse><reservationSet><item>'
+                    '<instancesSet>{0}</instancesSet></item></reservationSet>'
+                    '</DescribeInstancesResponse>').format(''.join(
+                        self.INSTANCE.format(instance_id, region)
+                        for instance_id in server.instances[region])))
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def respond(self, status, body):
+        body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/xml')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class RegionsTest(unittest.TestCase):
+
+    INSTANCES = {
+        'eu-west-1': ['i-eu000001'],
+        'us-east-1': ['i-us000001', 'i-shared01'],
+        'us-west-2': ['i-us000002', 'i-shared01'],
+    }
+
+    def setUp(self):
+        self.server = StubEc2Server(self.INSTANCES)
+        self.server_thread = threading.Thread(
+            target=self.server.serve_forever, kwargs={'poll_interval': 0.01})
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        self.session = botocore.session.get_session()
+        self.print_patch = mock.patch('saws.resource.instance_ids.print')
+        self.print_patch.start()
+        self.backoff_patch = mock.patch.object(Backoff, 'BASE_DELAY', 0.001)
+        self.backoff_patch.start()
+
+    def tearDown(self):
+        self.backoff_patch.stop()
+        self.print_patch.stop()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def create_backend(self, regions):
+        backend = BotocoreBackend(session=self.session, region='us-east-1',
+                                  regions=regions)
+        for region in self.INSTANCES:
+            client = self.session.create_client(
+                'ec2',
+                region_name=region,
+                endpoint_url=self.server.url,
+                aws_access_key_id='foo',
+                aws_secret_access_key='bar',
+                config=Config(retries={'max_attempts': 0},
+                              proxies={}))
+            backend.clients[('ec2', region)] = client
+            if region == backend.region:
+                backend.clients['ec2'] = client
+        return backend
+
+    def get_instances_requests(self):
+        return sorted(region for action, region in self.server.requests
+                      if action == 'DescribeInstances')
+
+    def test_fan_out_merges_regions(self):
+        backend = self.create_backend(['us-east-1', 'us-west-2'])
+        instance_ids = InstanceIds(backend)
+        instance_tag_keys = InstanceTagKeys(backend)
+        backend.begin_refresh()
+        instance_ids.query_resource()
+        with mock.patch('saws.resource.instance_tag_keys.print'):
+            instance_tag_keys.query_resource()
+        backend.end_refresh()
+        assert instance_ids.resources == \
+            ['i-shared01', 'i-us000001', 'i-us000002']
+        assert instance_ids.resources.meta == {
+            'i-shared01': 'us-east-1,us-west-2',
+            'i-us000001': 'us-east-1',
+            'i-us000002': 'us-west-2',
+        }
+        assert list(instance_tag_keys.resources) == ['Region']
+        # The instances are fetched once from each region per refresh
+        assert self.get_instances_requests() == ['us-east-1', 'us-west-2']
+
+    def test_single_region_without_regions(self):
+        backend = self.create_backend(None)
+        instance_ids = InstanceIds(backend)
+        instance_ids.query_resource()
+        assert instance_ids.resources == ['i-us000001', 'i-shared01']
+        assert self.get_instances_requests() == ['us-east-1']
+
+    def test_global_resources_are_not_fanned_out(self):
+        backend = self.create_backend(['us-east-1', 'us-west-2'])
+        bucket_names = BucketNames(backend)
+        with mock.patch.object(backend, '_fetch',
+                               return_value=[]) as mock_fetch:
+            with mock.patch('saws.resource.bucket_names.print'):
+                bucket_names.query_resource()
+        mock_fetch.assert_called_once_with(bucket_names)
+
+    def test_all_regions(self):
+        backend = self.create_backend(QueryBackend.ALL_REGIONS)
+        instance_ids = InstanceIds(backend)
+        instance_ids.query_resource()
+        assert backend.get_regions() == sorted(self.INSTANCES)
+        assert self.get_instances_requests() == sorted(self.INSTANCES)
+        assert instance_ids.resources.meta['i-eu000001'] == 'eu-west-1'
+        # The enabled regions are listed once
+        instance_ids.query_resource()
+        assert [action for action, _ in self.server.requests].count(
+            'DescribeRegions') == 1
+
+    def test_pool_is_bounded(self):
+        self.server.delay = 0.1
+        backend = self.create_backend(sorted(self.INSTANCES))
+        with mock.patch.object(QueryBackend, 'MAX_REGION_WORKERS', 2):
+            InstanceIds(backend).query_resource()
+        assert self.server.max_in_flight == 2
+        assert self.get_instances_requests() == sorted(self.INSTANCES)
+
+    def test_backoff_on_throttling(self):
+        self.server.throttle['us-west-2'] = 2
+        backend = self.create_backend(['us-east-1', 'us-west-2'])
+        instance_ids = InstanceIds(backend)
+        instance_ids.query_resource()
+        assert 'i-us000002' in instance_ids.resources
+        assert self.get_instances_requests() == \
+            ['us-east-1', 'us-west-2', 'us-west-2', 'us-west-2']
+        # The throttled region keeps a longer delay for the next refresh
+        assert backend._backoffs['us-west-2'].delay > Backoff.BASE_DELAY
+        assert backend._backoffs['us-east-1'].delay == Backoff.BASE_DELAY
+
+    def test_throttling_gives_up(self):
+        self.server.throttle['us-east-1'] = Backoff.MAX_ATTEMPTS
+        backend = self.create_backend(['us-east-1'])
+        with self.assertRaises(ClientError):
+            InstanceIds(backend).query_resource()
+        assert len(self.get_instances_requests()) == Backoff.MAX_ATTEMPTS
+
+    def test_failed_regions(self):
+        self.server.errors['eu-west-1'] = 'AuthFailure'
+        backend = self.create_backend(['eu-west-1', 'us-east-1'])
+        instance_ids = InstanceIds(backend)
+        instance_ids.query_resource()
+        assert instance_ids.resources == ['i-shared01', 'i-us000001']
+        # Errors other than throttling are not retried
+        assert self.get_instances_requests() == ['eu-west-1', 'us-east-1']
+        backend = self.create_backend(['eu-west-1'])
+        with self.assertRaises(ClientError):
+            InstanceIds(backend).query_resource()
+
+    def test_backoff(self):
+        backoff = Backoff()
+        func = mock.Mock(side_effect=[ValueError, ValueError, 'result'])
+        with mock.patch('saws.resource.backend.time.sleep') as mock_sleep:
+            assert backoff.call(func, lambda e: True) == 'result'
+            assert mock_sleep.call_count == 2
+            assert backoff.delay == Backoff.BASE_DELAY * 2
+            func = mock.Mock(side_effect=KeyError)
+            with self.assertRaises(KeyError):
+                backoff.call(func, lambda e: isinstance(e, ValueError))
+            assert func.call_count == 1
+            assert mock_sleep.call_count == 2
+
+    def test_create_query_backend(self):
+        assert create_query_backend('botocore').regions is None
+        assert create_query_backend('botocore', '').regions is None
+        backend = create_query_backend('subprocess', ' us-east-1, eu-west-1')
+        assert backend.regions == ['us-east-1', 'eu-west-1']
+        backend = create_query_backend('botocore', ['us-east-1', 'all'])
+        assert backend.regions == QueryBackend.ALL_REGIONS
+        assert backend.fallback.regions == QueryBackend.ALL_REGIONS
+        assert backend.with_context('prod', '').regions == \
+            QueryBackend.ALL_REGIONS
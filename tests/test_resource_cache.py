@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2015 Donne Martin. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+
+from __future__ import unicode_literals
+from __future__ import print_function
+import os
+import random
+import shutil
+import tempfile
+from tests.compat import unittest
+from saws.index import PrefixIndex
+from saws.resource.backend import ResourceList
+from saws.resource_cache import ResourceCache
+from saws.utils import TextUtils
+
+
+class ResourceCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache_path = os.path.join(self.temp_dir, 'saws', 'resources.bin')
+        self.names = ['i-b815ecc3', 'i-a51d05f4', 'Stack', 'stackset',
+                      'Name', 'name', 'production', 'b\xfccket']
+
+    def tearDown(self):
+        ResourceCache._close_maps(self.cache_path)
+        shutil.rmtree(self.temp_dir)
+
+    def test_round_trip(self):
+        ResourceCache.write(self.cache_path,
+                            [('[--instance-ids]', 1450000000.5, self.names),
+                             ('[--bucket]', None, [])])
+        assert ResourceCache.is_cache_file(self.cache_path)
+        assert os.listdir(os.path.dirname(self.cache_path)) == \
+            ['resources.bin']
+        (header, fetched_at, table), (header_2, fetched_at_2, table_2) = \
+            ResourceCache.read(self.cache_path)
+        assert header == '[--instance-ids]'
+        assert fetched_at == 1450000000.5
+        assert len(table) == len(self.names)
+        assert list(table) == sorted(self.names)
+        assert table[0] == 'Name'
+        assert table[-1] == sorted(self.names)[-1]
+        assert table[1:3] == sorted(self.names)[1:3]
+        assert header_2 == '[--bucket]'
+        assert fetched_at_2 is None
+        assert list(table_2) == []
+        assert table_2.find_prefix('b') == []
+
+    def test_find_prefix_matches_prefix_index(self):
+        rand = random.Random(0)
+        names = [''.join(rand.choice('abcABC-') for _ in range(6))
+                 for _ in range(500)]
+        ResourceCache.write(self.cache_path, [('[--bucket]', None, names)])
+        table = ResourceCache.read(self.cache_path)[0][2]
+        index = PrefixIndex(names)
+        for prefix in ['a', 'Ab', 'c-', 'CCC', 'b-a', 'z', '']:
+            assert table.find_prefix(prefix) == index.find_prefix(prefix)
+            assert table.find_prefix(prefix, 10) == \
+                index.find_prefix(prefix, 10)
+
+    def test_text_utils_uses_table(self):
+        names = ['i-%05d' % number for number in range(100)]
+        ResourceCache.write(self.cache_path, [('[--bucket]', None, names)])
+        table = ResourceCache.read(self.cache_path)[0][2]
+        text_utils = TextUtils()
+        assert text_utils._get_index(table) is table
+        completions = list(text_utils.find_matches('i-0009', table, False))
+        assert [c.text for c in completions] == names[90:]
+        completions = list(text_utils.find_matches('i-99', table, True))
+        assert [c.text for c in completions][0] == 'i-00099'
+
+    def test_meta(self):
+        names = ResourceList(['i-%05d' % number for number in range(100)],
+                             {'i-00001': 'us-east-1',
+                              'i-00099': 'us-east-1,eu-west-1'})
+        ResourceCache.write(self.cache_path,
+                            [('[--instance-ids]', None, names),
+                             ('[--bucket]', None, ['web-server-logs'])])
+        sections = ResourceCache.read(self.cache_path)
+        table = sections[0][2]
+        assert table.meta.get('i-00001') == 'us-east-1'
+        assert table.meta.get('i-00099') == 'us-east-1,eu-west-1'
+        assert table.meta.get('i-00002') is None
+        assert table.meta.get('i-99999') is None
+        assert sections[1][2].meta is None
+        completions = list(TextUtils().find_matches('i-0009', table, False))
+        assert completions[-1].display_meta == 'us-east-1,eu-west-1'
+        assert not completions[0].display_meta
+        # Tables read from the cache keep their meta when written again
+        ResourceCache.write(self.cache_path, [('[--instance-ids]', None,
+                                               table)])
+        table = ResourceCache.read(self.cache_path)[0][2]
+        assert table.meta.get('i-00001') == 'us-east-1'
+
+    def test_write_after_read(self):
+        ResourceCache.write(self.cache_path,
+                            [('[--bucket]', None, ['web-server-logs'])])
+        table = ResourceCache.read(self.cache_path)[0][2]
+        ResourceCache.write(self.cache_path,
+                            [('[--bucket]', 1450000000.0,
+                              list(table) + ['prod-logs'])])
+        # The old map is closed before the file is replaced
+        with self.assertRaises(ValueError):
+            list(table)
+        header, fetched_at, table = ResourceCache.read(self.cache_path)[0]
+        assert fetched_at == 1450000000.0
+        assert list(table) == ['prod-logs', 'web-server-logs']
+        assert os.listdir(os.path.dirname(self.cache_path)) == \
+            ['resources.bin']
+
+    def test_get_path(self):
+        assert ResourceCache.get_path('a-b', 'c') != \
+            ResourceCache.get_path('a', 'b-c')
+        assert ResourceCache.get_path('a@b', 'c') != \
+            ResourceCache.get_path('a', 'b@c')
+        assert ResourceCache.get_path('', '') == \
+            ResourceCache.get_path('default', 'default')
+        assert os.path.basename(ResourceCache.get_path('dev', 'us-east-1')) \
+            == 'resources-dev@us-east-1.bin'
+
+    def test_invalid_cache(self):
+        with open(os.path.join(self.temp_dir, 'RESOURCES.txt'), 'w') as fp:
+            fp.write('[--bucket]: 0\n')
+        assert not ResourceCache.is_cache_file(
+            os.path.join(self.temp_dir, 'RESOURCES.txt'))
+        with open(os.path.join(self.temp_dir, 'truncated.bin'), 'wb') as fp:
+            fp.write(ResourceCache.MAGIC)
+        with self.assertRaises(IOError):
+            ResourceCache.read(os.path.join(self.temp_dir, 'truncated.bin'))
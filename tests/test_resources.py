@@ -15,8 +15,18 @@
 
 from __future__ import unicode_literals
 from __future__ import print_function
+import os
+import shutil
+import tempfile
+import threading
+import time
 import mock
+from botocore.credentials import ReadOnlyCredentials
 from tests.compat import unittest
+from saws.resource.backend import SubprocessBackend
+from saws.resource.resource import Resource
+from saws.resource_cache import ResourceCache
+from saws.resources import AwsResources
 from saws.saws import Saws
 
 
@@ -57,6 +67,89 @@ class ResourcesTest(unittest.TestCase):
         self.resources.refresh(force_refresh=True)
         mock_print.assert_called_with('Done refreshing')
 
+    @mock.patch('saws.resources.print')
+    def test_refresh_background(self, mock_print):
+        self.resources.refresh(force_refresh=False)
+        self.resources._set_resources_path('data/RESOURCES_FORCED.txt')
+        queried = threading.Event()
+        release = threading.Event()
+        on_progress = mock.Mock()
+
+        def query_resources(echo=True, on_progress=None,
+                            resource_lists=None, partition=None):
+            queried.set()
+            release.wait(5)
+            self.resources.resource_lists[
+                self.resources.ResourceType.BUCKET_NAMES.value] \
+                .resources = ['new-bucket']
+            on_progress(5, 5)
+
+        with mock.patch.object(self.resources, '_query_resources',
+                               side_effect=query_resources):
+            self.resources.refresh(force_refresh=True,
+                                   background=True,
+                                   on_progress=on_progress)
+            assert queried.wait(5)
+            assert self.resources.get_refresh_progress() == (0, 5)
+            assert len(self.resources.resources_options_map[
+                '--bucket']) == self.NUM_SAMPLE_BUCKET_NAMES
+            release.set()
+            self.resources.wait_for_refresh(5)
+        assert self.resources.get_refresh_progress() is None
+        assert self.resources.resources_options_map['--bucket'] == \
+            ['new-bucket']
+        assert on_progress.call_count == 2
+
+    @mock.patch('saws.resources.print')
+    def test_fetch_times_saved_and_loaded(self, mock_print):
+        self.resources.refresh(force_refresh=False)
+        for resource_list in self.resources.resource_lists:
+            assert resource_list.fetched_at is None
+            assert resource_list.is_expired()
+        instance_ids = self.resources.resource_lists[
+            self.resources.ResourceType.INSTANCE_IDS.value]
+        bucket_names = self.resources.resource_lists[
+            self.resources.ResourceType.BUCKET_NAMES.value]
+        now = time.time()
+        instance_ids.fetched_at = now - instance_ids.TTL
+        bucket_names.fetched_at = now - instance_ids.TTL
+        assert instance_ids.is_expired(now)
+        assert not bucket_names.is_expired(now)
+        self.resources._set_resources_path('data/RESOURCES_FORCED.txt')
+        self.resources._save_resources_to_file()
+        self.resources.refresh(force_refresh=False)
+        self.verify_resources()
+        assert instance_ids.fetched_at == now - instance_ids.TTL
+        assert bucket_names.fetched_at == now - instance_ids.TTL
+        assert self.resources.resource_lists[
+            self.resources.ResourceType.BUCKET_URIS.value].fetched_at is None
+
+    @mock.patch('saws.resources.print')
+    def test_save_over_loaded_cache(self, mock_print):
+        self.resources.refresh(force_refresh=False)
+        self.resources._set_resources_path('data/RESOURCES_FORCED.txt')
+        self.resources._save_resources_to_file()
+        self.resources.refresh(force_refresh=False)
+        bucket_names = self.resources.resource_lists[
+            self.resources.ResourceType.BUCKET_NAMES.value]
+        bucket_names.resources = ['new-bucket']
+        # Writing closes the cache the other resources were read from
+        self.resources._save_resources_to_file()
+        self.verify_resources_except(bucket_names)
+        assert list(self.resources.resources_options_map[
+            '--instance-ids']) == list(self.resources.resource_lists[
+                self.resources.ResourceType.INSTANCE_IDS.value].resources)
+        self.resources.refresh(force_refresh=False)
+        assert list(bucket_names.resources) == ['new-bucket']
+
+    def verify_resources_except(self, skipped_list):
+        for resource_list, sample_resource_count in zip(
+                self.resources.resource_lists,
+                self.sample_resource_counts):
+            if resource_list is not skipped_list:
+                assert len(list(resource_list.resources)) == \
+                    sample_resource_count
+
     # TODO: Silence output
     @mock.patch('saws.resources.print')
     def test_refresh(self, mock_print):
@@ -112,6 +205,134 @@ class ResourcesTest(unittest.TestCase):
             universal_newlines=True,
             shell=True)
 
+    @mock.patch('saws.resources.print')
+    def test_switch_context(self, mock_print):
+        self.resources.refresh(force_refresh=False)
+        for resource_list in self.resources.resource_lists:
+            resource_list.fetched_at = time.time()
+        partition = self.resources.partition
+        cache_dir = tempfile.mkdtemp()
+        try:
+            with mock.patch.object(ResourceCache, 'DIR', cache_dir):
+                ResourceCache.write(
+                    ResourceCache.get_path('prod', 'us-west-2'),
+                    [(resource_list.HEADER, time.time(), ['prod-resource'])
+                     for resource_list in self.resources.resource_lists])
+                with mock.patch.object(
+                        self.resources,
+                        '_refresh_in_background') as mock_refresh:
+                    assert self.resources.switch_context(
+                        ('prod', 'us-west-2'))
+                    assert not mock_refresh.called
+                    assert list(self.resources.resources_options_map[
+                        '--bucket']) == ['prod-resource']
+                    assert not self.resources.switch_context(
+                        ('prod', 'us-west-2'))
+                    assert self.resources.switch_context(partition.context)
+                    assert self.resources.partition is partition
+                    self.verify_resources()
+                    assert not mock_refresh.called
+                    assert self.resources.switch_context(('dev', ''))
+                    on_progress, resource_lists, new_partition = \
+                        mock_refresh.call_args[0]
+                    assert new_partition is self.resources.partition
+                    assert resource_lists == new_partition.resource_lists
+                    assert new_partition.query_backend.get_env()[
+                        'AWS_PROFILE'] == 'dev'
+        finally:
+            shutil.rmtree(cache_dir)
+
+    @mock.patch('saws.resources.print')
+    def test_inventory(self, mock_print):
+        outputs = {
+            ('prod', 'ec2'): '[{"InstanceId": "i-prod0001", "Tags": '
+                             '[{"Key": "Name", "Value": "web"}]}, '
+                             '{"InstanceId": "i-shared01"}]',
+            ('dev', 'ec2'): '[{"InstanceId": "i-dev00001"}, '
+                            '{"InstanceId": "i-shared01"}]',
+            ('prod', 's3'): '2015-07-26 16:45:07 prod-logs\n',
+            ('dev', 's3'): '2015-07-26 16:45:07 dev-logs\n',
+        }
+        queries = []
+
+        def query_aws(resource, query, region=None):
+            env = resource.query_backend.get_env(region)
+            # Queries reuse the credentials resolved for their profile
+            assert env['AWS_ACCESS_KEY_ID'] == 'key-' + env['AWS_PROFILE']
+            service = query.split()[1]
+            queries.append((env['AWS_PROFILE'], service))
+            return outputs[(env['AWS_PROFILE'], service)]
+
+        def resolve_credentials(query_backend):
+            query_backend.credentials = mock.Mock(**{
+                'get_frozen_credentials.return_value': ReadOnlyCredentials(
+                    'key-' + query_backend.profile, 'secret', None)})
+
+        cache_dir = tempfile.mkdtemp()
+        try:
+            with mock.patch.object(ResourceCache, 'DIR', cache_dir), \
+                    mock.patch.dict('os.environ',
+                                    {'AWS_DEFAULT_REGION': 'us-east-1'}), \
+                    mock.patch.object(Resource, '_query_aws', autospec=True,
+                                      side_effect=query_aws), \
+                    mock.patch.object(SubprocessBackend,
+                                      'resolve_credentials', autospec=True,
+                                      side_effect=resolve_credentials) \
+                    as mock_resolve:
+                os.environ.pop('AWS_PROFILE', None)
+                log_exception = mock.Mock()
+                resources = AwsResources(log_exception,
+                                         inventory_profiles=['prod', 'dev'])
+                assert resources.partition.is_inventory
+                resources.refresh(force_refresh=True)
+                assert not log_exception.called
+                instance_ids = resources.resources_options_map[
+                    '--instance-ids']
+                assert list(instance_ids) == \
+                    ['i-dev00001', 'i-prod0001', 'i-shared01']
+                assert instance_ids.meta == {'i-dev00001': 'dev',
+                                             'i-prod0001': 'prod',
+                                             'i-shared01': 'prod,dev'}
+                assert resources.resources_options_map[
+                    '--bucket'].meta['prod-logs'] == 'prod'
+                # Each profile's instances and buckets are fetched once
+                assert sorted(queries) == [('dev', 'ec2'), ('dev', 's3'),
+                                           ('prod', 'ec2'), ('prod', 's3')]
+                assert mock_resolve.call_count == 2
+                assert ResourceCache.is_cache_file(ResourceCache.get_path(
+                    'prod', 'us-east-1'))
+                resources.refresh(force_refresh=True)
+                assert mock_resolve.call_count == 2
+                # Selecting a profile leaves inventory mode
+                with mock.patch.dict('os.environ', {'AWS_PROFILE': 'prod'}):
+                    assert resources.switch_context()
+                    assert list(resources.resources_options_map[
+                        '--instance-ids']) == ['i-prod0001', 'i-shared01']
+                assert resources.switch_context()
+                assert resources.partition.is_inventory
+                # The merged resources are read back from the cache
+                resources = AwsResources(log_exception,
+                                         inventory_profiles=['prod', 'dev'])
+                resources.refresh()
+                instance_ids = resources.resources_options_map[
+                    '--instance-ids']
+                assert instance_ids.meta.get('i-shared01') == 'prod,dev'
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_parse_buckets(self):
+        bucket_uris = self.resources.resource_lists[
+            self.resources.ResourceType.BUCKET_URIS.value]
+        bucket_uris.resources = ['s3://old']
+        assert bucket_uris.parse_output(
+            '2015-01-01 00:00:00 foo\n\n2015-01-01 00:00:00 bar\n') == \
+            ['s3://foo', 's3://bar']
+        assert bucket_uris.parse_response(
+            [{'Buckets': [{'Name': 'foo'}]}, {'Buckets': []}]) == \
+            ['s3://foo']
+        # Parsing leaves the current resources to the caller
+        assert bucket_uris.resources == ['s3://old']
+
     def test_add_and_clear_bucket_name(self):
         BUCKET_NAME = 'test_bucket_name'
         bucket_names = self.resources.resource_lists[
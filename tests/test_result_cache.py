@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2015 Donne Martin. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+
+from __future__ import unicode_literals
+from __future__ import print_function
+import io
+import mock
+import os
+from tests.compat import unittest
+from saws.result_cache import RecordingStream, ResultCache
+
+
+class ResultCacheTest(unittest.TestCase):
+
+    DESCRIBE = ['ec2', 'describe-instances']
+
+    def setUp(self):
+        self.cache = ResultCache(60)
+        self.now = 1000.0
+        self.time_patch = mock.patch('saws.result_cache.time.time',
+                                     side_effect=lambda: self.now)
+        self.time_patch.start()
+        self.env_patch = mock.patch.dict('os.environ')
+        self.env_patch.start()
+        for name in ResultCache.CONTEXT_ENV:
+            os.environ.pop(name, None)
+
+    def tearDown(self):
+        self.env_patch.stop()
+        self.time_patch.stop()
+
+    def test_find_command(self):
+        assert self.cache.find_command(self.DESCRIBE) == \
+            ('ec2', 'describe-instances')
+        assert self.cache.find_command(
+            ['--region', 'us-east-1', '--debug', 'ec2',
+             '--output=json', 'describe-instances', '--instance-ids',
+             'i-a51d05f4']) == ('ec2', 'describe-instances')
+        assert self.cache.find_command(['--version']) == (None, None)
+        assert self.cache.find_command(['s3']) == ('s3', None)
+
+    def test_is_cacheable(self):
+        for args in [self.DESCRIBE,
+                     ['s3', 'ls'],
+                     ['iam', 'list-users'],
+                     ['s3api', 'get-bucket-policy', '--bucket', 'b']]:
+            assert self.cache.is_cacheable(args), args
+        for args in [['ec2', 'run-instances'],
+                     ['ec2', 'terminate-instances'],
+                     ['s3', 'cp', 'a', 's3://b/a'],
+                     ['s3api', 'get-object', '--bucket', 'b', 'key', 'out'],
+                     ['ecr', 'get-login-password'],
+                     ['s3'],
+                     ['--version']]:
+            assert not self.cache.is_cacheable(args), args
+
+    def test_ttl(self):
+        assert self.cache.get(self.DESCRIBE) is None
+        self.cache.put(self.DESCRIBE, b'{}')
+        self.now += 12
+        assert self.cache.get(self.DESCRIBE) == (b'{}', 12)
+        self.now += 60
+        assert self.cache.get(self.DESCRIBE) is None
+        assert not self.cache.entries
+
+    def test_context(self):
+        self.cache.put(self.DESCRIBE, b'default')
+        with mock.patch.dict('os.environ', {'AWS_PROFILE': 'prod'}):
+            assert self.cache.get(self.DESCRIBE) is None
+            self.cache.put(self.DESCRIBE, b'prod')
+            assert self.cache.get(self.DESCRIBE)[0] == b'prod'
+        with mock.patch.dict('os.environ', {'AWS_DEFAULT_REGION': 'eu'}):
+            assert self.cache.get(self.DESCRIBE) is None
+        assert self.cache.get(self.DESCRIBE)[0] == b'default'
+        assert self.cache.get(self.DESCRIBE + ['--profile', 'dev']) is None
+
+    def test_invalidate(self):
+        self.cache.put(self.DESCRIBE, b'ec2')
+        self.cache.put(['s3', 'ls'], b's3')
+        self.cache.put(['s3api', 'list-buckets'], b's3api')
+        with mock.patch.dict('os.environ', {'AWS_PROFILE': 'prod'}):
+            self.cache.put(self.DESCRIBE, b'prod')
+            self.cache.invalidate(['ec2', 'terminate-instances'])
+        assert self.cache.get(self.DESCRIBE) is None
+        assert self.cache.get(['s3', 'ls'])[0] == b's3'
+        self.cache.invalidate(['s3', 'rm', 's3://bucket/key'])
+        assert not self.cache.entries
+        self.cache.invalidate(['--version'])
+
+    def test_invalidate_shell_command(self):
+        def fill():
+            self.cache.put(self.DESCRIBE, b'ec2')
+            self.cache.put(['s3', 'ls'], b's3')
+        fill()
+        self.cache.invalidate_shell_command('ls -la | grep saws')
+        assert len(self.cache.entries) == 2
+        self.cache.invalidate_shell_command(
+            'aws ec2 terminate-instances --instance-ids i-1|tee log')
+        assert self.cache.get(self.DESCRIBE) is None
+        assert self.cache.get(['s3', 'ls'])[0] == b's3'
+        for text in ['aws $SERVICE delete-thing > log',
+                     'aws s3 ls; aws ec2 terminate-instances',
+                     'echo i-1 | xargs aws ec2 terminate-instances']:
+            fill()
+            self.cache.invalidate_shell_command(text)
+            assert not self.cache.entries, text
+
+    def test_bounded(self):
+        with mock.patch.object(ResultCache, 'MAX_ENTRIES', 2):
+            self.cache.put(['s3', 'ls'], b'1')
+            self.cache.put(['s3', 'ls', 'b'], b'2')
+            self.cache.get(['s3', 'ls'])
+            self.cache.put(['s3', 'ls', 'c'], b'3')
+        assert self.cache.get(['s3', 'ls', 'b']) is None
+        assert self.cache.get(['s3', 'ls'])[0] == b'1'
+        with mock.patch.object(ResultCache, 'MAX_OUTPUT_SIZE', 2):
+            self.cache.put(['s3', 'ls', 'd'], b'123')
+        assert self.cache.get(['s3', 'ls', 'd']) is None
+
+    def test_recording_stream(self):
+        out = io.BytesIO()
+        recorder = RecordingStream(out)
+        recorder.write(b'ab')
+        recorder.write(b'c')
+        assert recorder.getvalue() == out.getvalue() == b'abc'
+        assert recorder.complete
+        with mock.patch.object(ResultCache, 'MAX_OUTPUT_SIZE', 4):
+            recorder.write(b'de')
+            assert not recorder.complete
+        assert recorder.getvalue() == b''
+        assert out.getvalue() == b'abcde'
@@ -15,12 +15,17 @@
 
 from __future__ import unicode_literals
 from __future__ import print_function
+import io
 import mock
 import os
+import re
 import traceback
 from tests.compat import unittest
 from saws.saws import Saws
 from saws.commands import AwsCommands
+from saws.worker import AwsWorker
+from saws.highlighter import HighlightedStream
+from saws.result_cache import ResultCache
 
 
 class SawsTest(unittest.TestCase):
@@ -100,18 +105,23 @@ class SawsTest(unittest.TestCase):
         assert self.saws._handle_cd('cd foo')
         mock_os.chdir.assert_called_with('foo')
 
-    def test_colorize_output(self):
+    def test_should_colorize(self):
         self.saws.set_color(False)
-        assert self.saws._colorize_output(AwsCommands.AWS_COMMAND) == \
-            AwsCommands.AWS_COMMAND
+        assert not self.saws._should_colorize(AwsCommands.AWS_COMMAND)
         self.saws.set_color(True)
-        assert self.saws._colorize_output(AwsCommands.AWS_CONFIGURE) == \
-            AwsCommands.AWS_CONFIGURE
-        assert self.saws._colorize_output(AwsCommands.AWS_HELP) == \
-            AwsCommands.AWS_HELP
-        EC2_LS_CMD = 'aws ec2 ls'
-        assert self.saws._colorize_output(EC2_LS_CMD) == \
-            EC2_LS_CMD + self.saws.PYGMENTS_CMD
+        assert not self.saws._should_colorize(AwsCommands.AWS_CONFIGURE)
+        assert not self.saws._should_colorize(AwsCommands.AWS_HELP)
+        assert not self.saws._should_colorize('aws s3 ls | grep logs')
+        assert not self.saws._should_colorize('ls')
+        assert self.saws._should_colorize('aws ec2 ls')
+
+    def mock_stdout(self):
+        out = io.BytesIO()
+        patcher = mock.patch('saws.saws.sys', **{'stdout.buffer': out,
+                                                 'stdout.encoding': 'utf-8'})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return out
 
     @mock.patch('saws.saws.subprocess')
     @mock.patch('saws.saws.webbrowser')
@@ -125,6 +135,33 @@ class SawsTest(unittest.TestCase):
         self.saws._process_command('cd .')
         mock_subprocess.call.assert_not_called()
 
+    @mock.patch('saws.saws.subprocess')
+    def test_process_command_export(self, mock_subprocess):
+        with mock.patch.dict('os.environ'):
+            with mock.patch.object(self.saws.completer.resources,
+                                   'switch_context') as mock_switch:
+                self.saws._process_command(
+                    'export AWS_PROFILE=prod AWS_DEFAULT_REGION=us-west-2')
+                assert os.environ['AWS_PROFILE'] == 'prod'
+                assert os.environ['AWS_DEFAULT_REGION'] == 'us-west-2'
+                self.saws._process_command('unset AWS_DEFAULT_REGION')
+                assert 'AWS_DEFAULT_REGION' not in os.environ
+            assert mock_switch.call_count == 2
+        mock_subprocess.call.assert_not_called()
+        assert not self.saws._handle_export('aws ec2 ls')
+        assert not self.saws._handle_export('export')
+        assert not self.saws._handle_export('export -p')
+        assert not self.saws._handle_export('unset -v AWS_PROFILE')
+        assert not self.saws._handle_export('export 1A=b')
+        assert not self.saws._handle_export('export A=$HOME')
+        self.saws.set_color(False)
+        for text in ['export AWS_PROFILE=dev; aws s3 ls',
+                     'export AWS_PROFILE=dev && aws s3 ls']:
+            with mock.patch.dict('os.environ'):
+                self.saws._process_command(text)
+                assert os.environ.get('AWS_PROFILE') != 'dev'
+            mock_subprocess.call.assert_called_with(text, shell=True)
+
     @mock.patch('saws.saws.subprocess')
     def test_process_command(self, mock_subprocess):
         self.saws.set_color(False)
@@ -136,10 +173,80 @@ class SawsTest(unittest.TestCase):
         mock_subprocess.call.assert_called_with(AwsCommands.AWS_COMMAND,
                                                 shell=True)
         self.saws.set_color(True)
-        colorized_command = AwsCommands.AWS_COMMAND + self.saws.PYGMENTS_CMD
+        out = self.mock_stdout()
+        process = mock_subprocess.Popen.return_value
+        process.stdout.read.side_effect = [b'{\n  "Buckets', b'": []\n}\n',
+                                           b'']
         self.saws._process_command(AwsCommands.AWS_COMMAND)
-        mock_subprocess.call.assert_called_with(colorized_command,
+        mock_subprocess.Popen.assert_called_with(
+            AwsCommands.AWS_COMMAND, shell=True,
+            stdout=mock_subprocess.PIPE, bufsize=0)
+        output = out.getvalue().decode('utf-8')
+        assert '\x1b[' in output
+        assert re.sub(r'\x1b\[[0-9;]*m', '', output) == \
+            '{\n  "Buckets": []\n}\n'
+        process.wait.assert_called_once_with()
+
+    @mock.patch('saws.saws.subprocess')
+    def test_process_command_worker(self, mock_subprocess):
+        self.saws.worker = mock.Mock(parse_command=AwsWorker.parse_command)
+        self.saws.set_color(False)
+        self.saws._process_command('aws ec2 ls')
+        self.saws.worker.run.assert_called_with(
+            ['ec2', 'describe-instances'])
+        mock_subprocess.call.assert_not_called()
+        self.saws._process_command('aws s3 ls | grep logs')
+        mock_subprocess.call.assert_called_with('aws s3 ls | grep logs',
                                                 shell=True)
+        self.saws.set_color(True)
+        self.mock_stdout()
+        self.saws._process_command('aws s3 ls')
+        self.saws.worker.run.assert_called_with(
+            ['s3', 'ls'], stdout=mock.ANY, tty=False)
+        stream = self.saws.worker.run.call_args[1]['stdout']
+        assert isinstance(stream, HighlightedStream)
+        mock_subprocess.Popen.assert_not_called()
+
+    @mock.patch('saws.saws.click')
+    @mock.patch('saws.saws.subprocess')
+    def test_process_command_result_cache(self, mock_subprocess, mock_click):
+        out = self.mock_stdout()
+        self.saws.set_color(False)
+        self.saws.result_cache = ResultCache(60)
+
+        def run(args, stdout=None, tty=None):
+            stdout.write(' '.join(args).encode('utf-8'))
+            return 0
+        self.saws.worker = mock.Mock(parse_command=AwsWorker.parse_command,
+                                     run=mock.Mock(side_effect=run))
+        with mock.patch.dict('os.environ'):
+            os.environ.pop('AWS_PROFILE', None)
+            self.saws._process_command('aws ec2 ls')
+            self.saws._process_command('aws  ec2 ls')
+            assert self.saws.worker.run.call_count == 1
+            assert out.getvalue() == b'ec2 describe-instancesec2 ' \
+                b'describe-instances'
+            assert 'cached 0s ago' in mock_click.secho.call_args[0][0]
+            os.environ['AWS_PROFILE'] = 'prod'
+            self.saws._process_command('aws ec2 ls')
+            assert self.saws.worker.run.call_count == 2
+            self.saws._process_command('aws ec2 stop-instances')
+            self.saws._process_command('aws ec2 ls')
+            assert self.saws.worker.run.call_count == 4
+            # Piped commands run in the shell and still drop stale output
+            self.saws._process_command(
+                'aws ec2 terminate-instances --instance-ids i-1 | tee log')
+            mock_subprocess.call.assert_called_with(
+                'aws ec2 terminate-instances --instance-ids i-1 | tee log',
+                shell=True)
+            self.saws._process_command('aws ec2 ls')
+            assert self.saws.worker.run.call_count == 5
+            mock_subprocess.call.reset_mock()
+        self.saws.worker.run.side_effect = None
+        self.saws.worker.run.return_value = 255
+        self.saws._process_command('aws s3 ls')
+        assert not self.saws.result_cache.get(['s3', 'ls'])
+        mock_subprocess.call.assert_not_called()
 
     def test_handle_keyboard_interrupt(self):
         e = KeyboardInterrupt('')
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2015 Donne Martin. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+
+from __future__ import unicode_literals
+from __future__ import print_function
+import mock
+from collections import OrderedDict
+from tests.compat import unittest
+from saws.shortcut_trie import ShortcutTrie
+
+
+class ShortcutTrieTest(unittest.TestCase):
+
+    SHORTCUTS = OrderedDict([
+        ('ec2 ls --instance-ids', 'ec2 describe-instances --instance-ids'),
+        ('ec2 ls --ec2-tag-key',
+         'ec2 describe-instances --filters "Name=tag-key,Values=%s"'),
+        ('ec2 ls', 'ec2 describe-instances'),
+        ('emr ls', 'emr list-clusters'),
+        ('ec2 tags', 'ec2 describe-tags --filters Name=%s,Values=%s'),
+        ('ec2 start-instances --instance-ids',
+         'ec2 start-instances --instance-ids'),
+    ])
+
+    def setUp(self):
+        self.trie = ShortcutTrie(self.SHORTCUTS)
+
+    def test_expand(self):
+        assert self.trie.expand('aws ec2 ls') == 'aws ec2 describe-instances'
+        assert self.trie.expand('aws ec2 ls --instance-ids i-a51d05f4') == \
+            'aws ec2 describe-instances --instance-ids i-a51d05f4'
+        assert self.trie.expand('aws  ec2  ls  ') == \
+            'aws  ec2 describe-instances  '
+        # Shortcuts match whole tokens
+        assert self.trie.expand('aws ec2 lsx') == 'aws ec2 lsx'
+        assert self.trie.expand('aws xec2 ls') == 'aws xec2 ls'
+        assert self.trie.expand('aws s3 ls') == 'aws s3 ls'
+        assert self.trie.expand('') == ''
+        # Expansions are not expanded again
+        assert self.trie.expand(
+            'aws ec2 start-instances --instance-ids i-a51d05f4') == \
+            'aws ec2 start-instances --instance-ids i-a51d05f4'
+
+    def test_first_shortcut_wins(self):
+        shortcuts = OrderedDict([('ec2 ls', 'ec2 describe-instances'),
+                                 ('ec2 ls --all', 'ec2 describe-all')])
+        assert ShortcutTrie(shortcuts).expand('aws ec2 ls --all') == \
+            'aws ec2 describe-instances --all'
+
+    def test_multiple_shortcuts(self):
+        assert self.trie.expand('aws ec2 ls &&  aws emr ls | grep ec2 ls') \
+            == 'aws ec2 describe-instances &&  aws emr list-clusters | ' \
+            'grep ec2 describe-instances'
+
+    def test_substitutions(self):
+        assert self.trie.expand('aws ec2 ls --ec2-tag-key Stack') == \
+            'aws ec2 describe-instances --filters "Name=tag-key,Values=Stack"'
+        assert self.trie.expand(
+            'aws ec2 ls --ec2-tag-key Stack | grep IpAddress') == \
+            'aws ec2 describe-instances --filters ' \
+            '"Name=tag-key,Values=Stack" | grep IpAddress'
+        assert self.trie.expand('aws ec2 tags owner team-a --output text') \
+            == 'aws ec2 describe-tags --filters Name=owner,Values=team-a ' \
+            '--output text'
+        # Missing tokens and shell operators are not substituted
+        assert self.trie.expand('aws ec2 tags owner | head') == \
+            'aws ec2 describe-tags --filters Name=owner,Values=%s | head'
+        assert self.trie.expand('aws ec2 ls --ec2-tag-key') == \
+            'aws ec2 describe-instances --filters "Name=tag-key,Values=%s"'
+
+    def test_cache(self):
+        with mock.patch.object(self.trie, '_expand',
+                               wraps=self.trie._expand) as mock_expand:
+            self.trie.expand('aws ec2 ls')
+            self.trie.expand('aws ec2 ls')
+            assert mock_expand.call_count == 1
+            with mock.patch.object(ShortcutTrie, 'MAX_CACHED', 2):
+                self.trie.expand('aws emr ls')
+                self.trie.expand('aws ec2 ls')
+                self.trie.expand('aws ec2 ls --instance-ids')
+            assert list(self.trie.cache) == \
+                ['aws ec2 ls', 'aws ec2 ls --instance-ids']
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2015 Donne Martin. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+
+from __future__ import unicode_literals
+from __future__ import print_function
+import os
+import shutil
+import tempfile
+import mock
+from pygments.token import Name
+from tests.compat import unittest
+from saws.commands import AwsCommands
+from saws.config import Config
+from saws.lexer import CommandLexer
+from saws.resource_cache import ResourceCache
+from saws.tokenizer import Tokenizer
+from saws.snapshot import Snapshot
+
+
+class SnapshotTest(unittest.TestCase):
+
+    def setUp(self):
+        self.config = Config()
+        self.config_obj = self.config.read_configuration()
+        self.temp_dir = tempfile.mkdtemp()
+        self.snapshot_path = os.path.join(self.temp_dir, 'saws.snapshot')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def load(self):
+        return Snapshot.load(self.config, self.config_obj,
+                             snapshot_path=self.snapshot_path)
+
+    def test_round_trip(self):
+        built = self.load()
+        assert os.path.exists(self.snapshot_path)
+        with mock.patch.object(Snapshot, 'build') as build:
+            snapshot = self.load()
+            assert not build.called
+        assert snapshot.all_commands == built.all_commands
+        assert snapshot.command_tree.commands == \
+            built.command_tree.commands
+        assert snapshot.command_tree.global_options == \
+            built.command_tree.global_options
+        assert snapshot.command_tree.flat == built.command_tree.flat
+        assert snapshot.command_tree.awscli_version == \
+            built.command_tree.awscli_version
+        assert snapshot.ec2_states == built.ec2_states
+        assert list(snapshot.shortcuts.items()) == \
+            list(self.config.get_shortcuts(self.config_obj).items())
+        assert snapshot.lexer_patterns == CommandLexer.get_patterns(
+            snapshot.shortcuts, snapshot.all_commands)
+        assert 'ec2' in snapshot.all_commands[
+            AwsCommands.CommandType.COMMANDS.value]
+
+    def test_rebuild_when_stale(self):
+        self.load()
+        source_stats = Snapshot.get_source_stats()
+        source_path = sorted(source_stats)[0]
+        source_stats[source_path] = (0, 0)
+        assert Snapshot.read(self.snapshot_path, source_stats) is None
+        assert Snapshot.read(self.snapshot_path,
+                             Snapshot.get_source_stats()) is not None
+
+    def test_rebuild_when_version_changes(self):
+        self.load()
+        with mock.patch.object(Snapshot, 'VERSION', Snapshot.VERSION + 1):
+            assert Snapshot.read(self.snapshot_path,
+                                 Snapshot.get_source_stats()) is None
+
+    def test_rebuild_when_corrupt(self):
+        with open(self.snapshot_path, 'wb') as fp:
+            fp.write(b'not a snapshot')
+        snapshot = self.load()
+        assert snapshot.all_commands
+        assert Snapshot.read(self.snapshot_path,
+                             Snapshot.get_source_stats()) is not None
+
+    def test_write_creates_directory(self):
+        snapshot_path = os.path.join(self.temp_dir, 'missing', 'snapshot')
+        Snapshot.load(self.config, self.config_obj,
+                      snapshot_path=snapshot_path)
+        assert os.path.exists(snapshot_path)
+
+    def test_write_error_is_logged(self):
+        log_exception = mock.Mock()
+        with open(os.path.join(self.temp_dir, 'file'), 'w'):
+            pass
+        snapshot = Snapshot.load(
+            self.config, self.config_obj,
+            snapshot_path=os.path.join(self.temp_dir, 'file', 'snapshot'),
+            log_exception=log_exception)
+        assert snapshot.all_commands
+        assert log_exception.called
+
+    def test_path(self):
+        assert os.path.dirname(Snapshot.PATH) == ResourceCache.DIR
+
+    def test_lexer_from_patterns(self):
+        snapshot = self.load()
+        lexer = CommandLexer.create(patterns=snapshot.lexer_patterns)()
+        tokens = list(lexer.get_tokens('aws ec2 ls'))
+        assert (Name.Class, 'ec2') in tokens
+        lexer = CommandLexer.create(patterns=snapshot.lexer_patterns,
+                                    tokenizer=Tokenizer())()
+        assert list(lexer.get_tokens('aws ec2 ls')) == tokens
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2015 Donne Martin. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+
+from __future__ import unicode_literals
+from __future__ import print_function
+import os
+import subprocess
+import sys
+from tests.compat import unittest
+
+
+class StartupTest(unittest.TestCase):
+    """Guards the time it takes to import saws.
+
+    Wall-clock import times vary between machines, so the budget is
+    generous.  Slow CI machines can raise it by setting the
+    SAWS_IMPORT_BUDGET environment variable to a number of seconds, or
+    skip the check by setting it to 0.  benchmarks/bench_startup.py
+    reports which modules take the time.
+
+    Attributes:
+        * IMPORT_BUDGET: A float representing the maximum number of seconds
+            importing saws.main may take.
+        * DEFERRED_MODULES: A list of modules that should only be imported
+            once they are needed, after the prompt is shown.
+    """
+
+    IMPORT_BUDGET = 1.0
+    DEFERRED_MODULES = ['awscli.clidriver',
+                        'awscli.completer',
+                        'awscli.customizations.emr.constants',
+                        'botocore.session',
+                        'numpy']
+
+    def run_python(self, *args):
+        root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ)
+        env['PYTHONPATH'] = root_dir
+        return subprocess.check_output([sys.executable] + list(args),
+                                       stderr=subprocess.STDOUT,
+                                       universal_newlines=True,
+                                       cwd=root_dir,
+                                       env=env)
+
+    def test_deferred_modules(self):
+        output = self.run_python(
+            '-c',
+            'import sys, saws.main; '
+            'print(sorted(m for m in sys.modules if m in %r))' %
+            self.DEFERRED_MODULES)
+        assert output.strip() == '[]'
+
+    @unittest.skipIf(sys.version_info < (3, 7), '-X importtime requires 3.7')
+    def test_import_time(self):
+        budget = float(os.environ.get('SAWS_IMPORT_BUDGET',
+                                      self.IMPORT_BUDGET))
+        if budget <= 0:
+            self.skipTest('SAWS_IMPORT_BUDGET is 0')
+        output = self.run_python('-X', 'importtime', '-c', 'import saws.main')
+        import_times = {}
+        for line in output.splitlines():
+            # import time: self [us] | cumulative | imported package
+            if not line.startswith('import time:') or '|' not in line:
+                continue
+            _, cumulative, module = line.split('|')
+            if cumulative.strip().isdigit():
+                import_times[module.strip()] = int(cumulative) / 1e6
+        assert import_times['saws.main'] < budget
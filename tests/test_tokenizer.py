@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2015 Donne Martin. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+
+from __future__ import unicode_literals
+from __future__ import print_function
+import mock
+import shlex
+from tests.compat import unittest
+from saws.tokenizer import Token, Tokenizer
+from saws.utils import TextUtils
+
+
+class TokenizerTest(unittest.TestCase):
+
+    FILTERS = 'aws ec2 describe-instances --filters ' \
+        '"Name=tag:Name,Values=web server" --query \'Reservations[*]\''
+
+    def setUp(self):
+        self.tokenizer = Tokenizer()
+
+    def test_matches_shlex(self):
+        for text in ['aws ec2 ls',
+                     '  aws   s3 ls  ',
+                     self.FILTERS,
+                     'aws s3 ls s3://my\\ bucket',
+                     'echo "a \\"quoted\\" \\\\ word" \'it\'"s"',
+                     'echo "a\\b" \'c\\d\' e\\\\f',
+                     'echo "" \'\' x""y',
+                     '']:
+            assert self.tokenizer.get_words(text) == shlex.split(text), text
+
+    def test_positions(self):
+        text = ' aws "ec2 x"  ls'
+        assert self.tokenizer.tokenize(text) == [
+            Token('aws', 1, 4), Token('ec2 x', 5, 12), Token('ls', 14, 16)]
+
+    def test_unterminated(self):
+        assert self.tokenizer.get_words('aws ec2 --query "Reserv') == \
+            ['aws', 'ec2', '--query', 'Reserv']
+        assert self.tokenizer.get_words("aws --query 'a b") == \
+            ['aws', '--query', 'a b']
+        assert self.tokenizer.get_words('aws ec2\\') == ['aws', 'ec2\\']
+        assert self.tokenizer.tokenize('aws "') == \
+            [Token('aws', 0, 3), Token('', 4, 5)]
+
+    def test_cache(self):
+        tokens = self.tokenizer.tokenize(self.FILTERS)
+        with mock.patch.object(self.tokenizer, 'scan') as mock_scan:
+            assert self.tokenizer.tokenize(self.FILTERS) is tokens
+            assert not mock_scan.called
+        with mock.patch.object(Tokenizer, 'MAX_CACHED', 2):
+            self.tokenizer.tokenize('aws')
+            self.tokenizer.tokenize('aws s3')
+        assert list(self.tokenizer.cache) == ['aws', 'aws s3']
+
+    def test_scans_edited_tail(self):
+        previous = self.tokenizer.tokenize(self.FILTERS)
+        for text, position in [
+                # Typing at the end of the line, the last word may go on
+                (self.FILTERS + ' --out', previous[-2].end),
+                (self.FILTERS + 'x', previous[-2].end),
+                # Deleting the last character
+                (self.FILTERS[:-1], previous[-2].end),
+                # Editing the middle of the line
+                (self.FILTERS.replace('web', 'app'), previous[3].end),
+                ('gcloud', 0)]:
+            with mock.patch.object(self.tokenizer, 'scan',
+                                   wraps=self.tokenizer.scan) as mock_scan:
+                tokens = self.tokenizer.tokenize(text)
+            mock_scan.assert_called_once_with(text, position)
+            assert tokens == Tokenizer().tokenize(text), text
+            self.tokenizer = Tokenizer()
+            previous = self.tokenizer.tokenize(self.FILTERS)
+
+    def test_text_utils(self):
+        text_utils = TextUtils()
+        assert text_utils.get_tokens('aws ec2 --filters "Name=') == \
+            ['aws', 'ec2', '--filters', 'Name=']
+        assert text_utils.get_tokens(None) == []
+        assert text_utils._last_token('"Name=tag') == 'Name=tag'
+        assert text_utils._last_token(' ') == ''
+        # The word before the cursor does not replace the document text
+        text_utils.get_tokens(self.FILTERS)
+        text_utils._last_token('Reservations')
+        assert 'Reservations' not in text_utils.tokenizer.cache
@@ -42,6 +42,23 @@ class ToolbarTest(unittest.TestCase):
             (Token.Toolbar, ' [F10] Exit ')]
         assert expected == self.toolbar.handler(None)
 
+    def test_toolbar_refreshing(self):
+        self.saws.set_color(True)
+        self.saws.set_fuzzy_match(True)
+        self.saws.set_shortcut_match(True)
+        toolbar = Toolbar(self.saws.get_color,
+                          self.saws.get_fuzzy_match,
+                          self.saws.get_shortcut_match,
+                          lambda: (2, 5))
+        expected = [
+            (Token.Toolbar.On, ' [F2] Color: ON '),
+            (Token.Toolbar.On, ' [F3] Fuzzy: ON '),
+            (Token.Toolbar.On, ' [F4] Shortcuts: ON '),
+            (Token.Toolbar.On, ' [F5] Refreshing 2/5 '),
+            (Token.Toolbar, ' [F9] Docs '),
+            (Token.Toolbar, ' [F10] Exit ')]
+        assert expected == toolbar.handler(None)
+
     def test_toolbar_off(self):
         self.saws.set_color(False)
         self.saws.set_fuzzy_match(False)
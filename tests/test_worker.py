@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2015 Donne Martin. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+
+from __future__ import unicode_literals
+from __future__ import print_function
+import io
+import mock
+import os
+from tests.compat import unittest
+import threading
+from saws.worker import AwsWorker, FrameStream, WorkerServer
+
+
+class WorkerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.worker = AwsWorker()
+
+    def tearDown(self):
+        self.worker.stop()
+
+    def run_worker(self, args):
+        stdout = io.BytesIO()
+        stderr = io.BytesIO()
+        status = self.worker.run(args, stdout=stdout, stderr=stderr,
+                                 tty=False)
+        return status, stdout.getvalue().decode('utf-8'), \
+            stderr.getvalue().decode('utf-8')
+
+    def test_parse_command(self):
+        assert AwsWorker.parse_command('aws ec2 describe-instances') == \
+            ['ec2', 'describe-instances']
+        assert AwsWorker.parse_command(
+            'aws ec2 describe-instances --query "Reservations[*].Instances"'
+            " --filters 'Name=tag:Name,Values=web*'") == \
+            ['ec2', 'describe-instances',
+             '--query', 'Reservations[*].Instances',
+             '--filters', 'Name=tag:Name,Values=web*']
+        for text in ['aws s3 ls | grep logs',
+                     'aws s3 ls > buckets.txt',
+                     'aws s3 ls s3://$BUCKET',
+                     'aws s3 ls "s3://$BUCKET"',
+                     'aws s3 cp *.txt s3://bucket',
+                     'aws s3 ls; aws ec2 ls',
+                     'aws s3 cp - s3://bucket/key',
+                     'aws ec2 help',
+                     'aws configure',
+                     'aws ssm start-session --target i-a51d05f4',
+                     'aws "unterminated',
+                     'ls -la',
+                     'aws']:
+            assert AwsWorker.parse_command(text) is None, text
+
+    def test_run(self):
+        status, stdout, stderr = self.run_worker(['--version'])
+        assert status == 0
+        # Python 2's argparse prints the version to stderr
+        assert (stdout or stderr).startswith('aws-cli/')
+        process = self.worker.process
+        status, stdout, stderr = self.run_worker(['ec2', 'no-such-command'])
+        assert status != 0
+        assert 'Invalid choice' in stderr
+        # Commands share the warm worker
+        assert self.worker.process is process
+
+    def test_environment(self):
+        with mock.patch.dict('os.environ',
+                             {'AWS_PROFILE': 'saws-missing-profile'}):
+            status, _, stderr = self.run_worker(['s3', 'ls'])
+        assert status != 0
+        assert 'saws-missing-profile' in stderr
+        status, _, stderr = self.run_worker(
+            ['s3', 'ls', '--profile', 'saws-other-profile'])
+        assert 'saws-other-profile' in stderr
+
+    def test_session_options(self):
+        env = {'AWS_SHARED_CREDENTIALS_FILE': os.devnull,
+               'AWS_CONFIG_FILE': os.devnull,
+               'AWS_EC2_METADATA_DISABLED': 'true'}
+        endpoint = ['--endpoint-url', 'http://127.0.0.1:1']
+        with mock.patch.dict('os.environ', env):
+            for name in ['AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY',
+                         'AWS_SESSION_TOKEN', 'AWS_PROFILE']:
+                os.environ.pop(name, None)
+            _, _, stderr = self.run_worker(
+                ['s3', 'ls', '--no-sign-request'] + endpoint)
+            assert 'credentials' not in stderr
+            # The unsigned session is not reused by a signed command
+            status, _, stderr = self.run_worker(['s3', 'ls'] + endpoint)
+        assert status != 0
+        assert 'Unable to locate credentials' in stderr
+
+    def test_frame_stream(self):
+        out = io.BytesIO()
+        stream = FrameStream(out, AwsWorker.STDOUT, threading.Lock())
+        assert stream.write(memoryview(b'ab')) == 2
+        assert stream.write(bytearray(b'c')) == 1
+        # The awscli writes unicode strings to stdout on Python 2
+        assert stream.write('\xe9') == 2
+        assert out.getvalue() == b'o\x00\x00\x00\x02ab' \
+            b'o\x00\x00\x00\x01c' b'o\x00\x00\x00\x02\xc3\xa9'
+
+    def test_server_exit_status(self):
+        server = WorkerServer(io.BytesIO(), io.BytesIO())
+        request = {'args': ['s3', 'ls'], 'env': dict(os.environ),
+                   'cwd': os.getcwd(), 'tty': False, 'encoding': 'utf-8'}
+        driver = mock.Mock()
+        with mock.patch.dict('os.environ'):
+            with mock.patch.object(server, '_get_driver',
+                                   return_value=driver):
+                for code, status in [(None, 0), (0, 0), (3, 3),
+                                     ('error', 1)]:
+                    driver.main.side_effect = SystemExit(code)
+                    assert server.run(request) == status
+
+    def test_restart(self):
+        self.run_worker(['--version'])
+        self.worker.process.kill()
+        self.worker.process.wait()
+        status, stdout, stderr = self.run_worker(['--version'])
+        assert status == 0
+        assert (stdout or stderr).startswith('aws-cli/')